@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import Task, User
 
 class CustomUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
@@ -10,4 +10,11 @@ class CustomUserAdmin(UserAdmin):
     )
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'role', 'league')
     
-admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(User, CustomUserAdmin)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('result', 'error')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.notifications import find_unread_drift, rebuild_unread_counts
+
+
+class Command(BaseCommand):
+    help = "Confere o contador de notificações não lidas (User.unread_notifications) e corrige divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Só reporta; sai com erro se houver divergência.")
+
+    def handle(self, *args, **options):
+        drift = find_unread_drift() if options['check'] else rebuild_unread_counts()
+
+        for user_id, counter, real in drift:
+            self.stdout.write(f"Usuário {user_id}: contador {counter}, não lidas {real}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Contadores de não lidas consistentes."))
+        elif options['check']:
+            raise CommandError(f"{len(drift)} usuário(s) com contador divergente.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} usuário(s) corrigido(s)."))
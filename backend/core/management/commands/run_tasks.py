@@ -0,0 +1,37 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from core.tasks import run_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da fila de tarefas (TASK_BACKEND='database'). Vários processos podem rodar ao mesmo tempo. "
+        "Com --once, só esvazia as tarefas vencidas (útil também para sobras do backend 'thread')."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Executa o que estiver vencido e sai.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Espera, em segundos, com a fila vazia.")
+        parser.add_argument('--limit', type=int, default=100, help="Tarefas buscadas por consulta.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            close_old_connections()
+            try:
+                done = run_pending(options['limit'])
+            except DatabaseError:
+                logger.exception("Falha ao consultar a fila de tarefas")
+                done = 0
+            total += done
+            if options['once'] and not done:
+                self.stdout.write(self.style.SUCCESS(f"{total} tarefa(s) executada(s)."))
+                return
+            if not done:
+                time.sleep(options['interval'])
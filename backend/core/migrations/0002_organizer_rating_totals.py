@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='organizer_rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='organizer_review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_organizer_rating_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('key', models.CharField(blank=True, max_length=200)),
+                ('status', models.CharField(choices=[('QUEUED', 'Na fila'), ('RUNNING', 'Executando'), ('DONE', 'Concluída'), ('FAILED', 'Falhou')], default='QUEUED', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'), models.Index(condition=models.Q(('status', 'QUEUED')), fields=['key'], name='task_queued_key_idx')],
+            },
+        ),
+    ]
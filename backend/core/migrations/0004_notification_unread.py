@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_unread_notifications(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Notification = apps.get_model('core', 'Notification')
+    counts = (
+        Notification.objects.filter(user=OuterRef('pk'), read=False)
+        .order_by().values('user').annotate(total=Count('pk')).values('total')
+    )
+    User.objects.update(unread_notifications=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'read', '-created_at'], name='notification_user_read_idx'),
+        ),
+        migrations.RunPython(fill_unread_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0004_notification_unread'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-xp', 'id'], name='user_xp_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['league', '-xp', 'id'], name='user_league_xp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['city', '-xp', 'id'], name='user_city_xp_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_user_xp_rank_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='league',
+            field=models.CharField(default='Novato', max_length=50),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_live_tasks(apps, schema_editor):
+    # Enfileiradas em corrida antes da constraint: fica uma por chave, de preferência a que já roda
+    Task = apps.get_model('core', 'Task')
+    live = Task.objects.filter(status__in=['QUEUED', 'RUNNING']).exclude(key='')
+    duplicated = live.values('key').annotate(total=Count('pk')).filter(total__gt=1).values_list('key', flat=True)
+    for key in list(duplicated):
+        keep, *extra = live.filter(key=key).order_by('-status', 'pk').values_list('pk', flat=True)
+        Task.objects.filter(pk__in=extra, status='QUEUED').delete()
+        Task.objects.filter(pk__in=extra, status='RUNNING').update(
+            status='FAILED', locked_until=None, error='Duplicada de outra tarefa com a mesma chave.',
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_league_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_live_tasks, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_queued_key_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['QUEUED', 'RUNNING']), models.Q(('key', ''), _negated=True)), fields=('key',), name='task_live_key_uniq'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.db.models import Avg, Count
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class User(AbstractUser):
@@ -16,48 +16,31 @@ class User(AbstractUser):
     photo = models.ImageField(upload_to='user_photos/', blank=True, null=True)
     is_participation_visible = models.BooleanField(default=True)
     organizer_rating = models.FloatField(default=0.0)
+    # Totais das avaliações de todos os eventos do organizador (events.ratings); a média sai deles
+    organizer_review_count = models.PositiveIntegerField(default=0)
+    organizer_rating_sum = models.PositiveIntegerField(default=0)
+    unread_notifications = models.PositiveIntegerField(default=0) # Mantido por core.notifications
     
     # Sistema de Ranking (Gamification)
-    xp = models.PositiveIntegerField(default=0)
-    league = models.CharField(max_length=50, default="🌱 Novato")
+    xp = models.PositiveIntegerField(default=0) # Saldo do extrato events.XpEntry
+    league = models.CharField(max_length=50, default="Novato") # Sai do XP (events.gamification.LEAGUES)
     
     role = models.CharField(max_length=20, choices=Role.choices, default=Role.PARTICIPANT)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Rankings (events.leaderboard): top N e "minha posição" são ranges nestes índices
+            models.Index(fields=['-xp', 'id'], name='user_xp_rank_idx'),
+            models.Index(fields=['league', '-xp', 'id'], name='user_league_xp_idx'),
+            models.Index(fields=['city', '-xp', 'id'], name='user_city_xp_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
-    # Lógica de Gamification
-    def calculate_and_save_score(self):
-        if self.role != self.Role.ORGANIZER:
-            return
-
-        # Pega stats de eventos FINALIZADOS
-        stats = self.events_created.filter(status='FINISHED').aggregate(
-            avg_rating=Avg('reviews__rating'),
-            total_checkins=Count('registrations__checkins')
-        )
-        
-        avg_rating = stats['avg_rating'] or 0
-        total_checkins = stats['total_checkins'] or 0
-
-        # Fórmula: (Nota * 100) + (Checkins * 5)
-        new_xp = int((avg_rating * 100) + (total_checkins * 5))
-        
-        # Define Liga
-        new_league = "🌱 Novato"
-        if new_xp >= 2000: new_league = "👑 Lenda Viva"
-        elif new_xp >= 800: new_league = "🌟 Celebridade"
-        elif new_xp >= 200: new_league = "🔥 Agitador"
-
-        if self.xp != new_xp or self.league != new_league:
-            self.xp = new_xp
-            self.league = new_league
-            self.organizer_rating = round(avg_rating, 2)
-            self.save(update_fields=['xp', 'league', 'organizer_rating'])
-
 
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -66,5 +49,50 @@ class Notification(models.Model):
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Caixa de notificações do usuário: filtro de lidas/não lidas, mais recentes primeiro
+            models.Index(fields=['user', 'read', '-created_at'], name='notification_user_read_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.title}"
+
+
+class Task(models.Model):
+    """Tarefa em segundo plano (core.tasks): argumentos, tentativas e resultado."""
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Na fila'
+        RUNNING = 'RUNNING', 'Executando'
+        DONE = 'DONE', 'Concluída'
+        FAILED = 'FAILED', 'Falhou'
+
+    name = models.CharField(max_length=200) # Caminho da função, ex.: events.issuance.render_certificate_batch
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, blank=True) # Evita enfileirar de novo o que já está na fila
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now) # Próxima execução (adiada pelo backoff)
+    locked_until = models.DateTimeField(null=True, blank=True) # Fim do prazo do worker que a pegou
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Próximas tarefas a executar e tarefas de workers que caíram
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+        constraints = [
+            # Uma tarefa viva por chave: o enqueue_unique não depende de checar antes de inserir
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status__in=['QUEUED', 'RUNNING']) & ~models.Q(key=''),
+                name='task_live_key_uniq',
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.user} - {self.title}"
\ No newline at end of file
+        return f"{self.name} ({self.status})"
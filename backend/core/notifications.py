@@ -0,0 +1,82 @@
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Notification, User
+
+NOTIFY_CHUNK_SIZE = 1000
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def send_notifications(notifications, chunk_size=NOTIFY_CHUNK_SIZE):
+    """
+    Grava notificações (instâncias não salvas, pode ser um gerador) em blocos:
+    um bulk_create e poucos UPDATEs do contador de não lidas por bloco,
+    sem nunca montar a lista inteira em memória. Retorna quantas foram enviadas.
+    """
+    sent = 0
+    for chunk in _chunks(notifications, chunk_size):
+        # Usuários agrupados pela quantidade recebida no bloco: um UPDATE por quantidade
+        users_by_amount = defaultdict(list)
+        for user_id, amount in Counter(notification.user_id for notification in chunk).items():
+            users_by_amount[amount].append(user_id)
+
+        with transaction.atomic():
+            Notification.objects.bulk_create(chunk)
+            for amount, user_ids in users_by_amount.items():
+                User.objects.filter(pk__in=user_ids).update(unread_notifications=F('unread_notifications') + amount)
+        sent += len(chunk)
+    return sent
+
+
+def notify(user_ids, title, message, chunk_size=NOTIFY_CHUNK_SIZE):
+    """Mesma notificação para vários usuários (user_ids pode ser um iterator do banco)."""
+    return send_notifications(
+        (Notification(user_id=user_id, title=title, message=message) for user_id in user_ids), chunk_size
+    )
+
+
+def mark_read(user, notification_ids=None):
+    """Marca como lidas (todas, ou só as informadas) num único UPDATE e desconta do contador."""
+    with transaction.atomic():
+        unread = Notification.objects.filter(user=user, read=False)
+        if notification_ids is not None:
+            unread = unread.filter(pk__in=notification_ids)
+        updated = unread.update(read=True)
+        if updated:
+            User.objects.filter(pk=user.pk).update(
+                unread_notifications=Greatest(F('unread_notifications') - updated, 0)
+            )
+    return updated
+
+
+def unread_count_subquery():
+    counts = (
+        Notification.objects.filter(user=OuterRef('pk'), read=False)
+        .order_by().values('user').annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def find_unread_drift():
+    """Usuários cujo contador diverge das notificações não lidas: lista de (id, contador, real)."""
+    return list(
+        User.objects.annotate(real_unread=unread_count_subquery())
+        .exclude(unread_notifications=F('real_unread'))
+        .values_list('pk', 'unread_notifications', 'real_unread')
+    )
+
+
+def rebuild_unread_counts():
+    drift = find_unread_drift()
+    if drift:
+        User.objects.filter(pk__in=[pk for pk, _, _ in drift]).update(unread_notifications=unread_count_subquery())
+    return drift
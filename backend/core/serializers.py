@@ -1,18 +1,35 @@
 from rest_framework import serializers
 from dj_rest_auth.serializers import UserDetailsSerializer
-from .models import User
+from .models import Notification, User
 
 class UserUpdateSerializer(UserDetailsSerializer):
     # Campos que o Frontend pode ler (agora com XP, Liga e Nota)
     xp = serializers.IntegerField(read_only=True)
     league = serializers.CharField(read_only=True)
     organizer_rating = serializers.FloatField(read_only=True)
+    unread_notifications = serializers.IntegerField(read_only=True)
 
     class Meta(UserDetailsSerializer.Meta):
         model = User
         fields = (
             'pk', 'username', 'email', 'first_name', 'last_name', 
             'city', 'photo', 'role', 
-            'xp', 'league', 'organizer_rating' # <--- ADICIONEI ELES AQUI
+            'xp', 'league', 'organizer_rating', # <--- ADICIONEI ELES AQUI
+            'unread_notifications',
         )
-        read_only_fields = ('email', 'xp', 'league', 'organizer_rating')
\ No newline at end of file
+        read_only_fields = ('email', 'xp', 'league', 'organizer_rating', 'unread_notifications')
+
+    def update(self, instance, validated_data):
+        # Só os campos do perfil: o request.user foi lido no início da requisição e um save()
+        # completo gravaria de volta XP, liga, não lidas e notas, mantidos com F() em outros módulos
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'title', 'message', 'read', 'created_at']
+        read_only_fields = fields
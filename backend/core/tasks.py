@@ -0,0 +1,209 @@
+"""
+Fila de tarefas em segundo plano, sem broker externo.
+
+    @task(max_attempts=3, backoff=30)
+    def render_certificate_batch(batch_id): ...
+
+    render_certificate_batch.enqueue(batch_id)  # devolve a linha de core.models.Task
+
+Toda tarefa vira uma linha em Task (argumentos em JSON, tentativas e resultado).
+Quem executa depende de settings.TASK_BACKEND:
+
+- 'thread' (desenvolvimento): um pool de threads do próprio processo roda a
+  tarefa logo depois do commit da transação que a enfileirou;
+- 'database': a tabela é a fila e um ou mais processos `manage.py run_tasks`
+  executam as tarefas. O UPDATE condicional de claim() garante que cada
+  tentativa rode em um único worker.
+
+Com chave (enqueue_unique), há no máximo uma tarefa viva (na fila ou rodando)
+por chave, garantido por uma constraint única parcial. Enfileirar enquanto ela
+roda pede uma nova rodada ao terminar, em vez de uma segunda linha.
+
+Falhas são repetidas até max_attempts, com espera backoff * 2^(tentativa - 1).
+"""
+import importlib
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE = timedelta(minutes=10)
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts, backoff, lease):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        # Chamada direta continua síncrona
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self, args, kwargs)
+
+    def enqueue_unique(self, key, *args, **kwargs):
+        """Só enfileira se não houver outra tarefa com a mesma chave na fila; se ela está rodando, roda de novo depois."""
+        return enqueue(self, args, kwargs, key=key)
+
+
+def task(max_attempts=3, backoff=5, lease=DEFAULT_LEASE):
+    """Registra a função como tarefa. backoff em segundos; lease é o prazo de uma execução."""
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, backoff, lease)
+        _registry[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        # Worker recém-iniciado: importar o módulo registra as tarefas dele
+        importlib.import_module(name.rsplit('.', 1)[0])
+    return _registry[name]
+
+
+def enqueue(task_function, args, kwargs, key=''):
+    while True:
+        try:
+            with transaction.atomic():
+                job = Task.objects.create(
+                    name=task_function.name, args=list(args), kwargs=kwargs, key=key,
+                    max_attempts=task_function.max_attempts,
+                )
+            break
+        except IntegrityError:
+            if not key:
+                raise
+            # A que está na fila cobre esta. A que está rodando pode ter lido o estado
+            # antes desta mudança: marca (run_at) para ela rodar de novo ao terminar.
+            if Task.objects.filter(key=key, status=Task.Status.QUEUED).exists():
+                return None
+            if Task.objects.filter(key=key, status=Task.Status.RUNNING).update(run_at=timezone.now()):
+                return None
+            # Terminou entre o INSERT e as consultas: tenta de novo
+    get_backend().dispatch(job.pk)
+    return job
+
+
+def claim(task_id, lease):
+    """Pega a tarefa para este worker com um UPDATE condicional. False se outro já pegou."""
+    now = timezone.now()
+    runnable = Q(status=Task.Status.QUEUED, run_at__lte=now) | Q(status=Task.Status.RUNNING, locked_until__lt=now)
+    return Task.objects.filter(runnable, pk=task_id).update(
+        status=Task.Status.RUNNING, locked_until=now + lease, attempts=F('attempts') + 1,
+    ) == 1
+
+
+def execute(task_id):
+    """Executa uma tentativa da tarefa, se conseguir pegá-la. Retorna True se rodou."""
+    job = Task.objects.filter(pk=task_id).only('name').first()
+    if job is None:
+        return False
+    task_function = get_task(job.name)
+    if not claim(task_id, task_function.lease):
+        return False
+
+    job = Task.objects.get(pk=task_id)
+    claimed_at = job.locked_until - task_function.lease
+    try:
+        result = task_function.func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception("Falha na tarefa %s (%s), tentativa %s", job.name, job.pk, job.attempts)
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = task_function.backoff * 2 ** (job.attempts - 1)
+            Task.objects.filter(pk=task_id).update(
+                status=Task.Status.QUEUED, run_at=timezone.now() + timedelta(seconds=delay),
+                locked_until=None, error=error,
+            )
+            get_backend().retry(task_id, delay)
+        else:
+            Task.objects.filter(pk=task_id).update(
+                status=Task.Status.FAILED, locked_until=None, error=error, finished_at=timezone.now(),
+            )
+        return True
+
+    # Condicional no run_at: ou o enqueue_unique marcou antes e a tarefa volta para a
+    # fila, ou ela fecha antes e o enqueue_unique já não a encontra rodando
+    done = Task.objects.filter(pk=task_id, run_at__lte=claimed_at).update(
+        status=Task.Status.DONE, locked_until=None, result=result, error='', finished_at=timezone.now(),
+    )
+    if not done:
+        Task.objects.filter(pk=task_id).update(
+            status=Task.Status.QUEUED, locked_until=None, attempts=0, result=result, error='',
+        )
+        get_backend().dispatch(task_id)
+    return True
+
+
+def due_tasks(limit):
+    now = timezone.now()
+    runnable = Q(status=Task.Status.QUEUED, run_at__lte=now) | Q(status=Task.Status.RUNNING, locked_until__lt=now)
+    return list(Task.objects.filter(runnable).order_by('run_at').values_list('pk', flat=True)[:limit])
+
+
+def run_pending(limit=100):
+    """Executa as tarefas vencidas (worker do backend 'database' e testes). Retorna quantas rodaram."""
+    return sum(execute(task_id) for task_id in due_tasks(limit))
+
+
+class ThreadPoolBackend:
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _submit(self, task_id):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=getattr(settings, 'TASK_THREADS', 4))
+        self._pool.submit(self._run, task_id)
+
+    @staticmethod
+    def _run(task_id):
+        try:
+            execute(task_id)
+        except Exception:
+            logger.exception("Falha ao executar a tarefa %s", task_id)
+        finally:
+            connections.close_all()
+
+    def dispatch(self, task_id):
+        transaction.on_commit(lambda: self._submit(task_id))
+
+    def retry(self, task_id, delay):
+        timer = threading.Timer(delay, self._submit, args=[task_id])
+        timer.daemon = True
+        timer.start()
+
+
+class DatabaseBackend:
+    # Os workers `run_tasks` consultam a tabela; não há nada a avisar
+    def dispatch(self, task_id):
+        pass
+
+    def retry(self, task_id, delay):
+        pass
+
+
+_backends = {'thread': ThreadPoolBackend(), 'database': DatabaseBackend()}
+
+
+def get_backend():
+    return _backends[getattr(settings, 'TASK_BACKEND', 'thread')]
@@ -1,3 +1,147 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Notification, Task, User
+from .notifications import find_unread_drift, notify
+from .tasks import run_pending, task
+
+calls = []
+
+
+@task(max_attempts=2, backoff=10)
+def flaky(value):
+    calls.append(value)
+    if len(calls) == 1:
+        raise RuntimeError("falha temporária")
+    return {'double': value * 2}
+
+
+@task(max_attempts=2, backoff=0)
+def always_fails():
+    raise RuntimeError("sempre falha")
+
+
+@task()
+def noop(value):
+    calls.append(value)
+
+
+@task()
+def reenqueues(value):
+    calls.append(value)
+    if len(calls) == 1:
+        reenqueues.enqueue_unique('chave', value)
+
+
+@override_settings(TASK_BACKEND='database')
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_retry_with_backoff_and_result(self):
+        job = flaky.enqueue(21)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertIn('falha temporária', job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+
+        # Antes do backoff nada roda; depois dele a segunda tentativa grava o resultado
+        self.assertEqual(run_pending(), 0)
+        Task.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), ('DONE', 2, {'double': 42}))
+
+    def test_gives_up_after_max_attempts(self):
+        job = always_fails.enqueue()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(run_pending(), 1)
+            self.assertEqual(run_pending(), 1)
+        self.assertEqual(run_pending(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+
+    def test_unique_key_and_single_claim(self):
+        first = noop.enqueue_unique('chave', 1)
+        self.assertIsNone(noop.enqueue_unique('chave', 2))
+
+        # Worker que caiu no meio: a tarefa volta para a fila quando o prazo vence
+        Task.objects.filter(pk=first.pk).update(status='RUNNING', locked_until=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(run_pending(), 0)
+        Task.objects.filter(pk=first.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1])
+        self.assertIsNotNone(noop.enqueue_unique('chave', 3))
+
+    def test_unique_key_is_enforced_by_the_database(self):
+        noop.enqueue_unique('chave', 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Task.objects.create(name=noop.name, args=[2], key='chave')
+        # Sem chave, nada muda
+        self.assertIsNotNone(noop.enqueue(3))
+        self.assertIsNotNone(noop.enqueue(4))
+
+    def test_enqueue_while_running_reruns_once(self):
+        first = reenqueues.enqueue_unique('chave', 1)
+        # Durante a execução o enqueue_unique não cria outra linha: a tarefa volta para a fila ao terminar
+        self.assertEqual(run_pending(), 1)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), ('QUEUED', 0))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(Task.objects.get(pk=first.pk).status, 'DONE')
+        self.assertEqual((calls, Task.objects.count()), ([1, 1], 1))
+
+
+class NotificationTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'usuario_{i}', email=f'usuario_{i}@eventsync.com') for i in range(5)
+        ]
+        self.user = self.users[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread']
+
+    def test_profile_edit_keeps_concurrent_counters(self):
+        # Notificação e XP chegam depois de o request.user ser carregado
+        notify([self.user.pk], 'Aviso', 'Mensagem')
+        User.objects.filter(pk=self.user.pk).update(xp=F('xp') + 40)
+        response = self.client.patch('/auth/user/', {'city': 'Teresina'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.city, user.xp, user.unread_notifications), ('Teresina', 40, 1))
+
+    def test_fan_out_in_chunks_keeps_unread_counters(self):
+        user_ids = [self.user.pk] + [user.pk for user in self.users]
+        # Blocos de 3: [u0, u0, u1] e [u2, u3, u4]. Cada bloco tem savepoint, bulk_create,
+        # um UPDATE do contador por quantidade recebida (2 no primeiro, 1 no segundo) e release
+        with self.assertNumQueries(5 + 4):
+            self.assertEqual(notify(iter(user_ids), 'Aviso', 'Mensagem', chunk_size=3), 6)
+        self.assertEqual(self.unread(), 2)
+        self.assertEqual(User.objects.get(pk=self.users[1].pk).unread_notifications, 1)
+        self.assertEqual(find_unread_drift(), [])
+
+    def test_paginated_list_and_mark_read(self):
+        notify([self.user.pk] * 5, 'Aviso', 'Mensagem')
+        page = self.client.get('/api/notifications/', {'page_size': 2}).data
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+
+        self.client.post(f"/api/notifications/{page['results'][0]['id']}/mark_read/")
+        self.assertEqual(self.unread(), 4)
+        self.assertEqual(len(self.client.get('/api/notifications/', {'unread': 'true'}).data['results']), 4)
+
+        with self.assertNumQueries(4):  # savepoint + UPDATE das notificações + UPDATE do contador + release
+            response = self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(self.unread(), 0)
+        self.assertFalse(Notification.objects.filter(user=self.user, read=False).exists())
@@ -1,7 +1,11 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, mixins, permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from .models import User
-from .serializers import UserUpdateSerializer 
+from rest_framework.response import Response
+from .models import Notification, User
+from . import notifications
+from .serializers import NotificationSerializer, UserUpdateSerializer 
 
 class UserUpdateView(generics.RetrieveUpdateAPIView):
     serializer_class = UserUpdateSerializer # <--- Use ele aqui
@@ -11,4 +15,41 @@ class UserUpdateView(generics.RetrieveUpdateAPIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser) 
 
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+
+class NotificationPagination(CursorPagination):
+    """Mais recentes primeiro, pelo índice (user, read, -created_at)."""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(read=False)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        # Contador denormalizado: não conta as linhas a cada consulta
+        count = User.objects.filter(pk=request.user.pk).values_list('unread_notifications', flat=True).get()
+        return Response({'unread': count})
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        notifications.mark_read(request.user, [pk])
+        return Response({'status': 'Notificação lida.'})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        """Marca todas como lidas num único UPDATE."""
+        return Response({'updated': notifications.mark_read(request.user)})
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Event, Enrollment, Review, Certificate
+from .models import Event, Enrollment, Review, Certificate, CertificateBatch
+from .ratings import shift_review_totals
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -7,6 +8,7 @@ class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'organizer', 'start_date', 'status')
     search_fields = ('title', 'description')
     list_filter = ('status',)
+    readonly_fields = ('seats_taken', 'review_count', 'rating_sum') # Contadores (ver reconcile_seats e rebuild_ratings)
 
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
@@ -20,7 +22,30 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ('event', 'user', 'rating', 'created_at')
     list_filter = ('rating',)
 
+    # O evento de uma avaliação não muda depois de criada (os totais seguem o evento)
+    def get_readonly_fields(self, request, obj=None):
+        return ('event',) if obj else ()
+
+    # O admin também mantém os totais de avaliação (events.ratings); as views do admin já rodam em transação
+    def save_model(self, request, obj, form, change):
+        before = Review.objects.values_list('rating', flat=True).get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        shift_review_totals(obj.event_id, before, obj.rating)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        shift_review_totals(obj.event_id, obj.rating, None)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_model(request, obj)
+
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
     list_display = ('user', 'event', 'validation_code', 'issue_date')
-    search_fields = ('user__email', 'validation_code')
\ No newline at end of file
+    search_fields = ('user__email', 'validation_code')
+
+@admin.register(CertificateBatch)
+class CertificateBatchAdmin(admin.ModelAdmin):
+    list_display = ('event', 'status', 'rendered', 'total', 'created_at', 'finished_at')
+    list_filter = ('status',)
\ No newline at end of file
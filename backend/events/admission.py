@@ -0,0 +1,104 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+
+from .live import publish_event_change
+from .models import Enrollment, Event, SEAT_HOLDING_STATUSES
+from .waitlist import next_waitlist_position, schedule_waitlist_promotion
+
+# Evento sem limite (max_enrollments vazio ou 0) ou com vaga sobrando
+HAS_ROOM = Q(max_enrollments__isnull=True) | Q(max_enrollments=0) | Q(seats_taken__lt=F('max_enrollments'))
+
+
+def reserve_seat(event_id):
+    """
+    Ocupa uma vaga com um único UPDATE condicional. O banco trava a linha do evento,
+    então duas inscrições simultâneas nunca passam do limite. Retorna False se lotado.
+    """
+    return Event.objects.filter(HAS_ROOM, pk=event_id).update(seats_taken=F('seats_taken') + 1) == 1
+
+
+def release_seat(event_id):
+    """Libera uma vaga e agenda a promoção da lista de espera."""
+    Event.objects.filter(pk=event_id, seats_taken__gt=0).update(seats_taken=F('seats_taken') - 1)
+    schedule_waitlist_promotion(event_id)
+
+
+def admit(serializer, event, user, status):
+    """
+    Salva a inscrição e ocupa a vaga na mesma transação.
+    Com o evento lotado, a inscrição entra no fim da lista de espera.
+    """
+    with transaction.atomic():
+        position = None
+        if status in SEAT_HOLDING_STATUSES and not reserve_seat(event.pk):
+            status = 'WAITLISTED'
+            position = next_waitlist_position(event.pk)
+        try:
+            with transaction.atomic():
+                enrollment = serializer.save(user=user, status=status, waitlist_position=position)
+        except IntegrityError:
+            # Duas requisições do mesmo usuário ao mesmo tempo: a unique (event, user) barra a segunda
+            raise ValidationError("Você já se inscreveu neste evento.")
+        publish_event_change(event.pk, 'enrollment', {'ids': [str(enrollment.pk)], 'status': status})
+        return enrollment
+
+
+def change_enrollment_status(enrollment, new_status):
+    """
+    Muda o status mantendo Event.seats_taken em dia: entrar num status que ocupa vaga
+    reserva uma (se houver), sair dele libera. Retorna False se não havia vaga.
+    """
+    with transaction.atomic():
+        current = Enrollment.objects.select_for_update().only('status', 'event_id').get(pk=enrollment.pk)
+        held = current.status in SEAT_HOLDING_STATUSES
+        holds = new_status in SEAT_HOLDING_STATUSES
+
+        if holds and not held and not reserve_seat(current.event_id):
+            return False
+        if held and not holds:
+            release_seat(current.event_id)
+
+        Enrollment.objects.filter(pk=enrollment.pk).update(status=new_status, waitlist_position=None)
+        publish_event_change(current.event_id, 'enrollment', {'ids': [str(enrollment.pk)], 'status': new_status})
+
+    enrollment.status = new_status
+    enrollment.waitlist_position = None
+    return True
+
+
+def delete_enrollment(enrollment):
+    with transaction.atomic():
+        current = Enrollment.objects.select_for_update().only('status', 'event_id').get(pk=enrollment.pk)
+        if current.status in SEAT_HOLDING_STATUSES:
+            release_seat(current.event_id)
+        publish_event_change(current.event_id, 'enrollment', {'ids': [str(current.pk)], 'status': None})
+        current.delete()
+
+
+def seat_count_subquery():
+    counts = (
+        Enrollment.objects.filter(event=OuterRef('pk'), status__in=SEAT_HOLDING_STATUSES)
+        .order_by().values('event').annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def find_seat_drift(events=None):
+    """Eventos cujo contador diverge da contagem real: lista de (id, contador, real)."""
+    events = Event.objects.all() if events is None else events
+    return list(
+        events.annotate(real_seats=seat_count_subquery())
+        .exclude(seats_taken=F('real_seats'))
+        .values_list('pk', 'seats_taken', 'real_seats')
+    )
+
+
+def reconcile_seats(events=None):
+    """Recalcula o contador a partir das inscrições, num único UPDATE. Retorna as divergências corrigidas."""
+    events = Event.objects.all() if events is None else events
+    drift = find_seat_drift(events)
+    if drift:
+        Event.objects.filter(pk__in=[pk for pk, _, _ in drift]).update(seats_taken=seat_count_subquery())
+    return drift
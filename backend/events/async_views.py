@@ -0,0 +1,185 @@
+"""
+Versões assíncronas das leituras mais quentes da API: feed, detalhe do evento,
+lista de inscrições e validação de certificado (QR Code).
+
+Servidas em /api/async/..., com as mesmas respostas das rotas do DRF, usando o
+ORM assíncrono (aiterator, afirst, aexists) em vez de ocupar uma thread por
+requisição. Só rendem sob um servidor ASGI (eventsync.asgi:application, ex.
+`uvicorn eventsync.asgi:application`); no runserver/WSGI cada chamada ganha um
+event loop próprio e fica mais lenta que a rota síncrona.
+
+Os serializers rodam direto no loop: as querysets já trazem tudo anotado, e uma
+consulta escondida por linha levantaria SynchronousOnlyOperation em vez de
+passar despercebida.
+"""
+import base64
+import binascii
+import math
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .filters import EventFeedFilter
+from .models import Enrollment, Event
+from .pagination import EventFeedPagination
+from .serializers import EnrollmentSerializer, EventSerializer
+from .throttles import CertificateValidationThrottle
+from .validation import avalidate_code
+
+def authenticate(request):
+    """
+    Autentica com as classes do DRF (JWT no cabeçalho ou no cookie). Devolve o
+    Request do DRF com o usuário já resolvido, ou None se a credencial é inválida.
+    Síncrono (o JWT busca o usuário no banco): chame via sync_to_async.
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        drf_request.user
+    except APIException:
+        return None
+    return drf_request
+
+
+def _render(data, status=200):
+    # Mesmo JSON (datas, decimais) que o renderer das rotas do DRF
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401)
+
+
+def _not_found():
+    return JsonResponse({'detail': 'Não encontrado.'}, status=404)
+
+
+# --- Cursor do feed ---
+# Keyset em (start_date, id), como o EventFeedPagination; o cursor é a última
+# linha da página, então não há OFFSET e a página seguinte é um range no índice.
+
+def _encode_cursor(event):
+    raw = f'{event.start_date.isoformat()}|{event.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        start_date, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(start_date), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET[EventFeedPagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return EventFeedPagination.page_size
+    return min(max(size, 1), EventFeedPagination.max_page_size)
+
+
+def _feed_queryset(drf_request):
+    # O filtro de organizador valida o id no banco: monta a queryset fora do loop
+    queryset = Event.objects.with_viewer_state(drf_request.user).feed()
+    filterset = EventFeedFilter(drf_request.GET, queryset=queryset, request=drf_request)
+    if not filterset.is_valid():
+        return None, filterset.errors
+    return filterset.qs, None
+
+
+@require_GET
+async def event_feed(request):
+    """
+    GET /api/async/events/ — feed paginado por cursor, com os filtros do EventFeedFilter.
+    Resposta {next, previous, results}; o cursor só anda para frente (previous é sempre null).
+    """
+    drf_request = await sync_to_async(authenticate)(request)
+    if drf_request is None:
+        return _unauthorized()
+    queryset, errors = await sync_to_async(_feed_queryset)(drf_request)
+    if errors:
+        return _render(errors, status=400)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return JsonResponse({'detail': 'Cursor inválido.'}, status=404)
+        start_date, pk = position
+        queryset = queryset.filter(Q(start_date__gt=start_date) | Q(start_date=start_date, pk__gt=pk))
+
+    page_size = _page_size(request)
+    events = [event async for event in queryset.order_by('start_date', 'id')[:page_size + 1].aiterator()]
+    next_url = None
+    if len(events) > page_size:
+        events = events[:page_size]
+        query = request.GET.copy()
+        query['cursor'] = _encode_cursor(events[-1])
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+    results = EventSerializer(events, many=True, context={'request': drf_request}).data
+    return _render({'next': next_url, 'previous': None, 'results': results})
+
+
+@require_GET
+async def event_detail(request, pk):
+    """GET /api/async/events/<pk>/ — mesmo corpo do retrieve do EventViewSet."""
+    drf_request = await sync_to_async(authenticate)(request)
+    if drf_request is None:
+        return _unauthorized()
+    event = await Event.objects.with_viewer_state(drf_request.user).filter(pk=pk).afirst()
+    if event is None:
+        return _not_found()
+    return _render(EventSerializer(event, context={'request': drf_request}).data)
+
+
+@require_GET
+async def enrollment_list(request):
+    """
+    GET /api/async/enrollments/ — mesma regra do EnrollmentViewSet.get_queryset
+    (Enrollment.objects.visible_to).
+    """
+    drf_request = await sync_to_async(authenticate)(request)
+    if drf_request is None or not drf_request.user.is_authenticated:
+        return _unauthorized()
+    user = drf_request.user
+
+    event_id = request.GET.get('event_id')
+    if event_id and not event_id.isdigit():
+        return _render({'event_id': ['Informe um número inteiro válido.']}, status=400)
+    organizes_event = bool(event_id) and await Event.objects.organized_by(user, event_id).aexists()
+    queryset = Enrollment.objects.with_related_state().visible_to(user, event_id, organizes_event)
+
+    enrollments = [enrollment async for enrollment in queryset.aiterator()]
+    return _render(EnrollmentSerializer(enrollments, many=True, context={'request': drf_request}).data)
+
+
+def _throttle(request):
+    """Balde de fichas da validação; devolve a resposta 429 ou None."""
+    throttle = CertificateValidationThrottle()
+    if throttle.allow_request(Request(request), None):
+        return None
+    wait = throttle.wait()
+    response = JsonResponse({'detail': str(Throttled(wait).detail)}, status=429)
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+@require_GET
+async def validate_certificate(request, code):
+    """
+    GET /api/async/certificates/validate_code/<code>/ — validação pública do QR Code,
+    com o mesmo cache e limite por IP da rota do DRF (events.validation).
+    """
+    throttled = await sync_to_async(_throttle)(request)
+    if throttled is not None:
+        return throttled
+    response_status, body = await avalidate_code(code)
+    return _render(body, status=response_status)
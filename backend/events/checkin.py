@@ -0,0 +1,130 @@
+import uuid
+
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .live import publish_event_change
+from .models import Enrollment
+
+MAX_BATCH_SIZE = 500
+
+# Resultados por item
+CHECKED_IN = 'checked_in'
+ALREADY_CHECKED_IN = 'already_checked_in'
+NOT_FOUND = 'not_found'
+NOT_APPROVED = 'not_approved'
+EVENT_NOT_IN_PROGRESS = 'event_not_in_progress'
+INVALID = 'invalid'
+
+
+def parse_scans(scans, replay=False):
+    """
+    Normaliza a entrada em [(id recebido, UUID, horário)], na ordem recebida.
+    No modo replay (fila offline do leitor) cada item traz o 'scanned_at' original.
+    Itens inválidos ficam com UUID None.
+    """
+    now = timezone.now()
+    parsed = []
+    for scan in scans:
+        raw_id = scan.get('id') if isinstance(scan, dict) else scan
+        try:
+            enrollment_id = uuid.UUID(str(raw_id))
+        except ValueError:
+            parsed.append((raw_id, None, None))
+            continue
+
+        scanned_at = now
+        if replay and isinstance(scan, dict) and scan.get('scanned_at'):
+            try:
+                scanned_at = parse_datetime(str(scan['scanned_at']))
+            except ValueError:  # Formato certo, data impossível (ex.: mês 13)
+                scanned_at = None
+            if scanned_at is None:
+                parsed.append((raw_id, None, None))
+                continue
+            if timezone.is_naive(scanned_at):
+                scanned_at = timezone.make_aware(scanned_at)
+            if scanned_at > now:
+                parsed.append((raw_id, None, None))
+                continue
+        parsed.append((raw_id, enrollment_id, scanned_at))
+    return parsed
+
+
+def check_in(organizer, scans, replay=False):
+    """
+    Faz o check-in de uma ou várias inscrições do organizador.
+
+    Uma consulta lê o estado dos itens e um único UPDATE condicional
+    (WHERE checked_in = false, evento do organizador e em andamento) grava
+    todos os elegíveis. Retorna [{'id', 'result'}] na ordem recebida.
+    No modo replay, eventos já finalizados também aceitam os check-ins feitos offline.
+    """
+    parsed = parse_scans(scans, replay=replay)
+    allowed_event_status = ['IN_PROGRESS', 'FINISHED'] if replay else ['IN_PROGRESS']
+
+    # Mesmo QR lido duas vezes no lote: vale a primeira leitura
+    times = {}
+    for _, enrollment_id, scanned_at in parsed:
+        if enrollment_id is not None:
+            times.setdefault(enrollment_id, scanned_at)
+
+    rows = {
+        row['id']: row
+        for row in Enrollment.objects.filter(pk__in=times, event__organizer=organizer)
+        .values('id', 'event_id', 'status', 'checked_in', 'event__status')
+    }
+
+    results = {}
+    eligible = []
+    for enrollment_id in times:
+        row = rows.get(enrollment_id)
+        if row is None:
+            results[enrollment_id] = NOT_FOUND
+        elif row['event__status'] not in allowed_event_status:
+            results[enrollment_id] = EVENT_NOT_IN_PROGRESS
+        elif row['status'] != 'APPROVED':
+            results[enrollment_id] = NOT_APPROVED
+        elif row['checked_in']:
+            results[enrollment_id] = ALREADY_CHECKED_IN
+        else:
+            results[enrollment_id] = CHECKED_IN
+            eligible.append(enrollment_id)
+
+    if eligible:
+        if replay:
+            checkin_time = Case(
+                *[When(pk=enrollment_id, then=Value(times[enrollment_id])) for enrollment_id in eligible],
+                output_field=DateTimeField(),
+            )
+        else:
+            checkin_time = times[eligible[0]]
+
+        updated = Enrollment.objects.filter(
+            pk__in=eligible, checked_in=False, status='APPROVED',
+            event__organizer=organizer, event__status__in=allowed_event_status,
+        ).update(checked_in=True, checkin_time=checkin_time)
+
+        if updated != len(eligible):
+            # Outro leitor registrou parte dos itens entre a leitura e o UPDATE
+            mine = set(
+                Enrollment.objects.filter(pk__in=eligible, checkin_time__in=[times[i] for i in eligible])
+                .values_list('pk', flat=True)
+            )
+            for enrollment_id in eligible:
+                if enrollment_id not in mine:
+                    results[enrollment_id] = ALREADY_CHECKED_IN
+
+    # Painel ao vivo: um aviso por evento com as inscrições que este lote registrou
+    checked_by_event = {}
+    for enrollment_id in eligible:
+        if results[enrollment_id] == CHECKED_IN:
+            checked_by_event.setdefault(rows[enrollment_id]['event_id'], []).append(str(enrollment_id))
+    for event_id, ids in checked_by_event.items():
+        publish_event_change(event_id, 'checkin', {'ids': ids})
+
+    return [
+        {'id': str(raw_id), 'result': results[enrollment_id] if enrollment_id else INVALID}
+        for raw_id, enrollment_id, _ in parsed
+    ]
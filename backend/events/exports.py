@@ -0,0 +1,110 @@
+import csv
+import tempfile
+
+from django.http import StreamingHttpResponse, FileResponse
+
+from .models import Enrollment
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX é opcional
+    Workbook = None
+
+EXPORT_CHUNK_SIZE = 2000
+
+STATUS_LABELS = dict(Enrollment.Status.choices)
+
+
+def _format_checkin_time(value):
+    return value.strftime("%d/%m/%Y %H:%M") if value else '-'
+
+
+# coluna -> (cabeçalho, campos do values_list, formatador)
+EXPORT_COLUMNS = {
+    'name': ('Nome Completo', ('user__first_name', 'user__last_name'), lambda first, last: first + ' ' + last),
+    'email': ('Email', ('user__email',), lambda email: email),
+    'status': ('Status da Inscricao', ('status',), lambda value: STATUS_LABELS.get(value, value)),
+    'checked_in': ('Check-in Realizado?', ('checked_in',), lambda value: 'Sim' if value else 'Não'),
+    'checkin_time': ('Data/Hora Check-in', ('checkin_time',), _format_checkin_time),
+    'created_at': ('Data da Inscricao', ('created_at',), _format_checkin_time),
+}
+
+DEFAULT_COLUMNS = ['name', 'email', 'status', 'checked_in', 'checkin_time']
+
+
+class Echo:
+    """Pseudo-buffer: o csv.writer devolve a linha em vez de acumular em memória."""
+    def write(self, value):
+        return value
+
+
+class EnrollmentExport:
+    """
+    Exporta as inscrições de um evento linha a linha, lendo o banco em blocos
+    (values_list + iterator) para manter o uso de memória constante.
+    """
+
+    def __init__(self, event, columns=None, statuses=None, chunk_size=EXPORT_CHUNK_SIZE):
+        columns = columns or DEFAULT_COLUMNS
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Colunas inválidas: {', '.join(unknown)}")
+
+        self.event = event
+        self.columns = columns
+        self.statuses = statuses
+        self.chunk_size = chunk_size
+
+    def header(self):
+        return [EXPORT_COLUMNS[column][0] for column in self.columns]
+
+    def rows(self):
+        fields = []
+        slices = []
+        for column in self.columns:
+            _, column_fields, formatter = EXPORT_COLUMNS[column]
+            slices.append((len(fields), len(fields) + len(column_fields), formatter))
+            fields.extend(column_fields)
+
+        queryset = Enrollment.objects.filter(event=self.event)
+        if self.statuses:
+            queryset = queryset.filter(status__in=self.statuses)
+        values = queryset.order_by('created_at').values_list(*fields).iterator(chunk_size=self.chunk_size)
+
+        for record in values:
+            yield [formatter(*record[start:end]) for start, end, formatter in slices]
+
+    def filename(self, extension):
+        return f'EventSync_Inscritos_{self.event.title.replace(" ", "_")}.{extension}'
+
+    def iter_csv(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header())
+        for row in self.rows():
+            yield writer.writerow(row)
+
+    def csv_response(self):
+        response = StreamingHttpResponse(self.iter_csv(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{self.filename("csv")}"'
+        return response
+
+    def xlsx_response(self):
+        if Workbook is None:
+            raise RuntimeError("Exportação XLSX requer o pacote openpyxl.")
+
+        # write_only grava as linhas direto no arquivo temporário, sem montar a planilha em memória
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Inscritos')
+        sheet.append(self.header())
+        for row in self.rows():
+            sheet.append(row)
+
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=self.filename('xlsx'),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
@@ -0,0 +1,14 @@
+import django_filters
+
+from .models import Event
+
+
+class EventFeedFilter(django_filters.FilterSet):
+    # Filtros do feed: texto do local, intervalo de datas e organizador
+    city = django_filters.CharFilter(field_name='location_address', lookup_expr='icontains')
+    start_after = django_filters.IsoDateTimeFilter(field_name='start_date', lookup_expr='gte')
+    start_before = django_filters.IsoDateTimeFilter(field_name='start_date', lookup_expr='lte')
+
+    class Meta:
+        model = Event
+        fields = ['city', 'start_after', 'start_before', 'organizer']
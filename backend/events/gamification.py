@@ -0,0 +1,158 @@
+"""
+XP e ligas. Todo ganho de XP é uma linha no extrato (XpEntry) e um UPDATE
+atômico de User.xp e User.league, com F() e sem ler o saldo antes: duas
+concessões ao mesmo tempo nunca se sobrescrevem. O extrato é a fonte da
+verdade; replay_xp refaz saldo e liga a partir dele.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+
+from core.models import User
+from core.tasks import task
+from .models import Review, XpEntry
+
+FINISH_XP = 50  # Bônus do organizador por evento finalizado
+REVIEW_XP = {5: 30, 4: 15, 3: 5}  # XP do organizador pela nota recebida
+
+# Liga pelo XP acumulado: (XP mínimo, liga), da maior para a menor
+LEAGUES = [
+    (10000, 'CEO dos Eventos'), (6000, 'Mestre dos Eventos'), (3500, 'Diamante'), (2000, 'Platina'),
+    (1000, 'Ouro'), (500, 'Prata'), (200, 'Bronze'), (0, 'Novato'),
+]
+
+
+def league_for(xp):
+    return next(league for minimum, league in LEAGUES if (xp or 0) >= minimum)
+
+
+def league_expression(xp):
+    """A mesma tabela em SQL, sobre uma expressão de XP (ex.: F('xp') + ganho)."""
+    *tiers, (_, lowest) = LEAGUES
+    return Case(
+        *[When(GreaterThanOrEqual(xp, minimum), then=Value(league)) for minimum, league in tiers],
+        default=Value(lowest),
+    )
+
+
+def _credit(users, gain):
+    # Saldo e liga no mesmo UPDATE: os dois lados do SET leem o XP de antes da soma
+    return users.update(xp=F('xp') + gain, league=league_expression(F('xp') + gain))
+
+
+def award(user_id, amount, reason, event_id=None, key=None):
+    """
+    Lança `amount` de XP: um INSERT no extrato e um UPDATE do saldo, na mesma
+    transação. Com `key`, lançar de novo (ex.: tarefa repetida) não soma outra
+    vez. Retorna a entrada, ou None se a chave já estava no extrato.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                entry = XpEntry.objects.create(user_id=user_id, amount=amount, reason=reason, event_id=event_id, key=key)
+        except IntegrityError:
+            if key is None:
+                raise
+            return None
+        _credit(User.objects.filter(pk=user_id), Value(amount))
+    return entry
+
+
+def award_many(entries):
+    """
+    Vários lançamentos (XpEntry ainda não salvos): um bulk_create e um UPDATE com
+    o ganho de cada usuário. Como em award(), chave já lançada (ou repetida no
+    lote) fica de fora e não soma. Retorna as entradas gravadas.
+    """
+    with transaction.atomic():
+        keys = [entry.key for entry in entries if entry.key]
+        taken = set(XpEntry.objects.filter(key__in=keys).values_list('key', flat=True)) if keys else set()
+        fresh = []
+        for entry in entries:
+            if entry.key:
+                if entry.key in taken:
+                    continue
+                taken.add(entry.key)
+            fresh.append(entry)
+        if not fresh:
+            return []
+
+        gains = defaultdict(int)
+        for entry in fresh:
+            gains[entry.user_id] += entry.amount
+        XpEntry.objects.bulk_create(fresh)
+        _credit(User.objects.filter(pk__in=gains), Case(
+            *[When(pk=pk, then=Value(gain)) for pk, gain in gains.items()], output_field=IntegerField(),
+        ))
+    return fresh
+
+
+def finish_entry(event_id, organizer_id):
+    return XpEntry(
+        user_id=organizer_id, amount=FINISH_XP, reason=XpEntry.Reason.EVENT_FINISHED,
+        event_id=event_id, key=f'finish:{event_id}',
+    )
+
+
+@task()
+def award_xp(user_id, amount, reason=XpEntry.Reason.ADJUSTMENT, event_id=None, key=None):
+    """Lançamento de XP fora da requisição."""
+    entry = award(user_id, amount, reason, event_id=event_id, key=key)
+    return {'entry': entry and entry.pk}
+
+
+@task()
+def settle_review_xp(review_id, organizer_id, event_id):
+    """
+    Acerta o XP que uma avaliação deu ao organizador com o que a nota atual vale
+    (nada, se ela foi apagada): lança só a diferença, positiva ou estorno.
+    Rodar de novo não muda nada; as chaves 'review:<id>:<n>' seguem em sequência,
+    então dois acertos simultâneos colidem na chave e só um entra.
+    """
+    with transaction.atomic():
+        rating = Review.objects.filter(pk=review_id).values_list('rating', flat=True).first()
+        target = REVIEW_XP.get(rating, 0)
+        posted = XpEntry.objects.filter(user_id=organizer_id).filter(
+            Q(key=f'review:{review_id}') | Q(key__startswith=f'review:{review_id}:')
+        )
+        totals = posted.aggregate(credited=Sum('amount'), count=Count('pk'))
+        delta = target - (totals['credited'] or 0)
+        if not delta:
+            return {'delta': 0}
+        entry = award(
+            organizer_id, delta, XpEntry.Reason.REVIEW, event_id=event_id, key=f'review:{review_id}:{totals["count"] + 1}',
+        )
+    return {'delta': delta if entry else 0}
+
+
+# --- Replay ---
+
+def ledger_balance_subquery():
+    totals = (
+        XpEntry.objects.filter(user=OuterRef('pk'))
+        .order_by().values('user').annotate(total=Sum('amount')).values('total')
+    )
+    return Coalesce(Subquery(totals, output_field=IntegerField()), Value(0))
+
+
+def find_xp_drift(user_ids=None):
+    """Usuários cujo XP ou liga diverge do extrato: lista de (id, xp, xp do extrato)."""
+    users = User.objects.all() if user_ids is None else User.objects.filter(pk__in=user_ids)
+    balance = ledger_balance_subquery()
+    return list(
+        users.annotate(ledger_xp=balance, ledger_league=league_expression(balance))
+        .filter(~Q(xp=F('ledger_xp')) | ~Q(league=F('ledger_league')))
+        .values_list('pk', 'xp', 'ledger_xp')
+    )
+
+
+def replay_xp(user_ids=None):
+    """Refaz XP e liga pela soma do extrato, num UPDATE só para os usuários divergentes."""
+    drift = find_xp_drift(user_ids)
+    if drift:
+        balance = ledger_balance_subquery()
+        User.objects.filter(pk__in=[pk for pk, _, _ in drift]).update(xp=balance, league=league_expression(balance))
+    return drift
@@ -0,0 +1,123 @@
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from core.tasks import task
+from .models import Certificate, CertificateBatch, Enrollment
+from .workers import init_render_worker, render_certificate_chunk
+
+logger = logging.getLogger(__name__)
+
+RENDER_CHUNK_SIZE = 50
+
+
+def new_validation_code():
+    return str(uuid.uuid4()).replace('-', '').upper()[:8]
+
+
+def unique_validation_codes(amount):
+    """Gera `amount` códigos inéditos com uma única consulta por rodada de colisões."""
+    codes = set()
+    while len(codes) < amount:
+        candidates = {new_validation_code() for _ in range(amount - len(codes))} - codes
+        taken = set(Certificate.objects.filter(validation_code__in=candidates).values_list('validation_code', flat=True))
+        codes |= candidates - taken
+    return list(codes)
+
+
+def issue_missing_certificates(event):
+    """Cria de uma vez os certificados de todos os aprovados que ainda não têm um."""
+    return issue_missing_certificates_for([event.pk])
+
+
+def issue_missing_certificates_for(event_ids):
+    """Mesma emissão para vários eventos: uma consulta e um bulk_create no total."""
+    pairs = list(
+        Enrollment.objects.filter(event_id__in=event_ids, status='APPROVED')
+        .exclude(Exists(Certificate.objects.filter(event=OuterRef('event'), user=OuterRef('user'))))
+        .values_list('event_id', 'user_id')
+    )
+    if not pairs:
+        return 0
+
+    now = timezone.now()
+    certificates = [
+        Certificate(event_id=event_id, user_id=user_id, validation_code=code, issue_date=now)
+        for (event_id, user_id), code in zip(pairs, unique_validation_codes(len(pairs)))
+    ]
+    # ignore_conflicts cobre um download concorrente que criou o mesmo certificado antes
+    Certificate.objects.bulk_create(certificates, batch_size=1000, ignore_conflicts=True)
+    return len(certificates)
+
+
+def run_certificate_batch(batch, workers=None, progress=None):
+    """
+    Emite e renderiza todos os certificados do evento do lote.
+    Pode ser chamada de novo para um lote interrompido: os PDFs já gravados no
+    storage são reaproveitados pelo cache, então só o que faltou é renderizado.
+    """
+    event = batch.event
+    CertificateBatch.objects.filter(pk=batch.pk).update(status=CertificateBatch.Status.RUNNING, error='')
+
+    try:
+        issue_missing_certificates(event)
+        certificate_ids = list(Certificate.objects.filter(event=event).values_list('pk', flat=True))
+        CertificateBatch.objects.filter(pk=batch.pk).update(total=len(certificate_ids), rendered=0)
+
+        chunks = [certificate_ids[i:i + RENDER_CHUNK_SIZE] for i in range(0, len(certificate_ids), RENDER_CHUNK_SIZE)]
+
+        def advance(done):
+            CertificateBatch.objects.filter(pk=batch.pk).update(rendered=F('rendered') + done)
+            if progress:
+                batch.refresh_from_db(fields=['rendered', 'total'])
+                progress(batch.rendered, batch.total)
+
+        if workers is not None and workers <= 1:
+            for chunk in chunks:
+                advance(render_certificate_chunk(chunk))
+        else:
+            # 'spawn' porque o lote pode partir de uma thread do servidor web
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_render_worker) as pool:
+                for future in as_completed([pool.submit(render_certificate_chunk, chunk) for chunk in chunks]):
+                    advance(future.result())
+    except Exception as exc:
+        logger.exception("Falha no lote de certificados %s", batch.pk)
+        CertificateBatch.objects.filter(pk=batch.pk).update(status=CertificateBatch.Status.FAILED, error=str(exc))
+        raise
+
+    CertificateBatch.objects.filter(pk=batch.pk).update(
+        status=CertificateBatch.Status.DONE, finished_at=timezone.now()
+    )
+    batch.refresh_from_db()
+    return batch
+
+
+@task(max_attempts=3, backoff=30, lease=timedelta(hours=1))
+def render_certificate_batch(batch_id):
+    """Tarefa do lote: em caso de falha a fila retoma, e o cache pula o que já foi renderizado."""
+    batch = run_certificate_batch(CertificateBatch.objects.select_related('event').get(pk=batch_id))
+    return {'total': batch.total, 'rendered': batch.rendered}
+
+
+def start_certificate_batch(event):
+    """Cria o lote do evento e o coloca na fila de tarefas, sem bloquear a requisição."""
+    batch, _ = CertificateBatch.objects.get_or_create(event=event)
+    render_certificate_batch.enqueue_unique(f'certificate-batch:{batch.pk}', batch.pk)
+    return batch
+
+
+def start_certificate_batches(event_ids):
+    """Mesmo lote para vários eventos (finalização automática): um bulk_create e uma tarefa por lote."""
+    CertificateBatch.objects.bulk_create(
+        [CertificateBatch(event_id=event_id) for event_id in event_ids], ignore_conflicts=True,
+    )
+    batch_ids = list(CertificateBatch.objects.filter(event_id__in=event_ids).values_list('pk', flat=True))
+    for batch_id in batch_ids:
+        render_certificate_batch.enqueue_unique(f'certificate-batch:{batch_id}', batch_id)
+    return batch_ids
@@ -0,0 +1,130 @@
+"""
+Rankings de XP: global, por liga e por cidade.
+
+Dois materializados, refeitos periodicamente por `manage.py refresh_leaderboards`:
+
+- LeaderboardEntry: o top N de cada ranking, já com a posição. A página é um
+  range no índice (scope, key, rank), sem ordenar a tabela de usuários;
+- LeaderboardBucket: para cada valor de XP do ranking, quantos usuários estão
+  acima. "Minha posição" é uma busca no índice único (scope, key, xp) pelo XP
+  atual do usuário, O(log n), em vez de contar quem tem mais XP.
+
+A posição é a de competição: empatados no XP dividem a posição (1, 2, 2, 4).
+Entre duas rodadas ela compara o XP atual do usuário com o ranking da última.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Value, Window
+from django.db.models.functions import Rank, RowNumber
+from django.utils import timezone
+
+from core.models import User
+from .models import LeaderboardBucket, LeaderboardEntry
+
+GLOBAL = 'global'
+LEAGUE = 'league'
+CITY = 'city'
+
+# Campo do usuário que separa cada ranking (o global é um só)
+SCOPES = {GLOBAL: None, LEAGUE: 'league', CITY: 'city'}
+
+TOP_N = 100
+BATCH_SIZE = 1000
+
+
+def scope_key(user, scope):
+    """Ranking do usuário no escopo: '' no global, a liga ou a cidade dele; None se não tem cidade."""
+    field = SCOPES[scope]
+    if field is None:
+        return ''
+    return getattr(user, field) or None
+
+
+def _scope_users(scope):
+    field = SCOPES[scope]
+    if field is None:
+        return User.objects.annotate(ranking=Value('')), []
+    users = User.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+    return users.annotate(ranking=F(field)), [F(field)]
+
+
+def _chunks(rows, size=BATCH_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _top_entries(scope, top, now):
+    # Top N de cada partição numa consulta só, lida em ordem pelos índices (<campo>, -xp, id)
+    users, partition = _scope_users(scope)
+    ranked = users.annotate(
+        position=Window(RowNumber(), partition_by=partition or None, order_by=[F('xp').desc(), F('id').asc()]),
+        position_rank=Window(Rank(), partition_by=partition or None, order_by=F('xp').desc()),
+    ).filter(position__lte=top).values_list('ranking', 'position_rank', 'id', 'xp')
+    for key, rank, user_id, xp in ranked.iterator(chunk_size=BATCH_SIZE):
+        yield LeaderboardEntry(scope=scope, key=key, rank=rank, user_id=user_id, xp=xp, refreshed_at=now)
+
+
+def _buckets(scope):
+    # Quantos usuários por (ranking, XP), do maior XP para o menor; "acima" é a soma corrida
+    users, _ = _scope_users(scope)
+    counts = users.values('ranking', 'xp').annotate(users=Count('id')).order_by('ranking', '-xp')
+    current, above = None, 0
+    for row in counts.iterator(chunk_size=BATCH_SIZE):
+        if row['ranking'] != current:
+            current, above = row['ranking'], 0
+        yield LeaderboardBucket(scope=scope, key=current, xp=row['xp'], users=row['users'], above=above)
+        above += row['users']
+
+
+def refresh_leaderboard(scope, top=TOP_N, now=None):
+    """
+    Refaz o top N e o índice de posições de um escopo. A troca é uma transação:
+    quem lê no meio continua vendo a rodada anterior. Retorna (entradas, faixas de XP).
+    """
+    now = now or timezone.now()
+    entries = buckets = 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(scope=scope).delete()
+        LeaderboardBucket.objects.filter(scope=scope).delete()
+        for chunk in _chunks(_top_entries(scope, top, now)):
+            LeaderboardEntry.objects.bulk_create(chunk)
+            entries += len(chunk)
+        for chunk in _chunks(_buckets(scope)):
+            LeaderboardBucket.objects.bulk_create(chunk)
+            buckets += len(chunk)
+    return entries, buckets
+
+
+def refresh_leaderboards(top=TOP_N):
+    """Refaz todos os escopos. Retorna {escopo: (entradas, faixas de XP)}."""
+    now = timezone.now()
+    return {scope: refresh_leaderboard(scope, top=top, now=now) for scope in SCOPES}
+
+
+def rank_of(user, scope):
+    """
+    Posição do usuário no ranking do escopo, pelo XP atual dele, ou None se
+    ele não entra nesse ranking (sem cidade). Uma busca em LeaderboardBucket;
+    só conta usuários (range no índice do escopo) se o ranking ainda não foi
+    materializado.
+    """
+    key = scope_key(user, scope)
+    if key is None:
+        return None
+    buckets = LeaderboardBucket.objects.filter(scope=scope, key=key)
+    # Menor faixa com XP >= o do usuário: quem está nela (ou acima dela) está na frente
+    bucket = buckets.filter(xp__gte=user.xp).order_by('xp').values('xp', 'users', 'above').first()
+    if bucket is not None:
+        return bucket['above'] + (bucket['users'] if bucket['xp'] > user.xp else 0) + 1
+    if buckets.exists():
+        return 1  # Mais XP que todo mundo na última rodada
+
+    ahead = User.objects.filter(xp__gt=user.xp)
+    if SCOPES[scope]:
+        ahead = ahead.filter(**{SCOPES[scope]: key})
+    return ahead.count() + 1
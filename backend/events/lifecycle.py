@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Notification
+from core.notifications import NOTIFY_CHUNK_SIZE, notify, send_notifications
+from core.tasks import task
+from .gamification import FINISH_XP, award_many, finish_entry
+from .issuance import issue_missing_certificates_for, start_certificate_batches
+from .models import Enrollment, Event, SEAT_HOLDING_STATUSES
+
+LIFECYCLE_BATCH_SIZE = 500
+
+
+def _claim(due, batch_size):
+    """
+    Trava um lote de eventos vencidos. Com skip_locked, réplicas rodando ao mesmo
+    tempo pegam lotes disjuntos em vez de esperar umas pelas outras; no SQLite a
+    trava de escrita do banco já serializa as rodadas.
+    """
+    return list(
+        due.select_for_update(skip_locked=True).order_by('pk')
+        .values_list('pk', 'organizer_id', 'title')[:batch_size]
+    )
+
+
+def _notify_organizers(claimed, title, message):
+    send_notifications([
+        Notification(user_id=organizer_id, title=title, message=message.format(title=event_title))
+        for _, organizer_id, event_title in claimed
+    ])
+
+
+def _enrollee_ids(event_id, statuses):
+    return (
+        Enrollment.objects.filter(event_id=event_id, status__in=statuses)
+        .values_list('user_id', flat=True).iterator(chunk_size=NOTIFY_CHUNK_SIZE)
+    )
+
+
+@task()
+def notify_enrollees(event_id, statuses, title, message):
+    """Avisa os inscritos do evento com os status dados, lendo os ids do banco em blocos."""
+    return notify(_enrollee_ids(event_id, statuses), title, message)
+
+
+@task()
+def notify_finished_enrollees(event_ids):
+    """Aviso de evento finalizado aos aprovados de vários eventos, numa tarefa só para a rodada inteira."""
+    sent = 0
+    for event_id, title in Event.objects.filter(pk__in=event_ids).values_list('pk', 'title'):
+        sent += notify(
+            _enrollee_ids(event_id, ['APPROVED']), 'Evento finalizado!',
+            f'O evento "{title}" foi encerrado. Confira seu certificado e deixe sua avaliação.',
+        )
+    return sent
+
+
+def announce_cancellation(event):
+    notify_enrollees.enqueue(
+        event.pk, [*SEAT_HOLDING_STATUSES, 'WAITLISTED'],
+        'Evento cancelado', f'O evento "{event.title}" foi cancelado pelo organizador.',
+    )
+
+
+def announce_finish(event_ids):
+    notify_finished_enrollees.enqueue(list(event_ids))
+
+
+def award_finish_xp(finished):
+    """Bônus de evento finalizado para vários organizadores [(evento, organizador)]: um bulk_create no extrato e um UPDATE."""
+    award_many([finish_entry(event_id, organizer_id) for event_id, organizer_id in finished])
+
+
+def _transition(due, new_status, side_effects, batch_size):
+    """
+    Move os eventos vencidos para `new_status` em lotes. Cada lote (UPDATE +
+    efeitos colaterais) roda numa transação: se cair no meio, nada é aplicado e a
+    próxima rodada refaz o lote, então rodar de novo nunca duplica XP nem avisos.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            claimed = _claim(due, batch_size)
+            if not claimed:
+                return moved
+            # O filtro de status se repete no UPDATE: só transiciona o que ainda está vencido
+            due.filter(pk__in=[pk for pk, _, _ in claimed]).update(status=new_status)
+            side_effects(claimed)
+        moved += len(claimed)
+
+
+def _on_start(claimed):
+    _notify_organizers(claimed, 'Seu evento começou!', 'O evento "{title}" está em andamento: o check-in foi liberado.')
+
+
+def _on_finish(claimed):
+    award_finish_xp([(pk, organizer_id) for pk, organizer_id, _ in claimed])
+    event_ids = [pk for pk, _, _ in claimed]
+    issue_missing_certificates_for(event_ids)
+    # Os PDFs, como no finish_event manual: um lote por evento na fila de tarefas
+    start_certificate_batches(event_ids)
+    announce_finish(event_ids)
+    _notify_organizers(
+        claimed, 'Evento finalizado!', f'O evento "{{title}}" foi encerrado. +{FINISH_XP} XP e certificados emitidos.'
+    )
+
+
+def start_due_events(now=None, batch_size=LIFECYCLE_BATCH_SIZE):
+    """PUBLISHED com início vencido -> IN_PROGRESS (índice event_status_start_idx)."""
+    due = Event.objects.filter(status='PUBLISHED', start_date__lte=now or timezone.now())
+    return _transition(due, 'IN_PROGRESS', _on_start, batch_size)
+
+
+def finish_due_events(now=None, batch_size=LIFECYCLE_BATCH_SIZE):
+    """IN_PROGRESS com término vencido -> FINISHED (índice event_status_end_idx). Sem end_date, fica manual."""
+    due = Event.objects.filter(status='IN_PROGRESS', end_date__lte=now or timezone.now())
+    return _transition(due, 'FINISHED', _on_finish, batch_size)
+
+
+def run_lifecycle(now=None, batch_size=LIFECYCLE_BATCH_SIZE):
+    """Uma rodada do agendador. Retorna (iniciados, finalizados)."""
+    now = now or timezone.now()
+    return start_due_events(now, batch_size), finish_due_events(now, batch_size)
@@ -0,0 +1,256 @@
+"""
+Canal ao vivo do painel do organizador: check-ins, inscrições e contadores do
+evento empurrados por Server-Sent Events (ou long-poll), em vez de re-polling.
+
+As mudanças são publicadas uma vez, depois do commit, num broker de pub/sub;
+cada painel conectado só lê a própria fila em memória. O broker padrão vive no
+processo (basta um servidor ASGI único); settings.LIVE_BROKER aceita outro com a
+mesma interface (ex.: Redis) para vários processos.
+
+O SSE só funciona sob ASGI (uvicorn eventsync.asgi:application, como no
+docker-compose): no WSGI o StreamingHttpResponse consome o gerador assíncrono
+inteiro antes de responder, e o stream infinito prenderia a thread. Lá a rota
+responde 400 e o cliente usa ?transport=poll.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .async_views import authenticate
+from .models import Enrollment, Event
+
+BUFFER_SIZE = 256  # Mensagens guardadas por canal para retomar com Last-Event-ID
+WATCH_GRACE = 60  # Segundos em que um canal sem ouvintes ainda conta como assistido (reconexões)
+HEARTBEAT = 15
+LONG_POLL_TIMEOUT = 25
+
+
+class InProcessBroker:
+    """
+    Pub/sub na memória do processo. publish() pode vir de qualquer thread
+    (requisições, fila de tarefas); os ouvintes são filas asyncio do loop ASGI.
+    Cada mensagem ganha um id sequencial por canal. Um canal só existe enquanto
+    alguém assiste (ou até WATCH_GRACE depois, para as reconexões retomarem).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._pruned_at = time.monotonic()
+
+    def _prune(self):
+        # Canais sem ouvintes além de WATCH_GRACE saem da memória (no máximo uma varredura por WATCH_GRACE)
+        now = time.monotonic()
+        if now - self._pruned_at < WATCH_GRACE:
+            return
+        self._pruned_at = now
+        idle = [
+            name for name, channel in self._channels.items()
+            if not channel['subscribers'] and now - channel['seen_at'] >= WATCH_GRACE
+        ]
+        for name in idle:
+            del self._channels[name]
+
+    def publish(self, name, message):
+        with self._lock:
+            self._prune()
+            channel = self._channels.get(name)
+            if channel is None:
+                return  # Ninguém assiste nem pode retomar: não há o que guardar
+            channel['last_id'] += 1
+            item = (channel['last_id'], message)
+            channel['buffer'].append(item)
+            subscribers = list(channel['subscribers'])
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def is_watched(self, name):
+        with self._lock:
+            channel = self._channels.get(name)
+            return bool(channel) and (bool(channel['subscribers']) or time.monotonic() - channel['seen_at'] < WATCH_GRACE)
+
+    def replay(self, name, last_id):
+        """Mensagens depois de last_id, ou None se o buffer já não as cobre."""
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is None:
+                return None if last_id else []
+            buffer = channel['buffer']
+            if last_id > channel['last_id'] or (buffer and buffer[0][0] > last_id + 1):
+                return None
+            return [item for item in buffer if item[0] > last_id]
+
+    def last_id(self, name):
+        with self._lock:
+            channel = self._channels.get(name)
+            return channel['last_id'] if channel else 0
+
+    @contextmanager
+    def subscribe(self, name):
+        queue = asyncio.Queue()
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._prune()
+            channel = self._channels.get(name)
+            if channel is None:
+                channel = self._channels[name] = {
+                    'last_id': 0, 'buffer': deque(maxlen=BUFFER_SIZE), 'subscribers': set(), 'seen_at': 0.0,
+                }
+            channel['subscribers'].add(entry)
+            channel['seen_at'] = time.monotonic()
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                channel['subscribers'].discard(entry)
+                channel['seen_at'] = time.monotonic()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'LIVE_BROKER', 'events.live.InProcessBroker'))()
+
+
+def event_channel(event_id):
+    return f'event:{event_id}'
+
+
+# --- Publicação (lado síncrono, chamado pelos serviços de inscrição e check-in) ---
+
+def event_counters(event_id):
+    """Contadores absolutos do painel: vagas do evento e um aggregate nas inscrições dele."""
+    counts = Enrollment.objects.filter(event_id=event_id).aggregate(
+        checked_in=Count('pk', filter=Q(checked_in=True)),
+        waitlisted=Count('pk', filter=Q(status='WAITLISTED')),
+        pending=Count('pk', filter=Q(status='PENDING')),
+    )
+    seats = Event.objects.filter(pk=event_id).values('seats_taken', 'max_enrollments').first() or {}
+    return {**seats, **counts}
+
+
+def publish_event_change(event_id, kind, data):
+    """
+    Depois do commit, publica a mudança e os contadores atualizados do evento.
+    Os contadores só são consultados se alguém está assistindo o canal.
+    """
+    def publish():
+        broker = get_broker()
+        channel = event_channel(event_id)
+        broker.publish(channel, {'type': kind, 'data': data})
+        if broker.is_watched(channel):
+            broker.publish(channel, {'type': 'counters', 'data': event_counters(event_id)})
+
+    transaction.on_commit(publish)
+
+
+# --- Endpoint (ASGI) ---
+
+def _authenticated_user(request):
+    # EventSource não manda cabeçalhos: aceita o JWT também em ?token=
+    token = request.GET.get('token')
+    if token:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    drf_request = authenticate(request)
+    return drf_request and drf_request.user
+
+
+def _organizer_id(event_id):
+    return Event.objects.filter(pk=event_id).values_list('organizer_id', flat=True).first()
+
+
+def _sse(kind, data, message_id=None):
+    head = f'id: {message_id}\n' if message_id is not None else ''
+    return f'{head}event: {kind}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+async def _stream(event_id, last_id):
+    broker = get_broker()
+    channel = event_channel(event_id)
+    with broker.subscribe(channel) as queue:
+        delivered = broker.last_id(channel)
+        replay = broker.replay(channel, last_id) if last_id is not None else None
+        for message_id, message in replay or []:
+            if message_id <= delivered:  # O que veio depois chega pela fila
+                yield _sse(message['type'], message['data'], message_id)
+        # Toda (re)conexão recebe os contadores atuais; depois disso só as mudanças
+        yield _sse('counters', await sync_to_async(event_counters)(event_id), delivered)
+
+        while True:
+            try:
+                message_id, message = await asyncio.wait_for(queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if message_id > delivered:
+                delivered = message_id
+                yield _sse(message['type'], message['data'], message_id)
+
+
+async def _long_poll(event_id, last_id):
+    broker = get_broker()
+    channel = event_channel(event_id)
+    with broker.subscribe(channel) as queue:
+        replay = broker.replay(channel, last_id) if last_id is not None else None
+        if replay is None:
+            # Primeira chamada ou cursor perdido: contadores atuais como ponto de partida
+            counters = await sync_to_async(event_counters)(event_id)
+            return JsonResponse({'last_id': broker.last_id(channel), 'events': [{'type': 'counters', 'data': counters}]})
+
+        if not replay:
+            try:
+                replay = [await asyncio.wait_for(queue.get(), LONG_POLL_TIMEOUT)]
+            except asyncio.TimeoutError:
+                return JsonResponse({'last_id': last_id, 'events': []})
+            while not queue.empty():
+                replay.append(queue.get_nowait())
+
+        return JsonResponse({
+            'last_id': replay[-1][0],
+            'events': [{'id': message_id, **message} for message_id, message in replay if message_id > last_id],
+        })
+
+
+async def event_live(request, pk):
+    """
+    GET /api/events/<pk>/live/ — SSE com eventos 'counters', 'checkin' e 'enrollment'.
+    Com ?transport=poll vira long-poll: devolve o que houver depois de ?last_id=.
+    Só o organizador do evento pode assistir.
+    """
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None or not user.is_authenticated:
+        return JsonResponse({'detail': 'Autenticação necessária.'}, status=401)
+    organizer_id = await sync_to_async(_organizer_id)(pk)
+    if organizer_id is None:
+        return JsonResponse({'detail': 'Não encontrado.'}, status=404)
+    if organizer_id != user.pk:
+        return HttpResponse(status=403)
+
+    raw_last_id = request.GET.get('last_id') or request.headers.get('Last-Event-ID')
+    try:
+        last_id = int(raw_last_id) if raw_last_id else None
+    except ValueError:
+        last_id = None
+
+    if request.GET.get('transport') == 'poll':
+        return await _long_poll(pk, last_id)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'detail': 'SSE requer um servidor ASGI. Use ?transport=poll.', 'transport': 'poll'}, status=400,
+        )
+
+    response = StreamingHttpResponse(_stream(pk, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: não segurar o stream em buffer
+    return response
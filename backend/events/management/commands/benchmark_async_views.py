@@ -0,0 +1,183 @@
+import asyncio
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import User
+from events.models import Certificate, Enrollment, Event
+
+
+def call_wsgi(app, path, query, token):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    response = app(environ, lambda code, headers, exc_info=None: status.append(int(code[:3])))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return status[0]
+
+
+async def call_asgi(app, path, query, token):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    body_sent = False
+    status = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Future()  # Cliente nunca desconecta; o handler cancela ao terminar
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Requisições/s e latência p50/p99 das leituras quentes (feed, detalhe, inscrições, validate_code) "
+        "com C requisições simultâneas: rota do DRF sob WSGI (uma thread por requisição, como gunicorn --threads), "
+        "a mesma rota sob ASGI e a view async de /api/async/ sob ASGI. Chama os handlers WSGI/ASGI do Django "
+        "direto, sem servidor na frente. Usa o banco configurado; os dados são apagados ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requisições por cenário")
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--events', type=int, default=500)
+        parser.add_argument('--enrollments', type=int, default=50, help="Inscrições do participante (lista)")
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help="ms somados a cada consulta, simulando o round-trip de um banco em rede (o SQLite local não espera I/O)",
+        )
+
+    def handle(self, *args, **options):
+        organizer = User.objects.create(username='bench_async_org', email='bench_async_org@eventsync.com')
+        participant = User.objects.create(username='bench_async_user', email='bench_async_user@eventsync.com')
+        try:
+            event, code = self.seed(organizer, participant, options['events'], options['enrollments'])
+            token = str(AccessToken.for_user(participant))
+            wsgi, asgi = get_wsgi_application(), get_asgi_application()
+            if options['db_latency']:
+                self.add_db_latency(options['db_latency'] / 1000)
+
+            routes = [
+                ('Feed', 'events/', 'page_size=20'),
+                ('Detalhe', f'events/{event.pk}/', ''),
+                ('Inscrições', 'enrollments/', ''),
+                ('validate_code', f'certificates/validate_code/{code}/', ''),
+            ]
+            total, concurrency = options['requests'], options['concurrency']
+            self.stdout.write(f"{total} requisições por cenário, {concurrency} simultâneas")
+            for label, route, query in routes:
+                scenarios = [
+                    ('WSGI + DRF', self.run_wsgi, wsgi, f'/api/{route}'),
+                    ('ASGI + DRF', self.run_asgi, asgi, f'/api/{route}'),
+                    ('ASGI + async', self.run_asgi, asgi, f'/api/async/{route}'),
+                ]
+                for name, runner, app, path in scenarios:
+                    runner(app, path, query, token, concurrency, concurrency)  # Aquecimento
+                    elapsed, latencies, statuses = runner(app, path, query, token, total, concurrency)
+                    self.report(f'{label}, {name}', total, elapsed, latencies, statuses)
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark_db_latency')
+            User.objects.filter(pk__in=[organizer.pk, participant.pk]).delete()
+
+    @staticmethod
+    def seed(organizer, participant, events, enrollments):
+        start = timezone.now() + timedelta(days=1)
+        created = Event.objects.bulk_create([
+            Event(
+                organizer=organizer, title=f'Evento {i}', description='-', location_address='Teresina',
+                start_date=start + timedelta(minutes=i), status='PUBLISHED',
+            )
+            for i in range(events)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(event=event, user=participant, status='APPROVED') for event in created[:enrollments]
+        ])
+        certificate = Certificate.objects.create(event=created[0], user=participant, validation_code='BENCHASYNC')
+        return created[0], certificate.validation_code
+
+    @staticmethod
+    def add_db_latency(seconds):
+        def delayed(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        # Toda conexão nova (cada thread WSGI e a thread do ORM async) ganha o atraso
+        def install(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delayed)
+
+        connection_created.connect(install, dispatch_uid='benchmark_db_latency', weak=False)
+
+    @staticmethod
+    def run_wsgi(app, path, query, token, total, concurrency):
+        latencies, statuses = [], []
+        lock = threading.Lock()
+
+        def request(_):
+            started = time.perf_counter()
+            status = call_wsgi(app, path, query, token)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                statuses.append(status)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(request, range(total)))
+        return time.perf_counter() - started, latencies, statuses
+
+    @staticmethod
+    def run_asgi(app, path, query, token, total, concurrency):
+        latencies, statuses = [], []
+
+        async def worker(pending):
+            while pending:
+                pending.pop()
+                started = time.perf_counter()
+                statuses.append(await call_asgi(app, path, query, token))
+                latencies.append(time.perf_counter() - started)
+
+        async def main():
+            pending = list(range(total))
+            await asyncio.gather(*[worker(pending) for _ in range(concurrency)])
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return time.perf_counter() - started, latencies, statuses
+
+    def report(self, label, total, elapsed, latencies, statuses):
+        percentiles = statistics.quantiles(latencies, n=100)
+        errors = sum(status != 200 for status in statuses)
+        line = (
+            f"{label}: {total / elapsed:,.0f} req/s | p50 {percentiles[49] * 1000:.1f} ms "
+            f"| p99 {percentiles[98] * 1000:.1f} ms"
+        )
+        self.stdout.write(self.style.ERROR(f"{line} | {errors} respostas != 200") if errors else line)
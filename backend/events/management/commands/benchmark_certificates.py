@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import User
+from events.models import Certificate, Event
+from events.utils import CertificateTemplate
+
+
+class RedrawnTemplate(CertificateTemplate):
+    """O "antes": o fundo é redesenhado do zero em cada PDF."""
+    def _prerender_background(self):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede certificados/s da renderização de PDF, em emissões avulsas e em lote, "
+        "com o fundo redesenhado em cada PDF e pré-renderizado por evento. Não acessa o banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        organizer = User(first_name='Maria', last_name='Organizadora')
+        start = timezone.now() + timedelta(days=1)
+
+        def make_event(i):
+            return Event(
+                pk=i, organizer=organizer, title=f'Semana de Tecnologia {i}', location_address='Teresina - PI',
+                start_date=start, end_date=start + timedelta(hours=4),
+            )
+
+        def make_certificate(event, i):
+            return Certificate(
+                event=event, user=User(first_name='Participante', last_name=str(i)),
+                validation_code=f'{i:08X}', issue_date=start,
+            )
+
+        # Avulsa: cada certificado de um evento diferente (o template é montado a cada PDF)
+        single = [make_certificate(make_event(i), i) for i in range(count)]
+        # Lote: todos os certificados do mesmo evento (o template é montado uma vez)
+        event = make_event(count + 1)
+        batch = [make_certificate(event, i) for i in range(count)]
+
+        for label, template_class in (('Fundo redesenhado', RedrawnTemplate), ('Fundo pré-renderizado', CertificateTemplate)):
+            started = time.perf_counter()
+            for certificate in single:
+                template_class(*CertificateTemplate.printed_fields(certificate.event)).render(certificate)
+            single_rate = count / (time.perf_counter() - started)
+
+            started = time.perf_counter()
+            template = template_class(*CertificateTemplate.printed_fields(event))
+            for certificate in batch:
+                template.render(certificate)
+            batch_rate = count / (time.perf_counter() - started)
+
+            self.stdout.write(f"{label}: avulsa {single_rate:,.1f} certificados/s | lote {batch_rate:,.1f} certificados/s")
@@ -0,0 +1,107 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import User
+from events.models import Enrollment, Event
+from events.serializers import EnrollmentSerializer
+from events.views import EnrollmentViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o get_queryset antigo (OR + DISTINCT) com o atual sobre N inscrições: "
+        "tempo da consulta no banco e consultas feitas ao serializar uma página. "
+        "Os dados são criados numa transação descartada ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enrollments', type=int, default=1_000_000)
+        parser.add_argument('--events', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--page', type=int, default=50, help="Inscrições serializadas na contagem de consultas")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            organizer, participant, event = self.seed(options['enrollments'], options['events'])
+            self.stdout.write(f"{Enrollment.objects.count():,} inscrições em {options['events']} eventos")
+
+            scenarios = [
+                ('Organizador, lista completa', organizer, None),
+                ('Organizador, ?event_id=', organizer, event.pk),
+                ('Participante, lista completa', participant, None),
+            ]
+            for label, user, event_id in scenarios:
+                legacy_qs = self.legacy_queryset(user, event_id)
+                current_qs = self.current_queryset(user, event_id)
+                legacy = self.measure(legacy_qs, options['repeat'])
+                current = self.measure(current_qs, options['repeat'])
+                self.stdout.write(
+                    f"{label}: banco antigo {legacy * 1000:.1f} ms | atual {current * 1000:.1f} ms; "
+                    f"consultas ao serializar {options['page']}: antigo {self.serializer_queries(legacy_qs, options['page'])} "
+                    f"| atual {self.serializer_queries(current_qs, options['page'])}"
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def legacy_queryset(user, event_id):
+        queryset = Enrollment.objects.filter(Q(user=user) | Q(event__organizer=user)).distinct()
+        if event_id:
+            queryset = queryset.filter(event_id=event_id)
+        return queryset
+
+    @staticmethod
+    def current_queryset(user, event_id):
+        # get_queryset só usa o usuário e os query params da requisição
+        request = SimpleNamespace(user=user, query_params={'event_id': event_id} if event_id else {})
+        return EnrollmentViewSet(action='list', request=request).get_queryset()
+
+    @staticmethod
+    def measure(queryset, repeat):
+        # SQL cru e sem os JOINs do select_related (contados à parte, nas consultas ao serializar):
+        # mede só o plano de acesso às inscrições, sem o custo de montar as instâncias do ORM
+        sql, params = queryset.select_related(None).query.sql_with_params()
+        best = None
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @staticmethod
+    def serializer_queries(queryset, page):
+        with CaptureQueriesContext(connection) as context:
+            EnrollmentSerializer(list(queryset[:page]), many=True).data
+        return len(context.captured_queries)
+
+    def seed(self, total, event_count):
+        per_event = max(total // event_count, 1)
+        start = timezone.now() + timedelta(days=1)
+
+        # Dois eventos por organizador: cada um vê só uma fatia pequena da tabela
+        organizers = User.objects.bulk_create(
+            [User(username=f'bench_org_{i}', email=f'bench_org_{i}@eventsync.com') for i in range(max(event_count // 2, 1))]
+        )
+        events = Event.objects.bulk_create([
+            Event(organizer=organizers[i % len(organizers)], title=f'Evento {i}', description='-',
+                  location_address='-', start_date=start, status='PUBLISHED')
+            for i in range(event_count)
+        ])
+        users = User.objects.bulk_create(
+            [User(username=f'bench_{i}', email=f'bench_{i}@eventsync.com') for i in range(per_event)],
+            batch_size=5000,
+        )
+        for event in events:
+            Enrollment.objects.bulk_create([Enrollment(event=event, user=user) for user in users], batch_size=5000)
+
+        return organizers[0], users[0], events[0]
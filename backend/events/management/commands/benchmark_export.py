@@ -0,0 +1,97 @@
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import User
+from events.exports import EnrollmentExport
+from events.models import Event, Enrollment
+
+EVENT_TITLE = 'Benchmark Export'
+USER_PREFIX = 'bench_'
+
+
+def max_rss_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Mede a exportação em streaming de inscrições (pico de memória e linhas/s). Os dados são descartados ao final."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--xlsx', action='store_true', help="Mede o writer XLSX em vez do CSV.")
+        parser.add_argument('--seed-only', action='store_true', help="Só grava os dados de teste (usado internamente).")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if options['seed_only']:
+            self.clean()
+            with transaction.atomic():
+                self.seed(rows)
+            return
+
+        # A carga roda em outro processo: o ru_maxrss é o pico do processo inteiro
+        # e, semeando aqui, mediria as 100k instâncias de User e não a exportação.
+        seeded = subprocess.run(
+            [sys.executable, '-m', 'django', 'benchmark_export', '--seed-only', '--skip-checks', f'--rows={rows}'],
+            cwd=settings.BASE_DIR,
+        )
+        if seeded.returncode:
+            raise CommandError("Falha ao gravar os dados de teste.")
+
+        try:
+            export = EnrollmentExport(Event.objects.get(title=EVENT_TITLE))
+            rss_before = max_rss_mb()
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            if options['xlsx']:
+                response = export.xlsx_response()
+                written = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                written = sum(len(chunk) for chunk in export.iter_csv())
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            rss_after = max_rss_mb()
+        finally:
+            self.clean()
+
+        self.stdout.write(f"Linhas: {rows} | Bytes: {written}")
+        self.stdout.write(f"Tempo: {elapsed:.2f}s | {rows / elapsed:,.0f} linhas/s")
+        self.stdout.write(
+            f"Pico Python (tracemalloc): {peak / 1024 / 1024:.1f} MB | "
+            f"RSS: pico {rss_after:.1f} MB, +{rss_after - rss_before:.1f} MB durante a exportação"
+        )
+
+    def clean(self):
+        with transaction.atomic():
+            Event.objects.filter(title=EVENT_TITLE, organizer__username=f'{USER_PREFIX}org').delete()
+            User.objects.filter(username__startswith=USER_PREFIX).delete()
+
+    def seed(self, rows):
+        organizer = User.objects.create(username=f'{USER_PREFIX}org', email='bench_org@eventsync.com')
+        event = Event.objects.create(
+            organizer=organizer, title=EVENT_TITLE, description='-',
+            location_address='-', start_date=timezone.now() + timedelta(days=1),
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'{USER_PREFIX}{i}', email=f'bench_{i}@eventsync.com', first_name='Pessoa', last_name=str(i))
+             for i in range(rows)],
+            batch_size=5000,
+        )
+        Enrollment.objects.bulk_create(
+            [Enrollment(event=event, user=user, checked_in=i % 2 == 0, checkin_time=timezone.now() if i % 2 == 0 else None)
+             for i, user in enumerate(users)],
+            batch_size=5000,
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.issuance import run_certificate_batch
+from events.models import CertificateBatch, Event
+
+
+class Command(BaseCommand):
+    help = "Emite e renderiza em lote os certificados de eventos finalizados (retoma lotes interrompidos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help="IDs dos eventos. Sem IDs, retoma os lotes não concluídos.")
+        parser.add_argument('--workers', type=int, default=None, help="Processos de renderização (padrão: nº de CPUs).")
+
+    def handle(self, *args, **options):
+        if options['event_ids']:
+            events = Event.objects.filter(pk__in=options['event_ids'])
+            not_finished = [event.pk for event in events if event.status != 'FINISHED']
+            if not_finished:
+                raise CommandError(f"Eventos não finalizados: {not_finished}")
+            batches = [CertificateBatch.objects.get_or_create(event=event)[0] for event in events]
+        else:
+            batches = list(CertificateBatch.objects.exclude(status=CertificateBatch.Status.DONE).select_related('event'))
+
+        for batch in batches:
+            self.stdout.write(f"Evento {batch.event_id}: {batch.event.title}")
+
+            def progress(rendered, total):
+                self.stdout.write(f"  {rendered}/{total} certificados", ending='\r')
+
+            batch = run_certificate_batch(batch, workers=options['workers'], progress=progress)
+            self.stdout.write(self.style.SUCCESS(f"\n  Concluído: {batch.total} certificados."))
@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import User
+from events.models import Enrollment, Event, SEAT_HOLDING_STATUSES
+from events.views import EnrollmentViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara N inscrições simultâneas num evento com limite de vagas e falha se houver overbooking "
+        "(o excedente deve ir para a lista de espera). "
+        "Usa o banco configurado (rode contra o mesmo banco de produção, ex. PostgreSQL); os dados são apagados ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--capacity', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=32)
+
+    def handle(self, *args, **options):
+        total, capacity = options['requests'], options['capacity']
+
+        organizer = User.objects.create(username='loadtest_org', email='loadtest_org@eventsync.com')
+        event = Event.objects.create(
+            organizer=organizer, title='Load test', description='-', location_address='-',
+            start_date=timezone.now() + timedelta(days=1), status='PUBLISHED', max_enrollments=capacity,
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'loadtest_{i}', email=f'loadtest_{i}@eventsync.com') for i in range(total)]
+        )
+
+        view = EnrollmentViewSet.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+        go = threading.Event()
+
+        def enroll(user):
+            go.wait()  # todas as threads largam juntas
+            request = factory.post('/api/enrollments/', {'event': event.pk}, format='json')
+            force_authenticate(request, user=user)
+            try:
+                return view(request).status_code
+            except Exception as exc:
+                return type(exc).__name__
+            finally:
+                connections.close_all()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                futures = [pool.submit(enroll, user) for user in users]
+                go.set()
+                results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - started
+
+            event.refresh_from_db()
+            enrolled = Enrollment.objects.filter(event=event, status__in=SEAT_HOLDING_STATUSES).count()
+            waitlisted = Enrollment.objects.filter(event=event, status='WAITLISTED').count()
+            outcomes = {outcome: results.count(outcome) for outcome in set(results)}
+
+            self.stdout.write(f"{total} requisições em {elapsed:.2f}s ({total / elapsed:,.0f}/s): {outcomes}")
+            self.stdout.write(f"Inscritos: {enrolled} | Contador: {event.seats_taken} | Limite: {capacity} | Lista de espera: {waitlisted}")
+
+            if enrolled > capacity:
+                raise CommandError(f"Overbooking: {enrolled} inscrições para {capacity} vagas.")
+            if event.seats_taken != enrolled:
+                raise CommandError("Contador de vagas divergente das inscrições criadas.")
+            if outcomes.get(201, 0) != enrolled + waitlisted or event.waitlist_tail != waitlisted:
+                raise CommandError("Inscrições aceitas não batem com vagas + lista de espera.")
+            self.stdout.write(self.style.SUCCESS("Sem overbooking."))
+        finally:
+            event.delete()
+            User.objects.filter(pk__in=[user.pk for user in users] + [organizer.pk]).delete()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from events.models import Enrollment
+from events.waitlist import promote_waitlist
+
+
+class Command(BaseCommand):
+    help = "Promove a lista de espera de todos os eventos com vagas livres (rede de segurança da promoção automática)."
+
+    def handle(self, *args, **options):
+        event_ids = Enrollment.objects.filter(status='WAITLISTED').values_list('event_id', flat=True).distinct()
+        promoted = sum(promote_waitlist(event_id) for event_id in event_ids)
+        self.stdout.write(self.style.SUCCESS(f"{promoted} inscrição(ões) promovida(s)."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.ratings import find_rating_drift, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere os totais de avaliação (Event.review_count/rating_sum/histograma e "
+        "User.organizer_review_count/organizer_rating_sum) com as avaliações e corrige divergências."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Só reporta; sai com erro se houver divergência.")
+        parser.add_argument('--all', action='store_true', help="Recalcula todos os totais do zero, não só os divergentes.")
+
+    def handle(self, *args, **options):
+        drift = find_rating_drift() if options['check'] else rebuild_ratings(everything=options['all'])
+
+        for event_id, stored, real in drift['events']:
+            self.stdout.write(f"Evento {event_id}: gravado {stored}, real {real}")
+        for user_id, stored, real in drift['organizers']:
+            self.stdout.write(f"Organizador {user_id}: gravado {stored}, real {real}")
+
+        total = len(drift['events']) + len(drift['organizers'])
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Totais de avaliação consistentes."))
+        elif options['check']:
+            raise CommandError(f"{total} total(is) divergente(s).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total} total(is) corrigido(s)."))
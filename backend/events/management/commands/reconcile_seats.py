@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.admission import find_seat_drift, reconcile_seats
+
+
+class Command(BaseCommand):
+    help = "Confere o contador de vagas (Event.seats_taken) com as inscrições e corrige divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Só reporta; sai com erro se houver divergência.")
+
+    def handle(self, *args, **options):
+        drift = find_seat_drift() if options['check'] else reconcile_seats()
+
+        for event_id, counter, real in drift:
+            self.stdout.write(f"Evento {event_id}: contador {counter}, inscrições {real}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Contadores de vagas consistentes."))
+        elif options['check']:
+            raise CommandError(f"{len(drift)} evento(s) com contador divergente.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} evento(s) corrigido(s)."))
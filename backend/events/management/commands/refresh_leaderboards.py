@@ -0,0 +1,38 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from events.leaderboard import TOP_N, refresh_leaderboards
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Materializa os rankings de XP (global, por liga e por cidade): o top N de cada um "
+        "e o índice de posições usado por /api/leaderboard/me/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=TOP_N, help="Quantos usuários guardar por ranking.")
+        parser.add_argument('--loop', action='store_true', help="Fica rodando, uma rodada a cada --interval segundos.")
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.tick(options['top'])
+            return
+
+        while True:
+            close_old_connections()
+            try:
+                self.tick(options['top'])
+            except DatabaseError:
+                logger.exception("Falha ao materializar os rankings")
+            time.sleep(options['interval'])
+
+    def tick(self, top):
+        for scope, (entries, buckets) in refresh_leaderboards(top=top).items():
+            self.stdout.write(f"{scope}: {entries} posição(ões) no top, {buckets} faixa(s) de XP.")
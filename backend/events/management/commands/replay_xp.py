@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.gamification import find_xp_drift, replay_xp
+
+
+class Command(BaseCommand):
+    help = "Refaz o XP e a liga dos usuários pela soma do extrato (XpEntry) e corrige divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Só este usuário (repetível).")
+        parser.add_argument('--check', action='store_true', help="Só reporta; sai com erro se houver divergência.")
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        drift = find_xp_drift(user_ids) if options['check'] else replay_xp(user_ids)
+
+        for user_id, xp, ledger_xp in drift:
+            self.stdout.write(f"Usuário {user_id}: XP {xp}, extrato {ledger_xp}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("XP e ligas batem com o extrato."))
+        elif options['check']:
+            raise CommandError(f"{len(drift)} usuário(s) com XP divergente.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} usuário(s) corrigido(s)."))
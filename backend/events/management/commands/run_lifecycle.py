@@ -0,0 +1,40 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from events.lifecycle import LIFECYCLE_BATCH_SIZE, run_lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Inicia os eventos publicados cujo início passou e finaliza os em andamento cujo término passou, "
+        "em lotes. Pode rodar em várias réplicas ao mesmo tempo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Fica rodando, uma rodada a cada --interval segundos.")
+        parser.add_argument('--interval', type=int, default=60)
+        parser.add_argument('--batch-size', type=int, default=LIFECYCLE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.tick(options['batch_size'])
+            return
+
+        while True:
+            close_old_connections()
+            try:
+                self.tick(options['batch_size'])
+            except DatabaseError:
+                # Ex.: SQLite travado por outra réplica; o lote volta na próxima rodada
+                logger.exception("Falha na rodada do ciclo de vida dos eventos")
+            time.sleep(options['interval'])
+
+    def tick(self, batch_size):
+        started, finished = run_lifecycle(batch_size=batch_size)
+        if started or finished or self.verbosity > 1:
+            self.stdout.write(f"{started} evento(s) iniciado(s), {finished} finalizado(s).")
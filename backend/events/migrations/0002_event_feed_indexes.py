@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'start_date'], name='event_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'start_date'], name='event_organizer_start_idx'),
+        ),
+    ]
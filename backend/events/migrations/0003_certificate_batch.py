@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_certificates(apps, schema_editor):
+    # Downloads concorrentes podiam emitir dois certificados para a mesma inscrição:
+    # fica o mais antigo, cujo código de validação foi o primeiro a circular
+    Certificate = apps.get_model('events', 'Certificate')
+    duplicated = (
+        Certificate.objects.values('event_id', 'user_id').annotate(total=Count('pk')).filter(total__gt=1)
+        .values_list('event_id', 'user_id')
+    )
+    for event_id, user_id in list(duplicated):
+        keep, *extra = (
+            Certificate.objects.filter(event_id=event_id, user_id=user_id)
+            .order_by('issue_date', 'pk').values_list('pk', flat=True)
+        )
+        Certificate.objects.filter(pk__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_certificates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='certificate',
+            unique_together={('event', 'user')},
+        ),
+        migrations.CreateModel(
+            name='CertificateBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Na fila'), ('RUNNING', 'Em processamento'), ('DONE', 'Concluído'), ('FAILED', 'Falhou')], default='PENDING', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('rendered', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='certificate_batch', to='events.event')),
+            ],
+        ),
+    ]
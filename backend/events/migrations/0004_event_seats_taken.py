@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:12
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_seats_taken(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Enrollment = apps.get_model('events', 'Enrollment')
+    counts = (
+        Enrollment.objects.filter(event=OuterRef('pk'), status__in=['APPROVED', 'PENDING', 'AWAITING_PAYMENT'])
+        .order_by().values('event').annotate(total=Count('pk')).values('total')
+    )
+    Event.objects.update(seats_taken=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_certificate_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_seats_taken, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_seats_taken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='waitlist_position',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_tail',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pendente'), ('APPROVED', 'Aprovada'), ('REJECTED', 'Recusada'), ('CANCELED', 'Cancelada pelo usuário'), ('WAITLISTED', 'Lista de espera')], default='APPROVED', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(condition=models.Q(('status', 'WAITLISTED')), fields=['event', 'waitlist_position'], name='enrollment_waitlist_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_enrollment_waitlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['user', 'event'], name='enrollment_user_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['event', 'status'], name='enrollment_event_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['event', 'checked_in'], name='enrollment_event_checkin_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:23
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
+
+
+def fill_review_totals(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Review = apps.get_model('events', 'Review')
+    User = apps.get_model('core', 'User')
+
+    def totals(reviews, group_by):
+        reviews = reviews.order_by().values(group_by)
+        return (
+            Coalesce(Subquery(reviews.annotate(t=Count('pk')).values('t'), output_field=IntegerField()), Value(0)),
+            Coalesce(Subquery(reviews.annotate(t=Sum('rating')).values('t'), output_field=IntegerField()), Value(0)),
+        )
+
+    count, total = totals(Review.objects.filter(event=OuterRef('pk')), 'event')
+    Event.objects.update(review_count=count, rating_sum=total)
+
+    count, total = totals(Review.objects.filter(event__organizer=OuterRef('pk')), 'event__organizer')
+    User.objects.update(organizer_review_count=count, organizer_rating_sum=total)
+    User.objects.update(organizer_rating=Case(
+        When(GreaterThan(F('organizer_review_count'), 0),
+             then=Round(Cast('organizer_rating_sum', FloatField()) / F('organizer_review_count'), 1)),
+        default=Value(0.0), output_field=FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_organizer_rating_totals'),
+        ('events', '0006_enrollment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_review_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:25
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_histogram(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Review = apps.get_model('events', 'Review')
+    histogram = {}
+    for rating in range(1, 6):
+        counts = (
+            Review.objects.filter(event=OuterRef('pk'), rating=rating)
+            .order_by().values('event').annotate(total=Count('pk')).values('total')
+        )
+        histogram[f'rating_{rating}_count'] = Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+    Event.objects.update(**histogram)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_review_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['event', '-created_at', '-id'], name='review_event_created_idx'),
+        ),
+        migrations.RunPython(fill_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_review_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'end_date'], name='event_status_end_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_status_end_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='enrollment',
+            name='enrollment_event_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['event', 'status', 'user'], name='enrollment_event_status_idx'),
+        ),
+    ]
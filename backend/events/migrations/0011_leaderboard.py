@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_enrollment_attendee_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('xp', models.PositiveIntegerField()),
+                ('users', models.PositiveIntegerField()),
+                ('above', models.PositiveIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key', 'xp'), name='leaderboard_bucket_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('rank', models.PositiveIntegerField()),
+                ('xp', models.PositiveIntegerField()),
+                ('refreshed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'key', 'rank', 'user'], name='leaderboard_entry_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key', 'user'), name='leaderboard_entry_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Cópia de events.gamification.LEAGUES neste momento
+LEAGUES = [
+    (10000, 'CEO dos Eventos'), (6000, 'Mestre dos Eventos'), (3500, 'Diamante'), (2000, 'Platina'),
+    (1000, 'Ouro'), (500, 'Prata'), (200, 'Bronze'), (0, 'Novato'),
+]
+
+
+def open_ledger(apps, schema_editor):
+    # O XP de hoje vira o saldo de abertura do extrato; a liga é recalculada pela tabela única
+    User = apps.get_model('core', 'User')
+    XpEntry = apps.get_model('events', 'XpEntry')
+    users = User.objects.filter(xp__gt=0).values_list('pk', 'xp')
+    XpEntry.objects.bulk_create(
+        (XpEntry(user_id=pk, amount=xp, reason='OPENING', key=f'opening:{pk}') for pk, xp in users.iterator()),
+        batch_size=1000,
+    )
+    upper = None
+    for minimum, league in LEAGUES:
+        matched = User.objects.filter(xp__gte=minimum)
+        if upper is not None:
+            matched = matched.filter(xp__lt=upper)
+        matched.exclude(league=league).update(league=league)
+        upper = minimum
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_league_default'),
+        ('events', '0011_leaderboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XpEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('OPENING', 'Saldo anterior ao extrato'), ('EVENT_FINISHED', 'Evento finalizado'), ('REVIEW', 'Avaliação recebida'), ('ADJUSTMENT', 'Ajuste')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'amount'], name='xp_entry_user_amount_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
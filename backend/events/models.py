@@ -5,6 +5,67 @@ import uuid
 
 User = settings.AUTH_USER_MODEL
 
+# Status de inscrição que ocupam uma vaga do evento
+SEAT_HOLDING_STATUSES = ['APPROVED', 'PENDING', 'AWAITING_PAYMENT']
+
+# Status que aparecem no feed da Home
+FEED_STATUSES = ['DRAFT', 'PUBLISHED', 'IN_PROGRESS']
+
+class EventQuerySet(models.QuerySet):
+    def feed(self):
+        """Eventos do feed (rotas síncrona e async). Filtro positivo para usar o índice (status, start_date)."""
+        return self.filter(status__in=FEED_STATUSES).order_by('start_date', 'id')
+
+    def organized_by(self, user, pk):
+        """O evento `pk`, se `user` é o organizador dele (use .exists() ou .aexists())."""
+        return self.filter(pk=pk, organizer=user)
+
+    def with_viewer_state(self, user):
+        """
+        Anota em cada evento o estado do usuário (inscrição, check-in e avaliação),
+        tudo na mesma query do feed.
+        """
+        queryset = self.select_related('organizer')
+        if not user.is_authenticated:
+            return queryset
+
+        viewer_enrollments = Enrollment.objects.filter(event=models.OuterRef('pk'), user=user)
+        return queryset.annotate(
+            viewer_enrollment_status=models.Subquery(viewer_enrollments.values('status')[:1]),
+            viewer_has_checkin=models.Exists(viewer_enrollments.filter(checked_in=True)),
+            viewer_has_review=models.Exists(
+                Review.objects.filter(event=models.OuterRef('pk'), user=user)
+            ),
+        )
+
+class EnrollmentQuerySet(models.QuerySet):
+    def visible_to(self, user, event_id=None, organizes_event=False):
+        """
+        Lista de inscrições que `user` pode ver (EnrollmentViewSet e a rota async).
+        Com event_id: todos os inscritos se ele organiza o evento (conferido antes,
+        com Event.objects.organized_by, para a rota async poder usar aexists) ou
+        só a inscrição dele, cada caso pelo seu índice. Sem event_id: minhas
+        inscrições UNION inscritos dos meus eventos, em vez de OR + DISTINCT.
+        """
+        if event_id:
+            if organizes_event:
+                return self.filter(event_id=event_id)
+            return self.filter(user=user, event_id=event_id)
+        mine = Enrollment.objects.filter(user=user).values('pk')
+        attendees = Enrollment.objects.filter(event__organizer=user).values('pk')
+        return self.filter(pk__in=mine.union(attendees))
+
+    def with_related_state(self):
+        """
+        Evento e participante no mesmo JOIN e a avaliação anotada com Exists,
+        para o EnrollmentSerializer não fazer nenhuma consulta por linha.
+        """
+        return self.select_related('event', 'user').annotate(
+            user_has_review=models.Exists(
+                Review.objects.filter(event=models.OuterRef('event'), user=models.OuterRef('user'))
+            ),
+        )
+
 class Event(models.Model):
     class Status(models.TextChoices):
         DRAFT = 'DRAFT', 'Rascunho'
@@ -23,11 +84,31 @@ class Event(models.Model):
     # Configurações
     max_enrollments = models.PositiveIntegerField(null=True, blank=True)
     requires_approval = models.BooleanField(default=False) # Se True, inscrição nasce PENDENTE
+    seats_taken = models.PositiveIntegerField(default=0) # Vagas ocupadas, mantido por events.admission
+    waitlist_tail = models.PositiveIntegerField(default=0) # Última posição distribuída na lista de espera
+    review_count = models.PositiveIntegerField(default=0) # Totais das avaliações, mantidos por events.ratings
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0) # Histograma: avaliações por nota
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.DRAFT)
     
     banner = models.ImageField(upload_to='event_banners/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Feed (status + ordenação por data) e "meus eventos" do organizador
+            models.Index(fields=['status', 'start_date'], name='event_status_start_idx'),
+            models.Index(fields=['organizer', 'start_date'], name='event_organizer_start_idx'),
+            # Eventos em andamento com término vencido (events.lifecycle)
+            models.Index(fields=['status', 'end_date'], name='event_status_end_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -37,11 +118,13 @@ class Enrollment(models.Model):
         APPROVED = 'APPROVED', 'Aprovada' # Confirmado, gera QR Code
         REJECTED = 'REJECTED', 'Recusada'
         CANCELED = 'CANCELED', 'Cancelada pelo usuário'
+        WAITLISTED = 'WAITLISTED', 'Lista de espera' # Evento lotado, aguardando vaga
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='enrollments')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.APPROVED)
+    waitlist_position = models.PositiveIntegerField(null=True, blank=True) # Ordem de chegada na fila (FIFO)
     
     # Controle de Presença
     checked_in = models.BooleanField(default=False)
@@ -49,8 +132,23 @@ class Enrollment(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ('event', 'user')
+        indexes = [
+            # "Minhas inscrições" (a unique acima já cobre (event, user))
+            models.Index(fields=['user', 'event'], name='enrollment_user_event_idx'),
+            # Inscritos do evento por status e presença (painel do organizador, exportação, vagas).
+            # O user no fim serve a descoberta de participantes (social): JOIN e ordem sem ler a tabela
+            models.Index(fields=['event', 'status', 'user'], name='enrollment_event_status_idx'),
+            models.Index(fields=['event', 'checked_in'], name='enrollment_event_checkin_idx'),
+            # Cabeça da lista de espera de um evento
+            models.Index(
+                fields=['event', 'waitlist_position'], condition=models.Q(status='WAITLISTED'),
+                name='enrollment_waitlist_idx',
+            ),
+        ]
 
 class Review(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reviews')
@@ -61,6 +159,10 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('event', 'user') # Usuário só avalia 1 vez por evento
+        indexes = [
+            # Avaliações do evento, mais recentes primeiro (paginação por cursor)
+            models.Index(fields=['event', '-created_at', '-id'], name='review_event_created_idx'),
+        ]
 
 class Certificate(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -69,5 +171,93 @@ class Certificate(models.Model):
     issue_date = models.DateTimeField(auto_now_add=True)
     validation_code = models.CharField(max_length=50, unique=True) # Hash para validar
 
+    class Meta:
+        unique_together = ('event', 'user') # Um certificado por participante
+
+    def __str__(self):
+        return f"Certificado {self.user} - {self.event}"
+
+class CertificateBatch(models.Model):
+    """Progresso da emissão em lote dos certificados de um evento finalizado."""
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Na fila'
+        RUNNING = 'RUNNING', 'Em processamento'
+        DONE = 'DONE', 'Concluído'
+        FAILED = 'FAILED', 'Falhou'
+
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='certificate_batch')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    total = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Lote de certificados - {self.event}"
+
+class LeaderboardEntry(models.Model):
+    """Top N de um ranking, materializado por events.leaderboard.refresh_leaderboards."""
+    scope = models.CharField(max_length=20) # 'global', 'league' ou 'city'
+    key = models.CharField(max_length=100, blank=True) # Liga ou cidade; vazio no global
+    rank = models.PositiveIntegerField() # Empatados no XP dividem a posição (1, 2, 2, 4)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    xp = models.PositiveIntegerField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key', 'user'], name='leaderboard_entry_unique'),
+        ]
+        indexes = [
+            # Página do ranking: range em (scope, key) já na ordem
+            models.Index(fields=['scope', 'key', 'rank', 'user'], name='leaderboard_entry_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} #{self.rank} - {self.user_id}"
+
+class LeaderboardBucket(models.Model):
+    """
+    Índice de posições de um ranking: para cada valor de XP, quantos usuários
+    têm exatamente esse XP e quantos estão acima. A posição de qualquer usuário
+    sai de uma busca no índice único, sem contar a tabela de usuários.
+    """
+    scope = models.CharField(max_length=20)
+    key = models.CharField(max_length=100, blank=True)
+    xp = models.PositiveIntegerField()
+    users = models.PositiveIntegerField()
+    above = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key', 'xp'], name='leaderboard_bucket_unique'),
+        ]
+
+class XpEntry(models.Model):
+    """
+    Extrato de XP (events.gamification): só recebe inserts. User.xp é a soma
+    das entradas do usuário e pode ser refeito a partir dela (replay_xp).
+    """
+    class Reason(models.TextChoices):
+        OPENING = 'OPENING', 'Saldo anterior ao extrato'
+        EVENT_FINISHED = 'EVENT_FINISHED', 'Evento finalizado'
+        REVIEW = 'REVIEW', 'Avaliação recebida'
+        ADJUSTMENT = 'ADJUSTMENT', 'Ajuste'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='xp_entries')
+    amount = models.IntegerField() # Negativo em estornos (avaliação alterada ou apagada) e ajustes
+    reason = models.CharField(max_length=20, choices=Reason.choices)
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Evita lançar duas vezes a mesma coisa (ex.: 'finish:<evento>', 'review:<avaliação>')
+    key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Saldo por usuário (replay_xp) lido só do índice
+            models.Index(fields=['user', 'amount'], name='xp_entry_user_amount_idx'),
+        ]
+
     def __str__(self):
-        return f"Certificado {self.user} - {self.event}"
\ No newline at end of file
+        return f"{self.user_id}: {self.amount:+d} XP ({self.reason})"
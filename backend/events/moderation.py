@@ -0,0 +1,141 @@
+"""
+Moderação em lote das inscrições de um evento pelo organizador: aprovar ou
+rejeitar uma lista de ids, ou tudo o que casar com um filtro (ex.: todas as
+PENDING criadas antes de T), sem uma requisição por inscrição.
+"""
+import uuid
+
+from django.db import transaction
+from django.db.models import F
+
+from core.notifications import notify
+from core.tasks import task
+from .live import publish_event_change
+from .models import Enrollment, Event, SEAT_HOLDING_STATUSES
+from .waitlist import schedule_waitlist_promotion
+
+MAX_IDS = 5000
+
+APPROVE = 'approve'
+REJECT = 'reject'
+
+TARGET_STATUS = {APPROVE: 'APPROVED', REJECT: 'REJECTED'}
+# De onde cada ação pode mover a inscrição (CANCELED é decisão do participante)
+SOURCE_STATUSES = {
+    APPROVE: ['PENDING', 'WAITLISTED', 'REJECTED'],
+    REJECT: ['PENDING', 'WAITLISTED', 'APPROVED'],
+}
+
+# Resultados por item
+APPROVED = 'approved'
+REJECTED = 'rejected'
+UNCHANGED = 'unchanged'
+NO_SEATS = 'no_seats'
+NOT_ALLOWED = 'not_allowed'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+DONE = {APPROVE: APPROVED, REJECT: REJECTED}
+
+MESSAGES = {
+    APPROVE: ('Inscrição aprovada!', 'Sua inscrição em "{title}" foi aprovada pelo organizador.'),
+    REJECT: ('Inscrição recusada', 'Sua inscrição em "{title}" não foi aprovada pelo organizador.'),
+}
+
+
+@task()
+def notify_moderated(user_ids, title, message):
+    """Avisa os participantes moderados, em blocos de bulk_create."""
+    return notify(user_ids, title, message)
+
+
+def parse_ids(ids):
+    """[(id recebido, UUID ou None)] na ordem recebida."""
+    parsed = []
+    for raw_id in ids:
+        try:
+            parsed.append((raw_id, uuid.UUID(str(raw_id))))
+        except ValueError:
+            parsed.append((raw_id, None))
+    return parsed
+
+
+def moderate(event, action, ids=None, status=None, created_before=None):
+    """
+    Aplica `action` (APPROVE/REJECT) às inscrições do evento informadas em `ids`
+    ou, sem ids, às que têm `status` (e foram criadas antes de `created_before`),
+    até MAX_IDS por chamada.
+    A posse do evento é conferida antes, por quem chama.
+
+    Evento e inscrições ficam travados enquanto um único UPDATE grava a mudança
+    e outro acerta Event.seats_taken. Aprovar quem não ocupa vaga (lista de
+    espera, rejeitado) consome vagas até o limite, na ordem recebida (no filtro,
+    a ordem da fila); o resto volta como 'no_seats'. Rejeitar quem ocupava vaga
+    libera e agenda a promoção da lista de espera. Os avisos saem depois, pela
+    fila de tarefas. Retorna [{'id', 'result'}].
+    """
+    target = TARGET_STATUS[action]
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        enrollments = Enrollment.objects.select_for_update().filter(event=event)
+
+        if ids is not None:
+            parsed = parse_ids(ids)
+            wanted = list(dict.fromkeys(enrollment_id for _, enrollment_id in parsed if enrollment_id))
+            found = {
+                row['id']: row for row in enrollments.filter(pk__in=wanted).values('id', 'user_id', 'status', 'checked_in')
+            }
+            rows = [found[enrollment_id] for enrollment_id in wanted if enrollment_id in found]
+        else:
+            matched = enrollments.filter(status=status)
+            if created_before is not None:
+                matched = matched.filter(created_at__lt=created_before)
+            rows = list(
+                matched.order_by(F('waitlist_position').asc(nulls_last=True), 'created_at')
+                .values('id', 'user_id', 'status', 'checked_in')[:MAX_IDS]
+            )
+
+        results = {}
+        changed = []
+        seats_needed = []
+        for row in rows:
+            if row['status'] == target:
+                results[row['id']] = UNCHANGED
+            elif row['status'] not in SOURCE_STATUSES[action] or (action == REJECT and row['checked_in']):
+                results[row['id']] = NOT_ALLOWED
+            elif action == APPROVE and row['status'] not in SEAT_HOLDING_STATUSES:
+                seats_needed.append(row)
+            else:
+                results[row['id']] = DONE[action]
+                changed.append(row)
+
+        if seats_needed:
+            # Sem limite (max_enrollments vazio ou 0), como em admission.HAS_ROOM
+            if event.max_enrollments:
+                free = max(event.max_enrollments - event.seats_taken, 0)
+            else:
+                free = len(seats_needed)
+            for index, row in enumerate(seats_needed):
+                results[row['id']] = DONE[action] if index < free else NO_SEATS
+            changed += seats_needed[:free]
+
+        if changed:
+            Enrollment.objects.filter(pk__in=[row['id'] for row in changed]).update(status=target, waitlist_position=None)
+
+            held = sum(row['status'] in SEAT_HOLDING_STATUSES for row in changed)
+            holds = len(changed) if target in SEAT_HOLDING_STATUSES else 0
+            if holds != held:
+                Event.objects.filter(pk=event.pk).update(seats_taken=F('seats_taken') + holds - held)
+            if held > holds:
+                schedule_waitlist_promotion(event.pk)
+
+            publish_event_change(event.pk, 'enrollment', {'ids': [str(row['id']) for row in changed], 'status': target})
+            title, message = MESSAGES[action]
+            notify_moderated.enqueue([row['user_id'] for row in changed], title, message.format(title=event.title))
+
+    if ids is None:
+        return [{'id': str(row['id']), 'result': results[row['id']]} for row in rows]
+    return [
+        {'id': str(raw_id), 'result': results.get(enrollment_id, NOT_FOUND) if enrollment_id else INVALID}
+        for raw_id, enrollment_id in parsed
+    ]
@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class EventFeedPagination(CursorPagination):
+    """Paginação por cursor (keyset) do feed, estável em (start_date, id)."""
+    ordering = ('start_date', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EventReviewPagination(CursorPagination):
+    """Avaliações de um evento, mais recentes primeiro (índice review_event_created_idx)."""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class LeaderboardPagination(CursorPagination):
+    """Top N materializado de um ranking, na ordem do índice leaderboard_entry_rank_idx."""
+    ordering = ('rank', 'user_id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
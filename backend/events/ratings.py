@@ -0,0 +1,172 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
+
+from core.models import User
+from .gamification import settle_review_xp
+from .models import Event, Review
+
+
+RATINGS = range(1, 6)
+
+
+def histogram_field(rating):
+    return f'rating_{rating}_count'
+
+
+def organizer_rating_expression(count, total):
+    """Média com uma casa, calculada pelo banco a partir dos totais (0 sem avaliações)."""
+    return Case(
+        When(GreaterThan(count, 0), then=Round(Cast(total, FloatField()) / count, 1)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _shift(event_id, removed=None, added=None):
+    """
+    Tira a nota `removed` e/ou soma a nota `added` nos totais do evento (com o
+    histograma) e do organizador, com UPDATEs de F() (sem ler antes).
+    """
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+
+    event_changes = {
+        'review_count': F('review_count') + count_delta,
+        'rating_sum': F('rating_sum') + sum_delta,
+    }
+    if removed is not None:
+        event_changes[histogram_field(removed)] = F(histogram_field(removed)) - 1
+    if added is not None:
+        event_changes[histogram_field(added)] = F(histogram_field(added)) + 1
+    Event.objects.filter(pk=event_id).update(**event_changes)
+
+    count = F('organizer_review_count') + count_delta
+    total = F('organizer_rating_sum') + sum_delta
+    User.objects.filter(events_created=event_id).update(
+        organizer_review_count=count,
+        organizer_rating_sum=total,
+        organizer_rating=organizer_rating_expression(count, total),
+    )
+
+
+def shift_review_totals(event_id, before, after):
+    """
+    Aplica uma mudança de avaliação nos totais do evento. `before` e `after` são
+    a nota antes e depois, ou None na criação/exclusão (o evento de uma
+    avaliação não muda). Chamar na mesma transação que grava a avaliação.
+    """
+    if before != after:
+        _shift(event_id, removed=before, added=after)
+
+
+def rating_stats(event):
+    """Resumo das avaliações do evento, lido dos totais já carregados (nenhuma consulta)."""
+    return {
+        'average': round(event.rating_sum / event.review_count, 1) if event.review_count else None,
+        'count': event.review_count,
+        'histogram': {str(rating): getattr(event, histogram_field(rating)) for rating in RATINGS},
+    }
+
+
+def _settle_xp(review_id, event_id):
+    # O XP do organizador acompanha a nota pelo extrato, na fila de tarefas (events.gamification)
+    organizer_id = Event.objects.filter(pk=event_id).values_list('organizer_id', flat=True).get()
+    settle_review_xp.enqueue(review_id, organizer_id, event_id)
+
+
+def create_review(serializer, **extra):
+    with transaction.atomic():
+        review = serializer.save(**extra)
+        shift_review_totals(review.event_id, None, review.rating)
+        _settle_xp(review.pk, review.event_id)
+    return review
+
+
+def update_review(serializer):
+    with transaction.atomic():
+        before = Review.objects.select_for_update().values_list('rating', flat=True).get(pk=serializer.instance.pk)
+        review = serializer.save()
+        shift_review_totals(review.event_id, before, review.rating)
+        if before != review.rating:
+            _settle_xp(review.pk, review.event_id)
+    return review
+
+
+def delete_review(review):
+    with transaction.atomic():
+        review_id = review.pk
+        event_id, before = Review.objects.select_for_update().values_list('event_id', 'rating').get(pk=review_id)
+        review.delete()
+        shift_review_totals(event_id, before, None)
+        _settle_xp(review_id, event_id)
+
+
+def _total(reviews, group_by, aggregate):
+    reviews = reviews.order_by().values(group_by).annotate(total=aggregate).values('total')
+    return Coalesce(Subquery(reviews, output_field=IntegerField()), Value(0))
+
+
+def event_totals():
+    """Campo do evento -> subconsulta que recalcula o valor a partir das avaliações."""
+    reviews = Review.objects.filter(event=OuterRef('pk'))
+    totals = {
+        'review_count': _total(reviews, 'event', Count('pk')),
+        'rating_sum': _total(reviews, 'event', Sum('rating')),
+    }
+    for rating in RATINGS:
+        totals[histogram_field(rating)] = _total(reviews.filter(rating=rating), 'event', Count('pk'))
+    return totals
+
+
+def organizer_totals():
+    reviews = Review.objects.filter(event__organizer=OuterRef('pk'))
+    return {
+        'organizer_review_count': _total(reviews, 'event__organizer', Count('pk')),
+        'organizer_rating_sum': _total(reviews, 'event__organizer', Sum('rating')),
+    }
+
+
+def _drift(queryset, totals):
+    """Linhas com algum total divergente: [(pk, valores gravados, valores reais)]."""
+    real = {f'real_{field}': expression for field, expression in totals.items()}
+    diverges = Q()
+    for field in totals:
+        diverges |= ~Q(**{field: F(f'real_{field}')})
+    rows = queryset.annotate(**real).filter(diverges).values_list('pk', *totals, *real)
+    size = len(totals)
+    return [(row[0], row[1:size + 1], row[size + 1:]) for row in rows]
+
+
+def find_rating_drift():
+    """
+    Eventos e organizadores cujos totais divergem das avaliações:
+    {'events': [(id, gravado, real)], 'organizers': [...]}, com os valores na
+    ordem de event_totals() e organizer_totals().
+    """
+    return {
+        'events': _drift(Event.objects.all(), event_totals()),
+        'organizers': _drift(User.objects.all(), organizer_totals()),
+    }
+
+
+def rebuild_ratings(everything=False):
+    """
+    Recalcula os totais a partir das avaliações, só nas linhas divergentes
+    (ou em todas, com everything=True). Retorna as divergências encontradas.
+    """
+    drift = find_rating_drift()
+    events = Event.objects.all()
+    organizers = User.objects.all()
+    if not everything:
+        events = events.filter(pk__in=[pk for pk, _, _ in drift['events']])
+        organizers = organizers.filter(pk__in=[pk for pk, _, _ in drift['organizers']])
+
+    with transaction.atomic():
+        events.update(**event_totals())
+        organizers.update(**organizer_totals())
+        organizers.update(organizer_rating=organizer_rating_expression(
+            F('organizer_review_count'), F('organizer_rating_sum')
+        ))
+    return drift
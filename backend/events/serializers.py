@@ -1,8 +1,27 @@
+from urllib.parse import urljoin
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from .models import Event, Enrollment, Review, Certificate
+from .models import Event, Enrollment, LeaderboardEntry, Review, Certificate
+from .ratings import RATINGS, histogram_field, rating_stats
 from django.utils import timezone
 
+
+def stored_file_url(field_file):
+    """
+    URL de um arquivo enviado. No storage local é só MEDIA_URL + nome, montado aqui
+    sem passar pelo storage; nos outros (S3 etc.) a URL continua vindo dele.
+    """
+    if not field_file:
+        return None
+    storage = field_file.storage
+    if isinstance(storage, FileSystemStorage):
+        return urljoin(storage.base_url, filepath_to_uri(field_file.name).lstrip('/'))
+    try: return field_file.url
+    except Exception: return None
+
 class EventSerializer(serializers.ModelSerializer):
     organizer_name = serializers.ReadOnlyField(source='organizer.first_name')
     is_enrolled = serializers.SerializerMethodField()
@@ -11,6 +30,7 @@ class EventSerializer(serializers.ModelSerializer):
     can_review = serializers.SerializerMethodField()
 
     current_enrollments_count = serializers.SerializerMethodField()
+    rating_stats = serializers.SerializerMethodField()
 
     def validate_start_date(self, value):
         """
@@ -26,26 +46,40 @@ class EventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = '__all__'
+        # Contadores internos: expostos como current_enrollments_count e rating_stats (a fila de espera, não)
+        exclude = ['seats_taken', 'waitlist_tail', 'review_count', 'rating_sum', *[histogram_field(rating) for rating in RATINGS]]
         read_only_fields = ['organizer', 'status', 'created_at']
+
+    def update(self, instance, validated_data):
+        # Só os campos enviados: um save() completo gravaria de volta os contadores lidos
+        # no início da requisição (vagas, fila de espera, avaliações), mantidos com F() em outros módulos
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
     
     def get_current_enrollments_count(self, obj):
         """Retorna o número de inscrições que consomem capacidade."""
-        # Esta lógica deve ser idêntica à validação no EnrollmentSerializer
-        return Enrollment.objects.filter(
-            event=obj, 
-            status__in=['APPROVED', 'PENDING', 'AWAITING_PAYMENT']
-        ).count()
+        # Contador mantido por events.admission na mesma transação de cada inscrição
+        return obj.seats_taken
+
+    def get_rating_stats(self, obj):
+        """Média, total e histograma 1-5 das avaliações, dos totais mantidos por events.ratings."""
+        return rating_stats(obj)
 
     def get_is_enrolled(self, obj):
         user = self.context['request'].user
         if user.is_authenticated:
+            if hasattr(obj, 'viewer_enrollment_status'):
+                return obj.viewer_enrollment_status is not None
             return Enrollment.objects.filter(user=user, event=obj).exists()
         return False
 
     def get_enrollment_status(self, obj):
         user = self.context['request'].user
         if user.is_authenticated:
+            if hasattr(obj, 'viewer_enrollment_status'):
+                return obj.viewer_enrollment_status
             enrollment = Enrollment.objects.filter(user=user, event=obj).first()
             return enrollment.status if enrollment else None
         return None
@@ -53,6 +87,8 @@ class EventSerializer(serializers.ModelSerializer):
     def get_has_checkin(self, obj):
         user = self.context['request'].user
         if user.is_authenticated:
+            if hasattr(obj, 'viewer_has_checkin'):
+                return obj.viewer_has_checkin
             return Enrollment.objects.filter(user=user, event=obj, checked_in=True).exists()
         return False
         
@@ -61,8 +97,12 @@ class EventSerializer(serializers.ModelSerializer):
         if not user.is_authenticated: return False
         
         # Regra: Acabou + Tem Check-in + NÃO avaliou ainda
-        has_checkin = Enrollment.objects.filter(user=user, event=obj, checked_in=True).exists()
-        already_reviewed = Review.objects.filter(user=user, event=obj).exists()
+        if hasattr(obj, 'viewer_has_review'):
+            has_checkin = obj.viewer_has_checkin
+            already_reviewed = obj.viewer_has_review
+        else:
+            has_checkin = Enrollment.objects.filter(user=user, event=obj, checked_in=True).exists()
+            already_reviewed = Review.objects.filter(user=user, event=obj).exists()
         
         return (obj.status == 'FINISHED') and has_checkin and not already_reviewed
 
@@ -88,19 +128,7 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         if Enrollment.objects.filter(event=event, user=self.context['request'].user).exists():
             raise ValidationError("Você já se inscreveu neste evento.")
 
-        # 2. Checa o Limite de Vagas
-        max_limit = event.max_enrollments
-        
-        if max_limit is not None and max_limit > 0:
-            # Conta apenas inscrições que não foram CANCELADAS ou RECUSADAS
-            current_count = Enrollment.objects.filter(
-                event=event, 
-                status__in=['APPROVED', 'PENDING', 'AWAITING_PAYMENT'] # Assumindo esses status contam para a capacidade
-            ).count()
-            
-            if current_count >= max_limit:
-                # Retorna o erro 400 Bad Request com mensagem detalhada
-                raise ValidationError("As vagas para este evento esgotaram. Tente se inscrever mais tarde.")
+        # 2. Limite de Vagas: com o evento lotado a inscrição vai para a lista de espera (events.admission)
         
         return data
 
@@ -109,10 +137,10 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'user_name', 'user_email', 'user_photo',
             'event', 'event_title', 'event_date', 'event_end_date', 'event_location', 
-            'status', 'created_at', 'checked_in', 'checkin_time', 'event_status',
+            'status', 'waitlist_position', 'created_at', 'checked_in', 'checkin_time', 'event_status',
             'has_review'
         ]
-        read_only_fields = ['user', 'status', 'checked_in', 'checkin_time']
+        read_only_fields = ['user', 'status', 'waitlist_position', 'checked_in', 'checkin_time']
     
     def create(self, validated_data):
         # GARANTIA: Injeta o usuário logado (request.user)
@@ -124,14 +152,19 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def get_user_photo(self, obj):
-        if obj.user.photo:
-            try: return obj.user.photo.url
-            except: return None
-        return None
+        return stored_file_url(obj.user.photo)
         
     # Lógica para saber se já avaliou
     def get_has_review(self, obj):
-        return Review.objects.filter(user=obj.user, event=obj.event).exists()
+        # Anotado por Enrollment.objects.with_related_state()
+        if hasattr(obj, 'user_has_review'):
+            return obj.user_has_review
+        return Review.objects.filter(user_id=obj.user_id, event_id=obj.event_id).exists()
+
+class ModerationFilterSerializer(serializers.Serializer):
+    # Filtro da moderação em lote (EnrollmentViewSet.moderate)
+    status = serializers.ChoiceField(choices=Enrollment.Status.choices, default='PENDING')
+    created_before = serializers.DateTimeField(required=False)
 
 class ReviewSerializer(serializers.ModelSerializer):
     user_name = serializers.ReadOnlyField(source='user.first_name')
@@ -141,6 +174,12 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'user_name', 'event', 'rating', 'comment', 'created_at']
         read_only_fields = ['user', 'created_at']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # O evento só é escolhido na criação, onde a elegibilidade é checada (check-in, evento finalizado)
+        if self.instance is not None:
+            self.fields['event'].read_only = True
+
 class CertificateSerializer(serializers.ModelSerializer):
     student_name = serializers.ReadOnlyField(source='user.first_name')
     event_title = serializers.ReadOnlyField(source='event.title')
@@ -149,4 +188,17 @@ class CertificateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Certificate
-        fields = ['id', 'user', 'event', 'validation_code', 'student_name', 'event_title', 'event_date', 'organizer_name']
\ No newline at end of file
+        fields = ['id', 'user', 'event', 'validation_code', 'student_name', 'event_title', 'event_date', 'organizer_name']
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    user_name = serializers.ReadOnlyField(source='user.first_name')
+    user_photo = serializers.SerializerMethodField()
+    user_league = serializers.ReadOnlyField(source='user.league')
+    user_city = serializers.ReadOnlyField(source='user.city')
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['rank', 'xp', 'user', 'user_name', 'user_photo', 'user_league', 'user_city']
+        read_only_fields = fields
+
+    def get_user_photo(self, obj):
+        return stored_file_url(obj.user.photo)
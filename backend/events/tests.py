@@ -1,3 +1,1079 @@
-from django.test import TestCase
+import tempfile
+from io import BytesIO, StringIO
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import qrcode
+from pypdf import PdfReader
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import Notification, Task, User
+from core.tasks import run_pending
+from . import admission, checkin, gamification, issuance, leaderboard, lifecycle, live, ratings, utils, waitlist
+from .throttles import CertificateValidationThrottle
+from .models import Event, Enrollment, Review, Certificate, CertificateBatch, XpEntry
+from .serializers import EventSerializer
+from .views import EventViewSet
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@eventsync.com', **extra
+    )
+
+
+class AsyncClientFrom(AsyncClient):
+    """AsyncClient com outro IP de origem: o REMOTE_ADDR sai do 'client' do escopo ASGI."""
+
+    def __init__(self, ip, **defaults):
+        super().__init__(**defaults)
+        self.ip = ip
+
+    def _base_scope(self, **request):
+        scope = super()._base_scope(**request)
+        scope['client'] = [self.ip, 0]
+        return scope
+
+
+def make_event(organizer, **extra):
+    data = {
+        'title': 'Evento',
+        'description': 'Descrição',
+        'location_address': 'Teresina',
+        'start_date': timezone.now() + timedelta(days=1),
+        'status': 'PUBLISHED',
+    }
+    data.update(extra)
+    return Event.objects.create(organizer=organizer, **data)
+
+
+class EventFeedQueriesTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.viewer = make_user('participante')
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def create_events(self, amount):
+        for i in range(amount):
+            event = make_event(self.organizer, title=f'Evento {i}')
+            attendee = make_user(f'inscrito_{event.pk}')
+            Enrollment.objects.create(event=event, user=attendee)
+            if i % 2:
+                Enrollment.objects.create(event=event, user=self.viewer, checked_in=True)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_feed_query_count_does_not_grow_with_events(self):
+        self.create_events(3)
+        few = self.count_queries('/api/events/')
+        self.create_events(12)
+        many = self.count_queries('/api/events/')
+        self.assertEqual(few, many)
+
+    def test_my_created_events_query_count_does_not_grow_with_events(self):
+        self.client.force_authenticate(self.organizer)
+        self.create_events(3)
+        few = self.count_queries('/api/events/my_created_events/')
+        self.create_events(12)
+        many = self.count_queries('/api/events/my_created_events/')
+        self.assertEqual(few, many)
+
+    def test_annotated_output_matches_per_event_lookups(self):
+        self.create_events(4)
+        finished = make_event(self.organizer, status='FINISHED')
+        Enrollment.objects.create(event=finished, user=self.viewer, checked_in=True)
+        reviewed = make_event(self.organizer, status='FINISHED')
+        Enrollment.objects.create(event=reviewed, user=self.viewer, checked_in=True)
+        Review.objects.create(event=reviewed, user=self.viewer, rating=5)
+
+        request = APIRequestFactory().get('/api/events/')
+        request.user = self.viewer
+        context = {'request': request}
+
+        plain = Event.objects.order_by('pk')
+        annotated = Event.objects.with_viewer_state(self.viewer).order_by('pk')
+        self.assertEqual(
+            EventSerializer(plain, many=True, context=context).data,
+            EventSerializer(annotated, many=True, context=context).data,
+        )
+
+
+class EventFeedPaginationTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER', city='Teresina')
+        self.other = make_user('outro', role='ORGANIZER')
+        self.client = APIClient()
+        base = timezone.now() + timedelta(days=1)
+        for i in range(5):
+            make_event(self.organizer, title=f'Evento {i}', start_date=base + timedelta(hours=i))
+        # Mesma data de início: o desempate pelo id mantém a paginação estável
+        for i in range(3):
+            make_event(self.other, title=f'Outro {i}', start_date=base, location_address='Parnaíba')
+        make_event(self.organizer, title='Encerrado', status='FINISHED')
+
+    def collect(self, url):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles += [event['title'] for event in response.data['results']]
+            url = response.data['next']
+        return titles
+
+    def test_cursor_walks_whole_feed_without_duplicates(self):
+        titles = self.collect('/api/events/?page_size=2')
+        self.assertEqual(len(titles), 8)
+        self.assertEqual(len(set(titles)), 8)
+        self.assertNotIn('Encerrado', titles)
+
+    def test_filters(self):
+        self.assertEqual(len(self.collect('/api/events/?city=parna')), 3)
+        self.assertEqual(len(self.collect(f'/api/events/?organizer={self.organizer.pk}')), 5)
+        start = (timezone.now() + timedelta(days=1, hours=2, minutes=30)).isoformat()
+        response = self.client.get('/api/events/', {'start_after': start})
+        self.assertEqual(
+            [event['title'] for event in response.data['results']], ['Evento 3', 'Evento 4']
+        )
+
+
+class EnrollmentExportTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer, title='Semana de TI')
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+        ana = make_user('ana', first_name='Ana', last_name='Souza')
+        bruno = make_user('bruno', first_name='Bruno', last_name='Lima')
+        Enrollment.objects.create(event=self.event, user=ana)
+        Enrollment.objects.create(event=self.event, user=bruno, status='PENDING')
+
+    def read_csv(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('EventSync_Inscritos_Semana_de_TI.csv', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_default_csv_layout(self):
+        lines = self.read_csv(f'/api/events/{self.event.pk}/export_enrollments/')
+        self.assertEqual(lines[0], 'Nome Completo,Email,Status da Inscricao,Check-in Realizado?,Data/Hora Check-in')
+        self.assertEqual(lines[1], 'Ana Souza,ana@eventsync.com,Aprovada,Não,-')
+        self.assertEqual(len(lines), 3)
+
+    def test_columns_and_status_filter(self):
+        lines = self.read_csv(f'/api/events/{self.event.pk}/export_enrollments/?columns=email,status&status=PENDING')
+        self.assertEqual(lines, ['Email,Status da Inscricao', 'bruno@eventsync.com,Pendente'])
+
+    def test_unknown_column_is_rejected(self):
+        response = self.client.get(f'/api/events/{self.event.pk}/export_enrollments/?columns=senha')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CertificateCacheTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER', first_name='Org')
+        self.participant = make_user('ana', first_name='Ana', last_name='Souza')
+        self.event = make_event(self.organizer, title='Semana de TI', status='FINISHED')
+        Enrollment.objects.create(event=self.event, user=self.participant, checked_in=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.participant)
+
+    def download(self):
+        response = self.client.get('/api/certificates/generate_and_download/', {'event_id': self.event.pk})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_pdf_is_rendered_once_and_rerendered_after_changes(self):
+        with mock.patch('events.utils.generate_certificate_pdf', wraps=utils.generate_certificate_pdf) as render:
+            first = self.download()
+            self.assertEqual(self.download(), first)
+            self.assertEqual(render.call_count, 1)
+
+            self.event.title = 'Semana de Tecnologia'
+            self.event.save()
+            self.download()
+            self.assertEqual(render.call_count, 2)
+
+        certificate = Certificate.objects.get()
+        storage = utils.get_certificate_storage()
+        files = storage.listdir(f'certificates/{certificate.validation_code}')[1]
+        self.assertEqual(files, [f'{utils.certificate_fingerprint(certificate)}.pdf'])
+
+    def test_concurrent_first_downloads_end_with_one_file(self):
+        self.download()
+        certificate = Certificate.objects.get()
+        storage = utils.get_certificate_storage()
+        directory = f'certificates/{certificate.validation_code}'
+        storage.save(f'{directory}/antigo.pdf', ContentFile(b'%PDF velho'))
+
+        # A segunda requisição também achou que o arquivo não existia
+        with mock.patch.object(type(storage), 'exists', return_value=False):
+            _, path = utils.get_cached_certificate_pdf(certificate)
+        self.assertEqual(path, f'{directory}/{utils.certificate_fingerprint(certificate)}.pdf')
+        self.assertEqual(storage.listdir(directory)[1], [path.rsplit('/', 1)[1]])
+        self.assertTrue(storage.open(path).read().startswith(b'%PDF'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CertificateBatchTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer, status='FINISHED')
+        for i in range(5):
+            Enrollment.objects.create(event=self.event, user=make_user(f'inscrito_{i}'))
+        Enrollment.objects.create(event=self.event, user=make_user('recusado'), status='REJECTED')
+
+    def test_batch_issues_and_renders_every_certificate_once(self):
+        batch = CertificateBatch.objects.create(event=self.event)
+        with mock.patch('events.utils.generate_certificate_pdf', wraps=utils.generate_certificate_pdf) as render:
+            batch = issuance.run_certificate_batch(batch, workers=1)
+            self.assertEqual(render.call_count, 5)
+
+            # Retomar um lote já processado não renderiza nada de novo
+            issuance.run_certificate_batch(batch, workers=1)
+            self.assertEqual(render.call_count, 5)
+
+        self.assertEqual((batch.status, batch.total, batch.rendered), ('DONE', 5, 5))
+        codes = Certificate.objects.values_list('validation_code', flat=True)
+        self.assertEqual(len(set(codes)), 5)
+
+    def test_finish_event_starts_batch(self):
+        self.event.status = 'IN_PROGRESS'
+        self.event.save()
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        with mock.patch('events.views.start_certificate_batch') as start:
+            response = client.post(f'/api/events/{self.event.pk}/finish_event/')
+        self.assertEqual(response.status_code, 200)
+        start.assert_called_once()
+
+
+class CertificateTemplateTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER', first_name='Org')
+        self.event = make_event(self.organizer, title='Semana de TI', status='FINISHED')
+
+    def test_template_is_shared_until_printed_fields_change(self):
+        template = utils.CertificateTemplate.for_event(self.event)
+        self.assertIs(utils.CertificateTemplate.for_event(Event.objects.get(pk=self.event.pk)), template)
+
+        self.event.title = 'Semana de Tecnologia'
+        self.assertIsNot(utils.CertificateTemplate.for_event(self.event), template)
+
+    def test_render_reuses_prerendered_background(self):
+        certificate = Certificate(
+            event=self.event, user=make_user('ana', first_name='Ana'),
+            validation_code='ABCD1234', issue_date=timezone.now(),
+        )
+        template = utils.CertificateTemplate.for_event(self.event)
+        # Falha se uma versão do ReportLab mudar a numeração das fontes: o fundo voltaria a ser redesenhado
+        self.assertIsNotNone(template._background)
+
+        pdf = template.render(certificate).read()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        with mock.patch.object(template, '_background', None):
+            redrawn = template.render(certificate).read()
+        text = [PdfReader(BytesIO(data)).pages[0].extract_text() for data in (pdf, redrawn)]
+        self.assertEqual(text[0], text[1])
+        self.assertIn('Semana de TI', text[0])
+
+
+class QRCodeTest(TestCase):
+    def test_runs_cover_exactly_the_dark_modules(self):
+        utils.qr_code_runs.cache_clear()
+        url = 'http://localhost:5173/validate/ABCD1234'
+        runs, size = utils.qr_code_runs(url)
+        self.assertIs(utils.qr_code_runs(url)[0], runs)
+
+        dark = {(row, col + i) for row, col, length in runs for i in range(length)}
+        qr = qrcode.QRCode(border=4, mask_pattern=0)
+        qr.add_data(url)
+        qr.make(fit=True)
+        matrix = qr.get_matrix()
+        self.assertEqual(size, len(matrix))
+        self.assertEqual(dark, {(r, c) for r, row in enumerate(matrix) for c, on in enumerate(row) if on})
+
+    @override_settings(CERTIFICATE_VALIDATION_BASE_URL='https://eventsync.app/validate/')
+    def test_validation_url_uses_setting(self):
+        certificate = Certificate(validation_code='ABCD1234')
+        self.assertEqual(utils.certificate_validation_url(certificate), 'https://eventsync.app/validate/ABCD1234')
+
+
+class EnrollmentAdmissionTest(TestCase):
+    CAPACITY = 3
+
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer, max_enrollments=self.CAPACITY)
+        self.users = [make_user(f'fila_{i}') for i in range(self.CAPACITY + 1)]
+
+    def enroll(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/enrollments/', {'event': self.event.pk}).status_code
+
+    def test_capacity_counter_reject_and_reconcile(self):
+        for user in self.users[:self.CAPACITY]:
+            self.assertEqual(self.enroll(user), 201)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, self.CAPACITY)
+
+        # Recusar libera a vaga; aprovar de novo sem vaga é barrado
+        enrollment = Enrollment.objects.filter(event=self.event).first()
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        client.post(f'/api/enrollments/{enrollment.pk}/reject/')
+        self.assertEqual(self.enroll(self.users[-1]), 201)
+        self.assertEqual(client.post(f'/api/enrollments/{enrollment.pk}/approve/').status_code, 400)
+
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=0)
+        self.assertEqual(admission.reconcile_seats(), [(self.event.pk, 0, self.CAPACITY)])
+        self.assertEqual(admission.find_seat_drift(), [])
+
+    def test_full_event_queues_and_promotes_in_order(self):
+        extra = [make_user(f'espera_{i}') for i in range(2)]
+        for user in self.users[:self.CAPACITY] + extra:
+            self.assertEqual(self.enroll(user), 201)
+
+        queue = Enrollment.objects.filter(status='WAITLISTED').order_by('waitlist_position')
+        self.assertEqual([e.user for e in queue], extra)
+        self.assertEqual([e.waitlist_position for e in queue], [1, 2])
+
+        enrollment = Enrollment.objects.get(user=self.users[0])
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        self.assertEqual(client.post(f'/api/enrollments/{enrollment.pk}/cancel/').status_code, 200)
+        self.assertTrue(Task.objects.filter(name='events.waitlist.promote_waitlist', status='QUEUED').exists())
+
+        # A promoção roda em segundo plano; aqui chamamos o passo diretamente
+        self.assertEqual(waitlist.promote_waitlist(self.event.pk), 1)
+        promoted = Enrollment.objects.get(user=extra[0])
+        self.assertEqual((promoted.status, promoted.waitlist_position), ('APPROVED', None))
+        self.assertEqual(Enrollment.objects.get(user=extra[1]).status, 'WAITLISTED')
+        self.assertTrue(Notification.objects.filter(user=extra[0]).exists())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, self.CAPACITY)
+
+    def test_status_changes_and_edits_keep_concurrent_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        self.event.status = 'DRAFT'
+        self.event.save()
+        get_object = EventViewSet.get_object
+
+        def stale_get_object(view):
+            # Uma inscrição entra entre a leitura do evento e a gravação da view
+            event = get_object(view)
+            Event.objects.filter(pk=event.pk).update(seats_taken=F('seats_taken') + 1, waitlist_tail=F('waitlist_tail') + 1)
+            return event
+
+        with mock.patch.object(EventViewSet, 'get_object', stale_get_object):
+            self.assertEqual(client.post(f'/api/events/{self.event.pk}/publish/').status_code, 200)
+            self.assertEqual(client.patch(f'/api/events/{self.event.pk}/', {'title': 'Novo'}).status_code, 200)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.title), ('PUBLISHED', 'Novo'))
+        self.assertEqual((self.event.seats_taken, self.event.waitlist_tail), (2, 2))
+
+    def test_waitlist_tail_is_not_exposed_or_writable(self):
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        response = client.patch(f'/api/events/{self.event.pk}/', {'waitlist_tail': 999}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('waitlist_tail', response.data)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.waitlist_tail, 0)
+
+
+@override_settings(TASK_BACKEND='database')
+class ModerationTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer, max_enrollments=3, requires_approval=True)
+        self.pending = [self.enroll(f'pendente_{i}', 'PENDING') for i in range(2)]
+        self.waitlisted = [self.enroll(f'espera_{i}', 'WAITLISTED', waitlist_position=i + 1) for i in range(2)]
+        self.canceled = self.enroll('desistente', 'CANCELED')
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    def enroll(self, username, status, **extra):
+        return Enrollment.objects.create(event=self.event, user=make_user(username), status=status, **extra)
+
+    def moderate(self, **data):
+        return self.client.post('/api/enrollments/moderate/', {'event': self.event.pk, **data}, format='json')
+
+    def test_approve_ids_respects_capacity(self):
+        ids = [str(e.pk) for e in self.pending + self.waitlisted + [self.canceled]] + ['lixo', str(self.organizer.pk)]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.moderate(action='approve', ids=ids)
+        self.assertEqual(
+            [item['result'] for item in response.json()['results']],
+            ['approved', 'approved', 'approved', 'no_seats', 'not_allowed', 'invalid', 'invalid'],
+        )
+        approved = Enrollment.objects.filter(event=self.event, status='APPROVED').order_by('user__username')
+        self.assertEqual(list(approved.values_list('user__username', flat=True)), ['espera_0', 'pendente_0', 'pendente_1'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+
+        # Um único aviso em lote pela fila de tarefas
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(Notification.objects.filter(title='Inscrição aprovada!').count(), 3)
+
+    def test_reject_by_filter_releases_seats(self):
+        response = self.moderate(action='reject', filter={'status': 'PENDING', 'created_before': timezone.now().isoformat()})
+        self.assertEqual({item['result'] for item in response.json()['results']}, {'rejected'})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+        self.assertTrue(Task.objects.filter(key=f'waitlist:{self.event.pk}', status='QUEUED').exists())
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        for i in range(20):
+            self.enroll(f'lote_{i}', 'PENDING')
+        with CaptureQueriesContext(connection) as few:
+            self.moderate(action='approve', ids=[str(e.pk) for e in self.pending])
+        with CaptureQueriesContext(connection) as many:
+            self.moderate(action='approve', filter={})
+        self.assertEqual(len(many), len(few))
+
+    def test_only_the_organizer_moderates(self):
+        self.client.force_authenticate(self.pending[0].user)
+        self.assertEqual(self.moderate(action='approve', ids=[str(self.pending[1].pk)]).status_code, 403)
+        self.client.force_authenticate(self.organizer)
+        self.assertEqual(self.moderate(action='delete', ids=[str(self.pending[1].pk)]).status_code, 400)
+        self.assertEqual(self.moderate(action='approve', filter={'status': 'QUALQUER'}).status_code, 400)
+
+
+class EnrollmentListTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer)
+        self.attendees = [
+            Enrollment.objects.create(event=self.event, user=make_user(f'inscrito_{i}')) for i in range(2)
+        ]
+        # O organizador também se inscreveu num evento alheio
+        other_event = make_event(make_user('outro', role='ORGANIZER'))
+        self.own = Enrollment.objects.create(event=other_event, user=self.organizer)
+        Enrollment.objects.create(event=other_event, user=make_user('alheio'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    def listed_ids(self, params=None):
+        response = self.client.get('/api/enrollments/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data}
+
+    def test_lists_own_enrollments_and_attendees_once(self):
+        expected = {str(e.pk) for e in self.attendees + [self.own]}
+        self.assertEqual(self.listed_ids(), expected)
+        self.assertEqual(self.listed_ids({'event_id': self.event.pk}), {str(e.pk) for e in self.attendees})
+        self.assertEqual(self.listed_ids({'event_id': self.own.event_id}), {str(self.own.pk)})
+
+    def test_list_query_budget_does_not_grow_with_attendees(self):
+        for i in range(30):
+            attendee = make_user(f'extra_{i}', photo=f'user_photos/{i}.png')
+            Enrollment.objects.create(event=self.event, user=attendee, checked_in=True)
+            if i % 2:
+                Review.objects.create(event=self.event, user=attendee, rating=5)
+
+        # Lista completa: uma consulta; por evento: checagem do organizador + lista
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/enrollments/')
+        with self.assertNumQueries(2):
+            self.client.get('/api/enrollments/', {'event_id': self.event.pk})
+
+        rows = {item['user_email']: item for item in response.data}
+        self.assertEqual(sum(item['has_review'] for item in response.data), 15)
+        self.assertEqual(rows['extra_0@eventsync.com']['user_photo'], '/media/user_photos/0.png')
+        self.assertIsNone(rows['inscrito_0@eventsync.com']['user_photo'])
+
+
+class CheckinTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer, status='IN_PROGRESS')
+        self.enrollments = [
+            Enrollment.objects.create(event=self.event, user=make_user(f'inscrito_{i}')) for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    def post(self, body):
+        return self.client.post('/api/enrollments/checkin_batch/', body, format='json')
+
+    def test_batch_reports_each_item(self):
+        pending = Enrollment.objects.create(event=self.event, user=make_user('pendente'), status='PENDING')
+        other_event = make_event(make_user('outro', role='ORGANIZER'), status='IN_PROGRESS')
+        foreign = Enrollment.objects.create(event=other_event, user=make_user('alheio'))
+        first, second, _ = self.enrollments
+        ids = [str(first.pk), str(second.pk), str(first.pk), str(pending.pk), str(foreign.pk), 'lixo']
+
+        with self.assertNumQueries(2):
+            response = self.post({'ids': ids})
+        self.assertEqual(
+            [item['result'] for item in response.data['results']],
+            ['checked_in', 'checked_in', 'checked_in', 'not_approved', 'not_found', 'invalid'],
+        )
+        self.assertEqual(Enrollment.objects.filter(checked_in=True).count(), 2)
+
+        response = self.post({'ids': [str(first.pk)]})
+        self.assertEqual(response.data['results'][0]['result'], 'already_checked_in')
+
+    def test_offline_replay_keeps_scan_time_after_event_finished(self):
+        scanned_at = timezone.now() - timedelta(hours=1)
+        self.event.status = 'FINISHED'
+        self.event.save()
+
+        response = self.post({'ids': [str(self.enrollments[0].pk)]})
+        self.assertEqual(response.data['results'][0]['result'], 'event_not_in_progress')
+
+        response = self.post({'replay': True, 'scans': [
+            {'id': str(self.enrollments[0].pk), 'scanned_at': scanned_at.isoformat()},
+            {'id': str(self.enrollments[1].pk), 'scanned_at': (timezone.now() + timedelta(days=1)).isoformat()},
+            {'id': str(self.enrollments[2].pk), 'scanned_at': '2024-13-45T00:00'},
+        ]})
+        self.assertEqual([item['result'] for item in response.data['results']], ['checked_in', 'invalid', 'invalid'])
+        self.enrollments[0].refresh_from_db()
+        self.assertEqual(self.enrollments[0].checkin_time, scanned_at)
+
+    def test_single_checkin_keeps_legacy_messages(self):
+        url = f'/api/enrollments/{self.enrollments[0].pk}/checkin/'
+        self.assertEqual(self.client.post(url).data, {'status': 'Check-in realizado!'})
+        self.assertEqual(self.client.post(url).data, {'error': 'Check-in já realizado.'})
+
+        # O próprio participante continua recebendo 403; quem não vê a inscrição, 404
+        attendee = APIClient()
+        attendee.force_authenticate(self.enrollments[1].user)
+        self.assertEqual(attendee.post(f'/api/enrollments/{self.enrollments[1].pk}/checkin/').status_code, 403)
+        self.assertEqual(attendee.post(url).status_code, 404)
+
+
+class ReviewTotalsTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.events = [make_event(self.organizer, status='FINISHED') for _ in range(2)]
+        self.reviewers = [make_user(f'avaliador_{i}') for i in range(3)]
+        for event in self.events:
+            for user in self.reviewers:
+                Enrollment.objects.create(event=event, user=user, checked_in=True)
+
+    def review(self, user, event, rating):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/reviews/', {'event': event.pk, 'rating': rating})
+        self.assertEqual(response.status_code, 201)
+        return client, response.data['id']
+
+    def totals(self):
+        self.organizer.refresh_from_db()
+        event = Event.objects.get(pk=self.events[0].pk)
+        return (
+            (event.review_count, event.rating_sum),
+            (self.organizer.organizer_review_count, self.organizer.organizer_rating_sum, self.organizer.organizer_rating),
+        )
+
+    def test_totals_follow_create_update_and_delete(self):
+        self.review(self.reviewers[0], self.events[0], 5)
+        client, review_id = self.review(self.reviewers[1], self.events[0], 4)
+        self.review(self.reviewers[0], self.events[1], 3)
+        self.assertEqual(self.totals(), ((2, 9), (3, 12, 4.0)))
+        # O XP do organizador vai pela fila de tarefas
+        self.assertEqual(run_pending(), 3)
+        self.organizer.refresh_from_db()
+        self.assertEqual(self.organizer.xp, 30 + 15 + 5)
+
+        client.patch(f'/api/reviews/{review_id}/', {'rating': 1})
+        self.assertEqual(self.totals(), ((2, 6), (3, 9, 3.0)))
+
+        client.delete(f'/api/reviews/{review_id}/')
+        self.assertEqual(self.totals(), ((1, 5), (2, 8, 4.0)))
+        self.assertEqual(ratings.find_rating_drift(), {'events': [], 'organizers': []})
+
+    def test_only_the_author_edits_or_deletes(self):
+        _, review_id = self.review(self.reviewers[0], self.events[0], 5)
+        other = APIClient()
+        other.force_authenticate(self.reviewers[1])
+
+        self.assertEqual(other.get(f'/api/reviews/{review_id}/').status_code, 200)
+        self.assertEqual(other.patch(f'/api/reviews/{review_id}/', {'rating': 1}).status_code, 404)
+        self.assertEqual(other.delete(f'/api/reviews/{review_id}/').status_code, 404)
+        self.assertEqual(self.totals(), ((1, 5), (1, 5, 5.0)))
+
+    def test_event_cannot_change_after_creation(self):
+        draft = make_event(self.organizer, status='DRAFT')
+        client, review_id = self.review(self.reviewers[0], self.events[0], 5)
+        response = client.patch(f'/api/reviews/{review_id}/', {'event': draft.pk, 'rating': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Review.objects.get(pk=review_id).event_id, self.events[0].pk)
+        self.assertEqual(self.totals(), ((1, 4), (1, 4, 4.0)))
+        self.assertEqual(Event.objects.get(pk=draft.pk).review_count, 0)
+
+    def test_rebuild_fixes_drift(self):
+        self.review(self.reviewers[0], self.events[0], 5)
+        self.review(self.reviewers[1], self.events[0], 2)
+        Event.objects.filter(pk=self.events[0].pk).update(review_count=0, rating_sum=0)
+        User.objects.filter(pk=self.organizer.pk).update(organizer_review_count=7)
+
+        drift = ratings.rebuild_ratings()
+        # (total, soma, notas 1..5)
+        self.assertEqual(drift['events'], [(self.events[0].pk, (0, 0, 0, 1, 0, 0, 1), (2, 7, 0, 1, 0, 0, 1))])
+        self.assertEqual(drift['organizers'], [(self.organizer.pk, (7, 7), (2, 7))])
+        self.assertEqual(self.totals(), ((2, 7), (2, 7, 3.5)))
+
+    def test_event_reviews_page_and_stats(self):
+        for user, rating in zip(self.reviewers, [5, 4, 5]):
+            self.review(user, self.events[0], rating)
+
+        client = APIClient()
+        with self.assertNumQueries(2):  # evento + página de avaliações com o autor
+            response = client.get(f'/api/events/{self.events[0].pk}/reviews/', {'page_size': 2})
+        self.assertEqual(response.data['stats'], {
+            'average': 4.7, 'count': 3, 'histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 2},
+        })
+        self.assertEqual([r['rating'] for r in response.data['results']], [5, 4])
+        rest = client.get(response.data['next']).data['results']
+        self.assertEqual([r['user'] for r in rest], [self.reviewers[0].pk])
+
+        event = client.get(f'/api/events/{self.events[1].pk}/').data
+        self.assertEqual(event['rating_stats']['count'], 0)
+        self.assertIsNone(event['rating_stats']['average'])
+        self.assertNotIn('rating_sum', event)
+
+
+class EventLifecycleTest(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        now = timezone.now()
+        self.due = make_event(self.organizer, title='Vencido', start_date=now + timedelta(hours=1))
+        self.future = make_event(self.organizer, title='Futuro', start_date=now + timedelta(days=2))
+        self.ending = [
+            make_event(self.organizer, status='IN_PROGRESS', start_date=now + timedelta(hours=1),
+                       end_date=now + timedelta(hours=2))
+            for _ in range(3)
+        ]
+        self.open_ended = make_event(self.organizer, status='IN_PROGRESS')
+        for event in self.ending:
+            Enrollment.objects.create(event=event, user=make_user(f'inscrito_{event.pk}'), checked_in=True)
+        self.later = now + timedelta(hours=3)
+
+    def test_transitions_in_bulk_once(self):
+        self.assertEqual(lifecycle.run_lifecycle(now=self.later, batch_size=2), (1, 3))
+        statuses = dict(Event.objects.values_list('title', 'status'))
+        self.assertEqual(statuses['Vencido'], 'IN_PROGRESS')
+        self.assertEqual(statuses['Futuro'], 'PUBLISHED')
+        self.assertEqual(Event.objects.get(pk=self.open_ended.pk).status, 'IN_PROGRESS')
+        self.assertEqual(Certificate.objects.count(), 3)
+        self.assertEqual(
+            Task.objects.filter(name='events.issuance.render_certificate_batch', status=Task.Status.QUEUED).count(), 3,
+        )
+        # Aviso aos inscritos: uma tarefa por lote da rodada (aqui, lotes de 2), não uma por evento
+        announces = Task.objects.filter(name='events.lifecycle.notify_finished_enrollees')
+        self.assertEqual(sorted(len(task.args[0]) for task in announces), [1, 2])
+        self.assertEqual(sum(lifecycle.notify_finished_enrollees(*task.args) for task in announces), 3)
+
+        self.organizer.refresh_from_db()
+        self.assertEqual(self.organizer.xp, 150)
+        self.assertEqual(XpEntry.objects.filter(user=self.organizer, reason='EVENT_FINISHED').count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.organizer).count(), 4)
+
+        # Segunda rodada (ou outra réplica): nada a fazer, nada duplicado
+        self.assertEqual(lifecycle.run_lifecycle(now=self.later), (0, 0))
+        self.organizer.refresh_from_db()
+        self.assertEqual(self.organizer.xp, 150)
+
+    def test_cancel_notifies_every_enrollee(self):
+        attendees = [make_user(f'participante_{i}') for i in range(3)]
+        for attendee in attendees:
+            Enrollment.objects.create(event=self.future, user=attendee)
+        Enrollment.objects.create(event=self.future, user=make_user('recusado'), status='REJECTED')
+
+        client = APIClient()
+        client.force_authenticate(self.organizer)
+        self.assertEqual(client.post(f'/api/events/{self.future.pk}/cancel_event/').status_code, 200)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(
+            set(Notification.objects.filter(title='Evento cancelado').values_list('user_id', flat=True)),
+            {attendee.pk for attendee in attendees},
+        )
+        self.assertEqual(User.objects.get(pk=attendees[0].pk).unread_notifications, 1)
+
+
+class LiveChannelTest(TestCase):
+    def setUp(self):
+        live.get_broker.cache_clear()
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.organizer, status='IN_PROGRESS', max_enrollments=10)
+        self.enrollments = [
+            Enrollment.objects.create(event=self.event, user=make_user(f'inscrito_{i}')) for i in range(2)
+        ]
+        self.url = f'/api/events/{self.event.pk}/live/'
+        self.token = str(AccessToken.for_user(self.organizer))
+
+    def poll(self, **params):
+        return self.client.get(self.url, {'transport': 'poll', 'token': self.token, **params})
+
+    def test_long_poll_snapshot_then_checkin_deltas(self):
+        first = self.poll().json()
+        self.assertEqual(first['events'][0]['type'], 'counters')
+        self.assertEqual(first['events'][0]['data']['checked_in'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            checkin.check_in(self.organizer, [self.enrollments[0].pk])
+        second = self.poll(last_id=first['last_id']).json()
+        self.assertEqual([e['type'] for e in second['events']], ['checkin', 'counters'])
+        self.assertEqual(second['events'][0]['data'], {'ids': [str(self.enrollments[0].pk)]})
+        self.assertEqual(second['events'][1]['data']['checked_in'], 1)
+
+    def test_only_the_organizer_can_watch(self):
+        other = str(AccessToken.for_user(make_user('curioso')))
+        self.assertEqual(self.client.get(self.url, {'token': other}).status_code, 403)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_sse_under_wsgi_points_to_long_poll(self):
+        # O cliente de teste síncrono passa pelo handler WSGI, como o runserver
+        response = self.client.get(self.url, {'token': self.token})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['transport'], 'poll')
+
+    async def test_idle_channels_leave_memory(self):
+        broker = live.InProcessBroker()
+        broker.publish('event:1', {'type': 'checkin', 'data': {}})  # Ninguém assistindo: nada guardado
+        self.assertEqual((broker.last_id('event:2'), broker.replay('event:2', 0)), (0, []))
+        self.assertEqual(broker._channels, {})
+
+        now = [live.time.monotonic()]
+        with mock.patch.object(live.time, 'monotonic', lambda: now[0]):
+            with broker.subscribe('event:1'):
+                broker.publish('event:1', {'type': 'checkin', 'data': {}})
+            now[0] += live.WATCH_GRACE - 1
+            broker.publish('event:1', {'type': 'checkin', 'data': {}})  # Ainda dá para retomar
+            self.assertEqual(len(broker.replay('event:1', 0)), 2)
+
+            now[0] += 1 + live.WATCH_GRACE
+            broker.publish('event:3', {'type': 'checkin', 'data': {}})
+        self.assertEqual(broker._channels, {})
+
+    async def test_sse_stream_pushes_published_changes(self):
+        response = await AsyncClient().get(self.url, {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertIn(b'event: counters', await anext(stream))
+
+        # publish() chega de outra thread (requisição ou fila de tarefas)
+        channel = live.event_channel(self.event.pk)
+        thread = threading.Thread(target=live.get_broker().publish, args=[channel, {'type': 'checkin', 'data': {'ids': ['x']}}])
+        thread.start()
+        chunk = await anext(stream)
+        thread.join()
+        self.assertIn(b'event: checkin', chunk)
+        self.assertIn(b'"ids": ["x"]', chunk)
+        await stream.aclose()
+
+
+class AsyncReadViewsTest(TestCase):
+    """As rotas /api/async/ devolvem o mesmo que as do DRF."""
+
+    def setUp(self):
+        cache.clear()
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.participant = make_user('participante')
+        self.events = [
+            make_event(self.organizer, title=f'Evento {i}', start_date=timezone.now() + timedelta(days=i + 1))
+            for i in range(5)
+        ]
+        make_event(self.organizer, status='CANCELED')
+        for event in self.events[:2]:
+            Enrollment.objects.create(event=event, user=self.participant, checked_in=True)
+        Review.objects.create(event=self.events[0], user=self.participant, rating=5)
+        self.certificate = Certificate.objects.create(
+            event=self.events[0], user=self.participant, validation_code='ASYNC123',
+        )
+        self.client = APIClient()
+        self.token = AccessToken.for_user(self.participant)
+
+    def aget(self, url, data=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        return async_to_sync(AsyncClient().get)(url, data, headers=headers)
+
+    def test_feed_matches_and_paginates(self):
+        self.client.force_authenticate(self.participant)
+        expected = self.client.get('/api/events/').json()['results']
+
+        results, url, params = [], '/api/async/events/', {'page_size': 2}
+        while url:
+            page = self.aget(url, params, self.token).json()
+            results += page['results']
+            url, params = page['next'], None
+        self.assertEqual(results, expected)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(results[0]['has_checkin'])
+
+    def test_feed_filters_and_rejects_bad_cursor(self):
+        page = self.aget('/api/async/events/', {'start_after': self.events[3].start_date.isoformat()}).json()
+        self.assertEqual([event['id'] for event in page['results']], [self.events[3].pk, self.events[4].pk])
+        self.assertEqual(self.aget('/api/async/events/', {'cursor': 'lixo'}).status_code, 404)
+
+    def test_detail_matches(self):
+        self.client.force_authenticate(self.participant)
+        url = f'events/{self.events[0].pk}/'
+        self.assertEqual(self.aget(f'/api/async/{url}', token=self.token).json(), self.client.get(f'/api/{url}').json())
+        self.assertEqual(self.aget('/api/async/events/999999/').status_code, 404)
+
+    def test_enrollments_match_for_both_roles(self):
+        for user, params in [(self.participant, {}), (self.organizer, {'event_id': self.events[0].pk})]:
+            self.client.force_authenticate(user)
+            self.assertEqual(
+                self.aget('/api/async/enrollments/', params, AccessToken.for_user(user)).json(),
+                self.client.get('/api/enrollments/', params).json(),
+            )
+        self.assertEqual(self.aget('/api/async/enrollments/').status_code, 401)
+        self.assertEqual(self.aget('/api/async/enrollments/', token='invalido').status_code, 401)
+
+    def test_validate_code_matches(self):
+        url = 'certificates/validate_code/ASYNC123/'
+        response = self.aget(f'/api/async/{url}')
+        self.assertEqual(response.json(), self.client.get(f'/api/{url}').json())
+        self.assertTrue(response.json()['valid'])
+        self.assertEqual(self.aget('/api/async/certificates/validate_code/NAOEXISTE/').status_code, 404)
+
+
+class CertificateValidationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        participant = make_user('participante', first_name='Ana')
+        event = make_event(make_user('organizador', first_name='Bia'), status='FINISHED')
+        Certificate.objects.create(event=event, user=participant, validation_code='ABCD1234')
+        self.client = APIClient()
+
+    def validate(self, code, ip='10.0.0.1'):
+        return self.client.get(f'/api/certificates/validate_code/{code}/', REMOTE_ADDR=ip)
+
+    def test_one_joined_query_then_cached(self):
+        with self.assertNumQueries(1):
+            response = self.validate('ABCD1234')
+        details = response.json()['certificate_details']
+        self.assertEqual((details['student_name'], details['organizer_name']), ('Ana', 'Bia'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.validate('ABCD1234').json(), response.json())
+
+    def test_misses_are_cached_too(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.validate('NAOEXISTE').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.validate('NAOEXISTE').status_code, 404)
+            self.assertEqual(self.validate('n%C3%A3o-hex').status_code, 404)
+
+    @mock.patch.object(CertificateValidationThrottle, 'THROTTLE_RATES', {'certificate_validation': '2/min'})
+    def test_token_bucket_per_ip(self):
+        now = [1000.0]
+        with mock.patch.object(CertificateValidationThrottle, 'timer', lambda self: now[0]):
+            self.assertEqual([self.validate(f'CODIGO{i}').status_code for i in range(2)], [404, 404])
+            limited = self.validate('ABCD1234')
+            self.assertEqual(limited.status_code, 429)
+            self.assertEqual(limited['Retry-After'], '30')
+            # Trocar o X-Forwarded-For não dá um balde novo (NUM_PROXIES = 0)
+            forged = self.client.get('/api/certificates/validate_code/ABCD1234/', REMOTE_ADDR='10.0.0.1',
+                                     HTTP_X_FORWARDED_FOR='203.0.113.9')
+            self.assertEqual(forged.status_code, 429)
+            self.assertEqual(self.validate('ABCD1234', ip='10.0.0.2').status_code, 200)
+
+            # Meio minuto repõe uma ficha, e só uma
+            now[0] += 30
+            self.assertEqual(self.validate('ABCD1234').status_code, 200)
+            self.assertEqual(self.validate('ABCD1234').status_code, 429)
+
+    @mock.patch.object(CertificateValidationThrottle, 'THROTTLE_RATES', {'certificate_validation': '1/min'})
+    def test_async_route_shares_cache_and_bucket(self):
+        url = '/api/async/certificates/validate_code/ABCD1234/'
+        self.validate('ABCD1234', ip='127.0.0.1')  # IP padrão do AsyncClient
+        self.assertEqual(async_to_sync(AsyncClient().get)(url).status_code, 429)
+        forged = async_to_sync(AsyncClient().get)(url, headers={'X-Forwarded-For': '10.0.0.3'})
+        self.assertEqual(forged.status_code, 429)
+        response = async_to_sync(AsyncClientFrom('10.0.0.3').get)(url)
+        self.assertTrue(response.json()['valid'])
+
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        # (xp, liga, cidade); dois empates de XP e um usuário sem cidade
+        profile = [
+            (900, 'Prata', 'Teresina'), (700, 'Prata', 'Teresina'), (700, 'Prata', 'Parnaíba'),
+            (300, 'Bronze', 'Teresina'), (300, 'Bronze', 'Parnaíba'), (150, 'Novato', None), (0, 'Novato', 'Teresina'),
+        ]
+        self.users = [
+            make_user(f'jogador_{i}', xp=xp, league=league, city=city) for i, (xp, league, city) in enumerate(profile)
+        ]
+        self.client = APIClient()
+
+    def expected_rank(self, user, scope):
+        key = leaderboard.scope_key(user, scope)
+        if key is None:
+            return None
+        field = leaderboard.SCOPES[scope]
+        peers = [other for other in self.users if not field or getattr(other, field) == key]
+        return sum(other.xp > user.xp for other in peers) + 1
+
+    def test_rank_of_matches_counting_every_user(self):
+        leaderboard.refresh_leaderboards()
+        for scope in leaderboard.SCOPES:
+            for user in self.users:
+                expected = self.expected_rank(user, scope)
+                with self.assertNumQueries(0 if expected is None else 1):  # Sem cidade nem consulta
+                    self.assertEqual(leaderboard.rank_of(user, scope), expected)
+
+        self.assertEqual(leaderboard.rank_of(self.users[2], leaderboard.GLOBAL), 2)  # empatado com o jogador_1
+        self.assertEqual(leaderboard.rank_of(self.users[6], leaderboard.CITY), 4)
+
+    def test_rank_follows_current_xp_between_refreshes(self):
+        leaderboard.refresh_leaderboards()
+        user = self.users[6]
+        for xp, rank in ((500, 4), (700, 2), (5000, 1)):
+            user.xp = xp
+            self.assertEqual(leaderboard.rank_of(user, leaderboard.GLOBAL), rank)
+
+    def test_counts_on_the_index_before_the_first_refresh(self):
+        for user in self.users:
+            self.assertEqual(leaderboard.rank_of(user, leaderboard.LEAGUE), self.expected_rank(user, leaderboard.LEAGUE))
+
+    def test_top_n_per_scope(self):
+        self.assertEqual(leaderboard.refresh_leaderboards(top=3), {'global': (3, 5), 'league': (7, 5), 'city': (5, 6)})
+        client = self.client
+        client.force_authenticate(self.users[3])
+
+        ranks, url = [], '/api/leaderboard/?page_size=2'
+        while url:
+            with self.assertNumQueries(1):  # Página do top e usuários num JOIN
+                page = client.get(url).json()
+            ranks += [(entry['rank'], entry['user']) for entry in page['results']]
+            url = page['next']
+        self.assertEqual(ranks, [(1, self.users[0].pk), (2, self.users[1].pk), (2, self.users[2].pk)])
+
+        # Sem key: a cidade de quem pede
+        city = client.get('/api/leaderboard/?scope=city').json()['results']
+        self.assertEqual([entry['user'] for entry in city], [u.pk for u in (self.users[0], self.users[1], self.users[3])])
+        self.assertEqual(city[0]['user_city'], 'Teresina')
+        league = client.get('/api/leaderboard/', {'scope': 'league', 'key': 'Novato'}).json()['results']
+        self.assertEqual([entry['rank'] for entry in league], [1, 2])
+
+    def test_me_endpoint(self):
+        leaderboard.refresh_leaderboards()
+        self.client.force_authenticate(self.users[4])
+        self.assertEqual(
+            self.client.get('/api/leaderboard/me/?scope=city').json(),
+            {'scope': 'city', 'key': 'Parnaíba', 'xp': 300, 'league': 'Bronze', 'rank': 2},
+        )
+        self.client.force_authenticate(self.users[5])
+        self.assertIsNone(self.client.get('/api/leaderboard/me/?scope=city').json()['rank'])
+        self.assertEqual(self.client.get('/api/leaderboard/me/?scope=bairro').status_code, 400)
+
+
+
+
+class GamificationTest(TestCase):
+    def setUp(self):
+        self.user = make_user('organizador', role='ORGANIZER')
+        self.event = make_event(self.user, status='FINISHED')
+
+    def test_each_award_is_an_entry_plus_an_atomic_update(self):
+        gamification.award(self.user.pk, 150, XpEntry.Reason.REVIEW)
+        gamification.award(self.user.pk, 100, XpEntry.Reason.REVIEW)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.xp, self.user.league), (250, 'Bronze'))
+
+        # A mesma chave só entra uma vez (ex.: tarefa repetida)
+        key = f'finish:{self.event.pk}'
+        self.assertIsNotNone(gamification.award(self.user.pk, 50, XpEntry.Reason.EVENT_FINISHED, self.event.pk, key))
+        self.assertIsNone(gamification.award(self.user.pk, 50, XpEntry.Reason.EVENT_FINISHED, self.event.pk, key))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.xp, 300)
+        self.assertEqual(self.user.xp_entries.count(), 3)
+
+    def test_league_table_is_the_same_in_python_and_sql(self):
+        boundaries = [xp + delta for xp, _ in gamification.LEAGUES for delta in (-1, 0) if xp + delta >= 0]
+        users = [make_user(f'jogador_{xp}', xp=xp) for xp in boundaries]
+        leagues = dict(
+            User.objects.filter(pk__in=[u.pk for u in users])
+            .annotate(expected=gamification.league_expression(F('xp'))).values_list('xp', 'expected')
+        )
+        self.assertEqual(leagues, {xp: gamification.league_for(xp) for xp in boundaries})
+        self.assertEqual((gamification.league_for(199), gamification.league_for(10000)), ('Novato', 'CEO dos Eventos'))
+
+    def test_review_xp_follows_the_rating_through_the_ledger(self):
+        reviewer = make_user('avaliador')
+        Enrollment.objects.create(event=self.event, user=reviewer, checked_in=True)
+        client = APIClient()
+        client.force_authenticate(reviewer)
+        review_id = client.post('/api/reviews/', {'event': self.event.pk, 'rating': 5}).data['id']
+
+        # A tarefa roda de novo (ex.: worker caiu depois do commit): nada a acertar
+        task = Task.objects.get(name='events.gamification.settle_review_xp')
+        Task.objects.create(name=task.name, args=task.args, kwargs=task.kwargs)
+        self.assertEqual(run_pending(), 2)
+
+        client.patch(f'/api/reviews/{review_id}/', {'rating': 3})
+        run_pending()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.xp, 5)
+
+        client.delete(f'/api/reviews/{review_id}/')
+        run_pending()
+        self.assertEqual(
+            list(XpEntry.objects.order_by('pk').values_list('amount', 'key')),
+            [(30, f'review:{review_id}:1'), (-25, f'review:{review_id}:2'), (-5, f'review:{review_id}:3')],
+        )
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.xp, self.user.league), (0, 'Novato'))
+
+    def test_award_many_skips_keys_already_credited(self):
+        other_event = make_event(self.user, status='FINISHED')
+        gamification.award(self.user.pk, 50, XpEntry.Reason.EVENT_FINISHED, self.event.pk, f'finish:{self.event.pk}')
+        fresh = gamification.award_many([
+            gamification.finish_entry(self.event.pk, self.user.pk),
+            gamification.finish_entry(other_event.pk, self.user.pk),
+            gamification.finish_entry(other_event.pk, self.user.pk),
+        ])
+        self.assertEqual([entry.key for entry in fresh], [f'finish:{other_event.pk}'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.xp, 100)
+
+    def test_replay_rebuilds_balance_and_league_from_the_ledger(self):
+        other = make_user('participante')
+        gamification.award_many([
+            XpEntry(user=self.user, amount=400, reason=XpEntry.Reason.REVIEW),
+            gamification.finish_entry(self.event.pk, self.user.pk),
+            XpEntry(user=other, amount=120, reason=XpEntry.Reason.ADJUSTMENT),
+        ])
+        self.assertEqual(gamification.find_xp_drift(), [])
+
+        User.objects.filter(pk=self.user.pk).update(xp=9999, league='CEO dos Eventos')
+        User.objects.filter(pk=other.pk).update(league='Ouro')
+        with self.assertRaises(CommandError):
+            call_command('replay_xp', '--check', stdout=StringIO())
+        self.assertEqual(gamification.find_xp_drift([self.user.pk]), [(self.user.pk, 9999, 450)])
+
+        call_command('replay_xp', stdout=StringIO())
+        self.assertEqual(
+            dict(User.objects.filter(pk__in=[self.user.pk, other.pk]).values_list('pk', 'league')),
+            {self.user.pk: 'Bronze', other.pk: 'Novato'},
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.xp, 450)
+        self.assertEqual(gamification.find_xp_drift(), [])
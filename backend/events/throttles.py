@@ -0,0 +1,37 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Balde de fichas por IP. Com a taxa 'N/período' o balde guarda até N fichas
+    (rajada de N leituras seguidas, como uma turma escaneando os certificados) e
+    repõe N por período. Fora disso, 429 com Retry-After.
+
+    O estado (fichas, instante) fica no cache padrão: em produção, com vários
+    processos, ele precisa ser compartilhado (Redis/Memcached) para o limite
+    valer por IP e não por processo. O IP é o do get_ident do DRF: atrás de
+    proxies reversos, ajuste NUM_PROXIES, senão todos saem com o IP do proxy.
+    """
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        self.now = self.timer()
+        tokens, updated_at = self.cache.get(self.key, (self.num_requests, self.now))
+        self.tokens = min(self.num_requests, tokens + (self.now - updated_at) * self.num_requests / self.duration)
+        if self.tokens < 1:
+            return False
+        self.cache.set(self.key, (self.tokens - 1, self.now), self.duration)
+        return True
+
+    def wait(self):
+        # Tempo até o balde repor uma ficha
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class CertificateValidationThrottle(TokenBucketThrottle):
+    scope = 'certificate_validation'
@@ -1,13 +1,21 @@
 from io import BytesIO
+import hashlib
+import logging
+import os
+import uuid
+from functools import lru_cache
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from pypdf import PdfReader
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, landscape
 from django.core.files.base import ContentFile
-from django.utils import timezone
 import qrcode
-from reportlab.lib.utils import ImageReader
 from reportlab.lib.colors import HexColor
 import locale
 
+logger = logging.getLogger(__name__)
+
 try:
     locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
 except locale.Error:
@@ -17,62 +25,21 @@ except locale.Error:
         # Fallback 
         print("Aviso: Locale pt-BR não encontrado. Usando locale padrão.")
 
-def generate_certificate_pdf(certificate):
-    buffer = BytesIO()
-    
-    # Define o tamanho da página em modo paisagem (Landscape)
-    p = canvas.Canvas(buffer, pagesize=landscape(letter))
-    width, height = landscape(letter)
-    
-    # Cores
-    COLOR_PRIMARIA = HexColor('#1D3557') 
-    COLOR_DESTAQUE = HexColor('#CDAD80') # Um dourado sóbrio
-    
-    # --- MOLDURA E FUNDO ---
-    
-    # 1. Borda Sólida (Azul Escuro)
-    p.setStrokeColor(COLOR_PRIMARIA)
-    p.setLineWidth(10)
-    p.rect(20, 20, width - 40, height - 40)
-    
-    # 2. Faixa Superior 
-    p.setFillColor(COLOR_PRIMARIA)
-    p.rect(20, height - 60, width - 40, 40, fill=1)
-    
-    # 3. Textos da Faixa Superior
-    p.setFont("Helvetica-Bold", 18)
-    p.setFillColor(HexColor('#FFFFFF'))
-    p.drawCentredString(width/2, height - 45, "Certificado de Comprovação de Participação")
-    
-    # --- CONTEÚDO PRINCIPAL ---
-
-    # Título Principal
-    p.setFillColor(COLOR_PRIMARIA)
-    p.setFont("Helvetica-Bold", 36)
-    p.drawCentredString(width/2, height - 150, "Certificamos Que")
-
-    # Nome do Participante 
-    p.setFillColor(COLOR_DESTAQUE)
-    p.setFont("Helvetica-Bold", 40)
-    p.drawCentredString(width/2, height - 210, f"{certificate.user.first_name} {certificate.user.last_name}")
-
-    # Descrição da Participação
-    p.setFillColor(COLOR_PRIMARIA)
-    p.setFont("Helvetica", 22)
-    p.drawCentredString(width/2, height - 260, "Participou com êxito do evento:")
-    
-    # Título do Evento
-    p.setFont("Helvetica-Bold", 26)
-    p.drawCentredString(width/2, height - 300, certificate.event.title)
+# Incrementar sempre que o layout do certificado mudar: invalida todos os PDFs em cache
+CERTIFICATE_TEMPLATE_VERSION = 3
 
-    # Informações Detalhadas
-    p.setFont("Helvetica", 14)
-    p.setFillColor(HexColor('#333333'))
+PAGE_SIZE = landscape(letter)
 
-    # --- LÓGICA DE FORMATAÇÃO DE DATA E HORA INTELIGENTE ---
-    start_dt = certificate.event.start_date
-    end_dt = certificate.event.end_date
+# Cores
+COLOR_PRIMARIA = HexColor('#1D3557') 
+COLOR_DESTAQUE = HexColor('#CDAD80') # Um dourado sóbrio
+COLOR_TEXTO = HexColor('#333333')
+COLOR_BRANCO = HexColor('#FFFFFF')
+COLOR_PRETO = HexColor('#000000')
 
+
+def format_event_period(start_dt, end_dt):
+    """Texto de data/hora do evento (um dia, vários dias ou só início)."""
     hora_inicio = start_dt.strftime('%H:%M')
     hora_fim = end_dt.strftime('%H:%M') if end_dt else None
 
@@ -92,74 +59,299 @@ def generate_certificate_pdf(certificate):
     else:
         # Padrão / Evento com apenas data de início
         periodo_str = f"Data: {data_inicio_formatada} às {hora_inicio}"
+
+    return periodo_str
+
+
+class CertificateTemplate:
+    """
+    Tudo o que é igual para todos os certificados de um evento: moldura, faixa,
+    títulos, dados do evento e assinaturas. É desenhado uma vez por evento e o
+    resultado (os operadores PDF da página) é reaproveitado em cada PDF; por
+    certificado só entram o nome, o QR Code, o código e a data de emissão.
+    """
+
+    def __init__(self, title, location_address, start_date, end_date, organizer_first_name, organizer_last_name):
+        self.event_title = title
+        self.period = format_event_period(start_date, end_date)
+        self.location = f"Local: {location_address}"
+        self.organization = f"Organização: {organizer_first_name}"
+        self.organizer_signature = f"{organizer_first_name} {organizer_last_name}"
+        self._background = self._prerender_background()
+
+    @staticmethod
+    def printed_fields(event):
+        organizer = event.organizer
+        return (
+            event.title, event.location_address, event.start_date, event.end_date,
+            organizer.first_name, organizer.last_name,
+        )
+
+    @classmethod
+    def for_event(cls, event):
+        """Template do evento, reaproveitado entre renderizações enquanto os dados impressos não mudarem."""
+        return _cached_template(*cls.printed_fields(event))
+
+    def _prerender_background(self):
+        """
+        Desenha o fundo uma vez num PDF sem compressão e lê de volta, com o pypdf,
+        o stream de operadores e as fontes que ele usa (/F1, /F2...). Só API pública:
+        em cada PDF o stream entra por addLiteral e as fontes são registradas com
+        setFont na mesma ordem. Se os nomes não baterem, retorna None e o fundo é
+        redesenhado em cada PDF.
+        """
+        scratch = canvas.Canvas(BytesIO(), pagesize=PAGE_SIZE, pageCompression=0)
+        self.draw_background(scratch)
+        scratch.showPage()
+        fonts, content = _page_fonts_and_content(scratch.getpdfdata())
+        background = ([font for _, font in fonts], content)
+
+        probe = canvas.Canvas(BytesIO(), pagesize=PAGE_SIZE, pageCompression=0)
+        self._register_fonts(probe, background[0])
+        probe.showPage()
+        if _page_fonts_and_content(probe.getpdfdata())[0] != fonts:
+            logger.warning("Fundo do certificado não pôde ser reaproveitado; será redesenhado em cada PDF.")
+            return None
+        return background
+
+    @staticmethod
+    def _register_fonts(p, fonts):
+        for font in fonts:
+            p.setFont(font, 12)
+
+    def add_background(self, p):
+        """Fundo do certificado no canvas `p`: o pré-renderizado, ou desenhado do zero."""
+        if self._background is None:
+            self.draw_background(p)
+            return
+        fonts, content = self._background
+        p.saveState()
+        self._register_fonts(p, fonts)
+        p.addLiteral(content)
+        p.restoreState()
+
+    def draw_background(self, p):
+        width, height = PAGE_SIZE
+
+        # --- MOLDURA E FUNDO ---
+        
+        # 1. Borda Sólida (Azul Escuro)
+        p.setStrokeColor(COLOR_PRIMARIA)
+        p.setLineWidth(10)
+        p.rect(20, 20, width - 40, height - 40)
         
-    p.drawCentredString(width/2, height - 350, periodo_str) # Posição 1 (Período/Data/Hora)
-    # --- FIM DA LÓGICA DE DATA E HORA ---
+        # 2. Faixa Superior 
+        p.setFillColor(COLOR_PRIMARIA)
+        p.rect(20, height - 60, width - 40, 40, fill=1)
+        
+        # 3. Textos da Faixa Superior
+        p.setFont("Helvetica-Bold", 18)
+        p.setFillColor(COLOR_BRANCO)
+        p.drawCentredString(width/2, height - 45, "Certificado de Comprovação de Participação")
+        
+        # --- CONTEÚDO FIXO ---
 
+        # Título Principal
+        p.setFillColor(COLOR_PRIMARIA)
+        p.setFont("Helvetica-Bold", 36)
+        p.drawCentredString(width/2, height - 150, "Certificamos Que")
 
-    # Local
-    p.drawCentredString(width/2, height - 370, 
-        f"Local: {certificate.event.location_address}") # Posição 2
+        # Descrição da Participação
+        p.setFont("Helvetica", 22)
+        p.drawCentredString(width/2, height - 260, "Participou com êxito do evento:")
+        
+        # Título do Evento
+        p.setFont("Helvetica-Bold", 26)
+        p.drawCentredString(width/2, height - 300, self.event_title)
 
-    # Organização
-    p.drawCentredString(width/2, height - 390, 
-        f"Organização: {certificate.event.organizer.first_name}") # Posição 3
+        # Informações Detalhadas
+        p.setFont("Helvetica", 14)
+        p.setFillColor(COLOR_TEXTO)
+        p.drawCentredString(width/2, height - 350, self.period) # Posição 1 (Período/Data/Hora)
+        p.drawCentredString(width/2, height - 370, self.location) # Posição 2
+        p.drawCentredString(width/2, height - 390, self.organization) # Posição 3
 
-    # --- QR CODE E VALIDAÇÃO (Canto Superior Direito da área inferior) ---
-    
-    validation_url = f"http://localhost:5173/validate/{certificate.validation_code}"
+        # --- ASSINATURAS (Canto Inferior Esquerdo) ---
+        
+        sig_x = 120
+        sig_y = 70 # Posição baixa
+        
+        p.setFillColor(COLOR_PRIMARIA)
+        p.setLineWidth(1)
+        
+        # 1. Assinatura do Participante / Instrutor
+        p.line(sig_x - 50, sig_y, sig_x + 200, sig_y)
+        p.setFont("Helvetica", 12)
+        p.drawCentredString(sig_x + 75, sig_y - 15, "Organizador(a) / Instrutor Líder")
+        p.setFont("Helvetica-Bold", 14)
+        p.drawCentredString(sig_x + 75, sig_y + 5, self.organizer_signature)
+        
+        # 2. Assinatura do Diretor/Validador
+        sig_x_dir = width - 250
+        p.line(sig_x_dir - 50, sig_y, sig_x_dir + 200, sig_y)
+        p.setFont("Helvetica", 12)
+        p.drawCentredString(sig_x_dir + 75, sig_y - 15, "Diretor(a) de Emissão (EventSync)")
+        p.setFont("Helvetica-Bold", 14)
+        p.drawCentredString(sig_x_dir + 75, sig_y + 5, "Equipe EventSync") 
 
-    qr_code_obj = qrcode.make(validation_url)
-    
-    img_buffer = BytesIO()
-    qr_code_obj.save(img_buffer, format='PNG') 
-    
-    img_buffer.seek(0)
-    qr_img_reportlab = ImageReader(img_buffer)
-    
-    qr_size = 100
-    qr_x = width - 220
-    qr_y = 170
-    
-    p.drawImage(qr_img_reportlab, qr_x, qr_y, width=qr_size, height=qr_size)
+    def render(self, certificate):
+        buffer = BytesIO()
+        width, height = PAGE_SIZE
+        p = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
 
-    # Texto do Código de Validação
-    p.setFont("Helvetica-Bold", 12)
-    p.setFillColor(COLOR_PRIMARIA)
-    p.drawString(qr_x - 10, qr_y - 20, "CÓDIGO DE VALIDAÇÃO:")
-    
-    p.setFont("Helvetica", 16)
-    p.drawString(qr_x - 10, qr_y - 40, f"{certificate.validation_code}")
+        self.add_background(p)
 
-    # --- ASSINATURAS (Canto Inferior Esquerdo) ---
-    
-    sig_x = 120
-    sig_y = 70 # Posição baixa
-    
-    p.setFillColor(COLOR_PRIMARIA)
-    p.setLineWidth(1)
-    
-    # 1. Assinatura do Participante / Instrutor
-    p.line(sig_x - 50, sig_y, sig_x + 200, sig_y)
-    p.setFont("Helvetica", 12)
-    p.drawCentredString(sig_x + 75, sig_y - 15, "Organizador(a) / Instrutor Líder")
-    p.setFont("Helvetica-Bold", 14)
-    p.drawCentredString(sig_x + 75, sig_y + 5, f"{certificate.event.organizer.first_name} {certificate.event.organizer.last_name}")
-    
-    # 2. Assinatura do Diretor/Validador
-    sig_x_dir = width - 250
-    p.line(sig_x_dir - 50, sig_y, sig_x_dir + 200, sig_y)
-    p.setFont("Helvetica", 12)
-    p.drawCentredString(sig_x_dir + 75, sig_y - 15, "Diretor(a) de Emissão (EventSync)")
-    p.setFont("Helvetica-Bold", 14)
-    p.drawCentredString(sig_x_dir + 75, sig_y + 5, "Equipe EventSync") 
-    
-    # Data de Emissão (Centralizada embaixo)
-    p.setFont("Helvetica-Oblique", 10)
-    p.drawCentredString(width/2, 40, f"Certificado emitido digitalmente em {timezone.now().strftime('%d de %B de %Y')}")
+        # Nome do Participante 
+        p.setFillColor(COLOR_DESTAQUE)
+        p.setFont("Helvetica-Bold", 40)
+        p.drawCentredString(width/2, height - 210, f"{certificate.user.first_name} {certificate.user.last_name}")
 
-    p.showPage()
-    p.save()
-    
-    buffer.seek(0)
-    return ContentFile(buffer.getvalue(), f'cert_{certificate.validation_code}.pdf')
\ No newline at end of file
+        # --- QR CODE E VALIDAÇÃO (Canto Superior Direito da área inferior) ---
+        
+        qr_size = 100
+        qr_x = width - 220
+        qr_y = 170
+        
+        draw_qr_code(p, certificate_validation_url(certificate), qr_x, qr_y, qr_size)
+
+        # Texto do Código de Validação
+        p.setFont("Helvetica-Bold", 12)
+        p.setFillColor(COLOR_PRIMARIA)
+        p.drawString(qr_x - 10, qr_y - 20, "CÓDIGO DE VALIDAÇÃO:")
+        
+        p.setFont("Helvetica", 16)
+        p.drawString(qr_x - 10, qr_y - 40, f"{certificate.validation_code}")
+
+        # Data de Emissão (Centralizada embaixo)
+        p.setFont("Helvetica-Oblique", 10)
+        p.drawCentredString(width/2, 40, f"Certificado emitido digitalmente em {certificate.issue_date.strftime('%d de %B de %Y')}")
+
+        p.showPage()
+        p.save()
+        
+        buffer.seek(0)
+        return ContentFile(buffer.getvalue(), f'cert_{certificate.validation_code}.pdf')
+
+
+def certificate_validation_url(certificate):
+    return f"{settings.CERTIFICATE_VALIDATION_BASE_URL}{certificate.validation_code}"
+
+
+@lru_cache(maxsize=1024)
+def qr_code_runs(data):
+    """
+    Matriz do QR Code de `data` reduzida a faixas horizontais (linha, coluna, comprimento)
+    de módulos escuros, e o tamanho da matriz em módulos (com a borda).
+    Fica em cache porque o fluxo de download repete as mesmas URLs.
+    """
+    # Máscara fixa: evita testar as 8 máscaras (a parte mais cara da geração) e o código continua válido
+    qr = qrcode.QRCode(border=4, mask_pattern=0)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    runs = []
+    for row, modules in enumerate(matrix):
+        col = 0
+        while col < len(modules):
+            if modules[col]:
+                start = col
+                while col < len(modules) and modules[col]:
+                    col += 1
+                runs.append((row, start, col - start))
+            else:
+                col += 1
+    return tuple(runs), len(matrix)
+
+
+def draw_qr_code(p, data, x, y, size):
+    """Desenha o QR Code como retângulos vetoriais no canvas, sem passar por PNG."""
+    runs, modules = qr_code_runs(data)
+    module = size / modules
+
+    path = p.beginPath()
+    for row, col, length in runs:
+        # A linha 0 da matriz é o topo; no PDF o eixo y cresce para cima
+        path.rect(x + col * module, y + size - (row + 1) * module, length * module, module)
+
+    p.saveState()
+    p.setFillColor(COLOR_PRETO)
+    p.drawPath(path, stroke=0, fill=1)
+    p.restoreState()
+
+
+def _page_fonts_and_content(pdf):
+    """Fontes da primeira página, [(/F1, nome), ...] em ordem, e o stream de operadores dela."""
+    page = PdfReader(BytesIO(pdf)).pages[0]
+    fonts = page['/Resources'].get('/Font', {})
+    ordered = sorted(fonts.items(), key=lambda item: (len(item[0]), item[0]))  # /F2 antes de /F10
+    return [(name, font['/BaseFont'][1:]) for name, font in ordered], page.get_contents().get_data().decode('latin-1')
+
+
+@lru_cache(maxsize=256)
+def _cached_template(*printed_fields):
+    return CertificateTemplate(*printed_fields)
+
+
+def generate_certificate_pdf(certificate):
+    return CertificateTemplate.for_event(certificate.event).render(certificate)
+
+
+def certificate_fingerprint(certificate):
+    """
+    Hash de tudo o que aparece no PDF. Se o título, as datas ou algum nome mudar,
+    o hash muda e o PDF antigo deixa de ser servido.
+    """
+    event = certificate.event
+    parts = [
+        CERTIFICATE_TEMPLATE_VERSION,
+        certificate_validation_url(certificate),
+        certificate.issue_date.isoformat(),
+        certificate.user.first_name, certificate.user.last_name,
+        event.title, event.location_address,
+        event.start_date.isoformat(), event.end_date.isoformat() if event.end_date else '',
+        event.organizer.first_name, event.organizer.last_name,
+    ]
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def get_certificate_storage():
+    return storages[getattr(settings, 'CERTIFICATE_STORAGE_ALIAS', 'default')]
+
+
+def _store_in_place(storage, path, content):
+    """
+    Grava `content` em `path` de uma vez: quem lê nunca vê o arquivo pela metade e
+    duas requisições concorrentes terminam com o mesmo arquivo, sem cópias _<sufixo>.
+    """
+    if isinstance(storage, FileSystemStorage):
+        # Grava com nome temporário (oculto, fora da limpeza) e renomeia: os.replace é atômico
+        directory, name = path.rsplit('/', 1)
+        temp = storage.save(f'{directory}/.{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(storage.path(temp), storage.path(path))
+        return
+    # Object storages gravam a chave inteira ou nada; se outra requisição gravou antes, o nome
+    # pode ganhar sufixo: fica a dela, que tem o mesmo conteúdo
+    saved = storage.save(path, content)
+    if saved != path:
+        storage.delete(saved)
+
+
+def get_cached_certificate_pdf(certificate):
+    """
+    Retorna (storage, caminho) do PDF do certificado, renderizando só na primeira vez.
+    Os arquivos ficam em certificates/<codigo>/<fingerprint>.pdf; depois de gravar a
+    versão atual, as de fingerprint antigo são removidas.
+    """
+    storage = get_certificate_storage()
+    directory = f'certificates/{certificate.validation_code}'
+    name = f'{certificate_fingerprint(certificate)}.pdf'
+    path = f'{directory}/{name}'
+
+    if not storage.exists(path):
+        _store_in_place(storage, path, generate_certificate_pdf(certificate))
+        for stale in storage.listdir(directory)[1]:
+            if stale != name and not stale.startswith('.'):
+                storage.delete(f'{directory}/{stale}')
+
+    return storage, path
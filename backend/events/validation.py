@@ -0,0 +1,66 @@
+"""
+Validação pública de certificados (QR Code impresso), com cache por código.
+
+Certificado, aluno, evento e organizador vêm num único JOIN; a resposta pronta
+fica no cache do Django, inclusive a de código inexistente (cache negativo),
+para varreduras de códigos inventados não chegarem ao banco. Certificados não
+mudam depois de emitidos: um certificado apagado ainda valida por até
+VALID_TIMEOUT.
+"""
+from django.core.cache import cache
+
+from .models import Certificate
+from .serializers import CertificateSerializer
+
+VALID_TIMEOUT = 60 * 60
+NOT_FOUND_TIMEOUT = 5 * 60
+MAX_CODE_LENGTH = Certificate._meta.get_field('validation_code').max_length
+
+NOT_FOUND = (404, {'valid': False, 'message': 'O código não foi encontrado ou expirou.'})
+
+
+def _cache_key(code):
+    return f'certificate-validation:{code}'
+
+
+def _certificate(code):
+    return Certificate.objects.select_related('user', 'event__organizer').filter(validation_code=code)
+
+
+def _entry(certificate):
+    """(status, corpo) da resposta e por quanto tempo guardá-la."""
+    if certificate is None:
+        return NOT_FOUND, NOT_FOUND_TIMEOUT
+    body = {
+        'valid': True,
+        'message': 'Certificado válido!',
+        'certificate_details': CertificateSerializer(certificate).data,
+    }
+    return (200, body), VALID_TIMEOUT
+
+
+def _well_formed(code):
+    # Os códigos são hexadecimais; o resto nem vira chave de cache
+    return code.isalnum() and len(code) <= MAX_CODE_LENGTH
+
+
+def validate_code(code):
+    """(status, corpo) da validação do código."""
+    if not _well_formed(code):
+        return NOT_FOUND
+    result = cache.get(_cache_key(code))
+    if result is None:
+        result, timeout = _entry(_certificate(code).first())
+        cache.set(_cache_key(code), result, timeout)
+    return result
+
+
+async def avalidate_code(code):
+    """validate_code para as views async (ORM e cache assíncronos)."""
+    if not _well_formed(code):
+        return NOT_FOUND
+    result = await cache.aget(_cache_key(code))
+    if result is None:
+        result, timeout = _entry(await _certificate(code).afirst())
+        await cache.aset(_cache_key(code), result, timeout)
+    return result
@@ -1,34 +1,41 @@
-from rest_framework import viewsets, permissions, serializers, status
+from rest_framework import mixins, viewsets, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.utils import timezone
-from django.db.models import Avg, Q 
-import uuid
-from .models import Event, Enrollment, Review, Certificate
-from .serializers import EventSerializer, EnrollmentSerializer, ReviewSerializer, CertificateSerializer
-from django.http import HttpResponse, FileResponse
-import csv
+from django.db.models import Q
+from .models import Event, Enrollment, LeaderboardEntry, Review, Certificate, XpEntry
+from .serializers import (
+    EventSerializer, EnrollmentSerializer, LeaderboardEntrySerializer, ModerationFilterSerializer, ReviewSerializer,
+    CertificateSerializer,
+)
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
-from .utils import generate_certificate_pdf
-
-# Função auxiliar para os Ranks
-def update_league(user):
-    """Atualiza a liga do usuário baseado no XP acumulado."""
-    xp = user.xp or 0
-    if xp < 200: user.league = 'Novato'
-    elif xp < 500: user.league = 'Bronze'
-    elif xp < 1000: user.league = 'Prata'
-    elif xp < 2000: user.league = 'Ouro'
-    elif xp < 3500: user.league = 'Platina'
-    elif xp < 6000: user.league = 'Diamante'
-    elif xp < 10000: user.league = 'Mestre dos Eventos'
-    else: user.league = 'CEO dos Eventos'
+from .utils import get_cached_certificate_pdf
+from .filters import EventFeedFilter
+from .pagination import EventFeedPagination, EventReviewPagination, LeaderboardPagination
+from .exports import EnrollmentExport
+from .issuance import start_certificate_batch, unique_validation_codes
+from .admission import admit, change_enrollment_status, delete_enrollment
+from .gamification import FINISH_XP, award_xp
+from .leaderboard import GLOBAL, SCOPES, rank_of, scope_key
+from .lifecycle import announce_cancellation, announce_finish
+from .moderation import APPROVE, MAX_IDS as MAX_MODERATION_IDS, REJECT, moderate
+from .ratings import create_review, delete_review, rating_stats, update_review
+from .throttles import CertificateValidationThrottle
+from .validation import validate_code as validate_certificate_code
+from .checkin import (
+    check_in, MAX_BATCH_SIZE, NOT_FOUND, INVALID, EVENT_NOT_IN_PROGRESS, NOT_APPROVED, ALREADY_CHECKED_IN,
+)
+from django_filters.rest_framework import DjangoFilterBackend
 
 class EventViewSet(viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = EventFeedPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = EventFeedFilter
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -37,63 +44,71 @@ class EventViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Se a ação for 'list' (o Feed da Home), aplicamos o filtro.
+        # with_viewer_state evita as queries por evento feitas no EventSerializer.
+        queryset = Event.objects.with_viewer_state(self.request.user)
         if self.action == 'list':
-            return Event.objects.exclude(status__in=['FINISHED', 'CANCELED']).order_by('start_date')
+            return queryset.feed()
 
-        return Event.objects.all().order_by('start_date')
+        return queryset.order_by('start_date')
 
     def perform_create(self, serializer):
         serializer.save(organizer=self.request.user, status='DRAFT')
 
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, pk=None):
+        """
+        Avaliações do evento, paginadas por cursor (mais recentes primeiro),
+        junto com o resumo 'stats' (média, total e histograma 1-5).
+        """
+        event = self.get_object()
+        reviews = Review.objects.filter(event=event).select_related('user')
+        paginator = EventReviewPagination()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        response = paginator.get_paginated_response(ReviewSerializer(page, many=True).data)
+        response.data['stats'] = rating_stats(event)
+        return response
+
     # --- AÇÕES DO ORGANIZADOR ---
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_created_events(self, request):
         # Histórico do Organizador (vê tudo: cancelados, finalizados, rascunhos)
         user = request.user
-        events = Event.objects.filter(organizer=user).order_by('-start_date')
+        events = Event.objects.with_viewer_state(user).filter(organizer=user).order_by('-start_date')
         serializer = self.get_serializer(events, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def export_enrollments(self, request, pk=None):
-        """Exporta todas as inscrições aprovadas/confirmadas como CSV."""
+        """
+        Exporta as inscrições do evento em streaming (CSV ou XLSX).
+        Parâmetros opcionais: ?columns=name,email,... ?status=APPROVED,PENDING ?file_format=xlsx
+        """
         event = self.get_object() # Obtém o objeto Evento
-        
-        # O nome do arquivo será EventSync_Inscritos_NomeDoEvento.csv
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="EventSync_Inscritos_{event.title.replace(" ", "_")}.csv"'
 
-        writer = csv.writer(response)
-        
-        # 1. Escrever o cabeçalho do CSV
-        writer.writerow(['Nome Completo', 'Email', 'Status da Inscricao', 'Check-in Realizado?', 'Data/Hora Check-in'])
+        columns = [c for c in request.query_params.get('columns', '').split(',') if c]
+        statuses = [s for s in request.query_params.get('status', '').split(',') if s]
 
-        # 2. Filtrar as Inscrições para exportar (pode filtrar apenas 'APPROVED' se quiser)
-        enrollments = Enrollment.objects.filter(event=event).select_related('user')
-        
-        # 3. Escrever os dados de cada linha
-        for enrollment in enrollments:
-            
-            checkin_status = 'Sim' if enrollment.checked_in else 'Não'
-            checkin_time = enrollment.checkin_time.strftime("%d/%m/%Y %H:%M") if enrollment.checkin_time else '-'
+        try:
+            export = EnrollmentExport(event, columns=columns, statuses=statuses)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
 
-            writer.writerow([
-                enrollment.user.first_name + ' ' + enrollment.user.last_name,
-                enrollment.user.email,
-                enrollment.get_status_display(), # Usa o nome amigável do status
-                checkin_status,
-                checkin_time
-            ])
+        # 'format' é reservado pelo DRF para negociação de conteúdo, por isso 'file_format'
+        if request.query_params.get('file_format') == 'xlsx':
+            try:
+                return export.xlsx_response()
+            except RuntimeError as exc:
+                return Response({'error': str(exc)}, status=400)
 
-        return response
+        return export.csv_response()
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def publish(self, request, pk=None):
         event = self.get_object()
         if event.organizer != request.user: return Response(status=403)
         event.status = 'PUBLISHED'
-        event.save()
+        event.save(update_fields=['status'])
         return Response({'status': 'Evento publicado!'})
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -106,7 +121,9 @@ class EventViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Evento em andamento ou finalizado não pode ser cancelado.'}, status=400)
 
         event.status = 'CANCELED'
-        event.save()
+        event.save(update_fields=['status'])
+        # Fan-out para todos os inscritos na fila de tarefas (bulk_create em blocos)
+        announce_cancellation(event)
         return Response({'status': 'Evento cancelado com sucesso.'})
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -114,7 +131,7 @@ class EventViewSet(viewsets.ModelViewSet):
         event = self.get_object()
         if event.organizer != request.user: return Response(status=403)
         event.status = 'IN_PROGRESS'
-        event.save()
+        event.save(update_fields=['status'])
         return Response({'status': 'Evento iniciado!'})
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -125,15 +142,16 @@ class EventViewSet(viewsets.ModelViewSet):
         if event.status == 'FINISHED': return Response({'error': 'Já finalizado.'}, status=400)
 
         event.status = 'FINISHED'
-        event.save()
+        event.save(update_fields=['status'])
         
-        # Gamificação Organizador
-        organizer = event.organizer
-        organizer.xp = (organizer.xp or 0) + 50 
-        update_league(organizer)
-        organizer.save()
+        # Gamificação Organizador (na fila de tarefas, fora da requisição); a chave impede lançar duas vezes
+        award_xp.enqueue(event.organizer_id, FINISH_XP, XpEntry.Reason.EVENT_FINISHED, event.pk, f'finish:{event.pk}')
+
+        # Emite e renderiza os certificados em segundo plano
+        start_certificate_batch(event)
+        announce_finish([event.pk])
 
-        return Response({'status': 'Evento finalizado! +50 XP.'})
+        return Response({'status': f'Evento finalizado! +{FINISH_XP} XP.'})
 
 class EnrollmentViewSet(viewsets.ModelViewSet):
     serializer_class = EnrollmentSerializer
@@ -141,54 +159,127 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Enrollment.objects.filter(Q(user=user) | Q(event__organizer=user)).distinct()
+        queryset = Enrollment.objects.with_related_state()
+
+        # Ações de detalhe buscam pela PK: o participante ou o organizador do evento podem vê-la
+        if self.action != 'list':
+            return queryset.filter(Q(user=user) | Q(event__organizer=user))
+
         event_id = self.request.query_params.get('event_id')
-        if event_id:
-            queryset = queryset.filter(event_id=event_id)
-        return queryset
+        organizes_event = bool(event_id) and Event.objects.organized_by(user, event_id).exists()
+        return queryset.visible_to(user, event_id, organizes_event)
 
     def perform_create(self, serializer):
         event = serializer.validated_data['event']
         if event.status != 'PUBLISHED': raise serializers.ValidationError("Inscrições fechadas.")
         initial_status = 'PENDING' if event.requires_approval else 'APPROVED'
-        serializer.save(user=self.request.user, status=initial_status)
+        # Vaga e inscrição na mesma transação (contador Event.seats_taken)
+        admit(serializer, event, self.request.user, initial_status)
+
+    def perform_destroy(self, instance):
+        delete_enrollment(instance)
 
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
         enrollment = self.get_object()
         if enrollment.event.organizer != request.user: return Response(status=403)
-        enrollment.status = 'APPROVED'
-        enrollment.save()
+        if not change_enrollment_status(enrollment, 'APPROVED'):
+            return Response({'error': 'Não há vagas disponíveis neste evento.'}, status=400)
         return Response({'status': 'Aprovado'})
 
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
         enrollment = self.get_object()
         if enrollment.event.organizer != request.user: return Response(status=403)
-        enrollment.status = 'REJECTED'
-        enrollment.save()
+        change_enrollment_status(enrollment, 'REJECTED')
         return Response({'status': 'Rejeitado'})
 
+    @action(detail=False, methods=['post'])
+    def moderate(self, request):
+        """
+        Aprova ou rejeita várias inscrições de um evento de uma vez.
+        Corpo: {"event": id, "action": "approve"|"reject", "ids": [uuid, ...]} ou, no lugar
+        de ids, {"filter": {"status": "PENDING", "created_before": iso8601}}.
+        Responde o resultado de cada inscrição.
+        """
+        event_id = request.data.get('event')
+        if not str(event_id).isdigit():
+            return Response({'error': "Informe o 'event'."}, status=400)
+        event = get_object_or_404(Event.objects.only('pk', 'organizer_id'), pk=event_id)
+        if event.organizer_id != request.user.pk: return Response(status=403)
+
+        action_name = request.data.get('action')
+        if action_name not in (APPROVE, REJECT):
+            return Response({'error': "Informe 'action': 'approve' ou 'reject'."}, status=400)
+
+        ids = request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not ids:
+                return Response({'error': "Informe a lista 'ids'."}, status=400)
+            if len(ids) > MAX_MODERATION_IDS:
+                return Response({'error': f'Máximo de {MAX_MODERATION_IDS} inscrições por lote.'}, status=400)
+            return Response({'results': moderate(event, action_name, ids=ids)})
+
+        filters = ModerationFilterSerializer(data=request.data.get('filter') or {})
+        filters.is_valid(raise_exception=True)
+        return Response({'results': moderate(event, action_name, **filters.validated_data)})
+
     @action(detail=True, methods=['post'])
-    def checkin(self, request, pk=None):
+    def cancel(self, request, pk=None):
+        """O próprio participante desiste da inscrição (ou sai da lista de espera)."""
         enrollment = self.get_object()
-        if enrollment.event.organizer != request.user: return Response(status=403)
-        
-        if enrollment.event.status != 'IN_PROGRESS':
-            return Response({'error': 'O evento precisa estar EM ANDAMENTO para realizar check-in.'}, status=400)
-
-        if enrollment.status != 'APPROVED': return Response({'error': 'Inscrição não aprovada.'}, status=400)
-        if enrollment.checked_in: return Response({'error': 'Check-in já realizado.'}, status=400)
+        if enrollment.user != request.user: return Response(status=403)
+        if enrollment.status in ['CANCELED', 'REJECTED'] or enrollment.checked_in:
+            return Response({'error': 'Esta inscrição não pode ser cancelada.'}, status=400)
+        change_enrollment_status(enrollment, 'CANCELED')
+        return Response({'status': 'Inscrição cancelada'})
 
-        enrollment.checked_in = True
-        enrollment.checkin_time = timezone.now()
-        enrollment.save()
+    @action(detail=True, methods=['post'])
+    def checkin(self, request, pk=None):
+        # Mesmo caminho do checkin_batch: sem get_object (OR + DISTINCT) e com UPDATE condicional
+        result = check_in(request.user, [pk])[0]['result']
+        if result == NOT_FOUND and Enrollment.objects.filter(pk=pk, user=request.user).exists():
+            # O participante vê a própria inscrição, mas só o organizador faz o check-in
+            return Response(status=403)
+        errors = {
+            NOT_FOUND: ({'detail': 'Não encontrado.'}, 404),
+            INVALID: ({'detail': 'Não encontrado.'}, 404),
+            EVENT_NOT_IN_PROGRESS: ({'error': 'O evento precisa estar EM ANDAMENTO para realizar check-in.'}, 400),
+            NOT_APPROVED: ({'error': 'Inscrição não aprovada.'}, 400),
+            ALREADY_CHECKED_IN: ({'error': 'Check-in já realizado.'}, 400),
+        }
+        if result in errors:
+            body, status_code = errors[result]
+            return Response(body, status=status_code)
         return Response({'status': 'Check-in realizado!'})
 
+    @action(detail=False, methods=['post'])
+    def checkin_batch(self, request):
+        """
+        Check-in em lote para os leitores de QR da portaria.
+        Corpo: {"ids": [uuid, ...]} ou, para reenviar a fila offline do leitor,
+        {"replay": true, "scans": [{"id": uuid, "scanned_at": iso8601}, ...]}.
+        Responde o resultado de cada item, na ordem recebida.
+        """
+        replay = bool(request.data.get('replay'))
+        scans = request.data.get('scans') if replay else request.data.get('ids')
+        if not isinstance(scans, list) or not scans:
+            return Response({'error': "Informe a lista 'ids' (ou 'scans' no modo replay)."}, status=400)
+        if len(scans) > MAX_BATCH_SIZE:
+            return Response({'error': f'Máximo de {MAX_BATCH_SIZE} itens por lote.'}, status=400)
+
+        return Response({'results': check_in(request.user, scans, replay=replay)})
+
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Review.objects.all()
+    queryset = Review.objects.select_related('user')
+
+    def get_queryset(self):
+        # Leitura é aberta; editar ou apagar (que mexe nos totais do evento e do organizador) só a própria
+        if self.action in ('update', 'partial_update', 'destroy'):
+            return self.queryset.filter(user=self.request.user)
+        return self.queryset
 
     def perform_create(self, serializer):
         event = serializer.validated_data['event']
@@ -202,20 +293,15 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if Review.objects.filter(user=user, event=event).exists():
             raise serializers.ValidationError("Já avaliado.")
 
-        review = serializer.save(user=user)
+        # Totais de avaliação do evento e do organizador atualizados na mesma transação;
+        # o XP do organizador vai pelo extrato, na fila de tarefas (events.ratings)
+        create_review(serializer, user=user)
 
-        organizer = event.organizer
-        avg_rating = Review.objects.filter(event__organizer=organizer).aggregate(Avg('rating'))['rating__avg']
-        organizer.organizer_rating = round(avg_rating, 1) if avg_rating else 0
+    def perform_update(self, serializer):
+        update_review(serializer)
 
-        xp_gain = 0
-        if review.rating == 5: xp_gain = 30
-        elif review.rating == 4: xp_gain = 15
-        elif review.rating == 3: xp_gain = 5
-        
-        organizer.xp = (organizer.xp or 0) + xp_gain
-        update_league(organizer)
-        organizer.save()
+    def perform_destroy(self, instance):
+        delete_review(instance)
 
 class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CertificateSerializer
@@ -258,56 +344,70 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
 
         # 4. GARANTIA DO CÓDIGO DE VALIDAÇÃO (CORREÇÃO)
         # Se o objeto é novo OU se o código de validação está vazio, nós o geramos e salvamos.
+        # (Ao finalizar o evento, o lote de emissão já cria todos os certificados com código.)
         if created or not certificate.validation_code:
-            
-            # Tenta gerar um código UUID de 8 caracteres e verifica a unicidade
-            new_code = str(uuid.uuid4()).replace('-', '').upper()[:8] 
-            
-            # Loop para garantir unicidade (embora a probabilidade seja baixíssima, é seguro)
-            while Certificate.objects.filter(validation_code=new_code).exists():
-                new_code = str(uuid.uuid4()).replace('-', '').upper()[:8]
-            
-            # Atribui e salva as informações
-            certificate.validation_code = new_code
+            certificate.validation_code = unique_validation_codes(1)[0]
             certificate.issue_date = timezone.now() 
             certificate.save() # Persiste o novo código no banco de dados
 
-        # 5. GERAÇÃO DO PDF (função ReportLab)
-        pdf_content_file = generate_certificate_pdf(certificate)
+        # 5. PDF EM CACHE (renderiza com ReportLab só quando ainda não existe ou o conteúdo mudou)
+        certificate = Certificate.objects.select_related('user', 'event__organizer').get(pk=certificate.pk)
+        storage, pdf_path = get_cached_certificate_pdf(certificate)
+        filename = f'cert_{certificate.validation_code}.pdf'
         
         # 6. RETORNA O PDF COMO RESPOSTA DE DOWNLOAD
-        response = FileResponse(pdf_content_file, content_type='application/pdf')
+        response = FileResponse(storage.open(pdf_path, 'rb'), content_type='application/pdf')
         
         # Define o nome do arquivo para o navegador
-        response['Content-Disposition'] = f'attachment; filename="{pdf_content_file.name}"'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         # Necessário para o Front-end Axios/Blob obter o nome do arquivo
         response['Access-Control-Expose-Headers'] = 'Content-Disposition'
 
         return response
     
-    @action(detail=False, methods=['get'], permission_classes=[AllowAny], url_path='validate_code/(?P<code>[^/.]+)')
+    @action(
+        detail=False, methods=['get'], permission_classes=[AllowAny], throttle_classes=[CertificateValidationThrottle],
+        url_path='validate_code/(?P<code>[^/.]+)',
+    )
     def validate_code(self, request, code):
         """
         Endpoint público usado pelo QR Code para verificar a validade de um certificado.
         Recebe o código de validação via URL (ex: /api/certificates/validate_code/1B394CAF).
+        Um JOIN só e resposta em cache (também para código inexistente); limitado por IP.
         """
-        try:
-            # 1. Busca o certificado pelo código de validação
-            certificate = Certificate.objects.get(validation_code=code)
-            
-            # 2. Retorna sucesso e os dados (para Front-end mostrar detalhes)
-            serializer = self.get_serializer(certificate) # Usando o CertificateSerializer existente
-            
-            return Response({
-                "valid": True,
-                "message": "Certificado válido!",
-                "certificate_details": serializer.data
-            }, status=status.HTTP_200_OK)
-            
-        except Certificate.DoesNotExist:
-            # 3. Retorna erro 404 se não encontrado
-            return Response({
-                "valid": False,
-                "message": "O código não foi encontrado ou expirou."
-            }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        response_status, body = validate_certificate_code(code)
+        return Response(body, status=response_status)
+
+class LeaderboardViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Rankings de XP (events.leaderboard), com ?scope=global|league|city.
+    A lista é o top N materializado; em league/city, ?key= escolhe a liga ou a
+    cidade (sem ele, a de quem pede).
+    """
+    serializer_class = LeaderboardEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LeaderboardPagination
+
+    def get_scope(self):
+        scope = self.request.query_params.get('scope', GLOBAL)
+        if scope not in SCOPES:
+            raise serializers.ValidationError({'scope': [f"Use um de: {', '.join(SCOPES)}."]})
+        return scope
+
+    def get_queryset(self):
+        scope = self.get_scope()
+        key = '' if scope == GLOBAL else self.request.query_params.get('key')
+        if key is None:
+            key = scope_key(self.request.user, scope) or ''
+        return LeaderboardEntry.objects.filter(scope=scope, key=key).select_related('user')
+
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        """Minha posição no ranking do escopo, pelo XP atual (rank null se não entro nele)."""
+        scope = self.get_scope()
+        user = request.user
+        return Response({
+            'scope': scope, 'key': scope_key(user, scope), 'xp': user.xp, 'league': user.league,
+            'rank': rank_of(user, scope),
+        })
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import F
+
+from core.notifications import notify
+from core.tasks import task
+from .live import publish_event_change
+from .models import Enrollment, Event
+
+
+def next_waitlist_position(event_id):
+    """Distribui a próxima posição da fila do evento (chamar dentro de uma transação)."""
+    Event.objects.filter(pk=event_id).update(waitlist_tail=F('waitlist_tail') + 1)
+    return Event.objects.filter(pk=event_id).values_list('waitlist_tail', flat=True).get()
+
+
+@task()
+def promote_waitlist(event_id):
+    """
+    Preenche as vagas livres do evento com o início da fila, tudo em lote:
+    um UPDATE nas inscrições, um no contador de vagas e um bulk_create de notificações.
+    Retorna a quantidade de inscrições promovidas.
+    """
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event_id)
+        if event.status not in ['PUBLISHED', 'IN_PROGRESS']:
+            return 0
+
+        heads = Enrollment.objects.filter(event=event, status='WAITLISTED').order_by('waitlist_position')
+        if event.max_enrollments:
+            free = event.max_enrollments - event.seats_taken
+            if free <= 0:
+                return 0
+            heads = heads[:free]
+
+        promoted = list(heads.values_list('pk', 'user_id'))
+        if not promoted:
+            return 0
+
+        new_status = 'PENDING' if event.requires_approval else 'APPROVED'
+        Enrollment.objects.filter(pk__in=[pk for pk, _ in promoted]).update(status=new_status, waitlist_position=None)
+        publish_event_change(event.pk, 'enrollment', {'ids': [str(pk) for pk, _ in promoted], 'status': new_status})
+        Event.objects.filter(pk=event.pk).update(seats_taken=F('seats_taken') + len(promoted))
+
+        situation = 'aguardando aprovação do organizador' if new_status == 'PENDING' else 'confirmada'
+        notify(
+            [user_id for _, user_id in promoted],
+            'Você saiu da lista de espera!',
+            f'Abriu uma vaga em "{event.title}". Sua inscrição está {situation}.',
+        )
+
+    return len(promoted)
+
+
+def schedule_waitlist_promotion(event_id):
+    """
+    Coloca a promoção na fila de tarefas (vale depois do commit). Vagas liberadas em
+    sequência no mesmo evento se juntam numa única tarefa enquanto ela não roda.
+    """
+    promote_waitlist.enqueue_unique(f'waitlist:{event_id}', event_id)
@@ -0,0 +1,24 @@
+"""
+Funções executadas nos processos do pool de renderização.
+
+Com o contexto 'spawn' este módulo é importado antes do Django estar configurado,
+por isso os models só são importados dentro das funções.
+"""
+
+
+def init_render_worker():
+    import django
+    django.setup()
+
+
+def render_certificate_chunk(certificate_ids):
+    """Renderiza (ou reaproveita do cache) o PDF de cada certificado do bloco."""
+    from django.db import connections
+    from .models import Certificate
+    from .utils import get_cached_certificate_pdf
+
+    queryset = Certificate.objects.filter(pk__in=certificate_ids).select_related('user', 'event__organizer')
+    for certificate in queryset:
+        get_cached_certificate_pdf(certificate)
+    connections.close_all()
+    return len(certificate_ids)
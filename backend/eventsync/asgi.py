@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eventsync.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # Como o runserver fazia: arquivos estáticos (admin) servidos pelo próprio app em desenvolvimento
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    application = ASGIStaticFilesHandler(application)
@@ -91,6 +91,14 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'eventsync.utils.custom_exception_handler',
+    # Proxies reversos na frente da aplicação: o IP dos limites por cliente sai do
+    # X-Forwarded-For só até esse número de saltos. Com 0 vale o REMOTE_ADDR e o
+    # cabeçalho (que o cliente escreve como quiser) é ignorado.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_RATES': {
+        # Balde de fichas por IP da validação pública de certificados (events.throttles)
+        'certificate_validation': '60/min',
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -131,4 +139,17 @@ ACCOUNT_EMAIL_VERIFICATION = 'none'
 
 ACCOUNT_AUTHENTICATION_METHOD = 'email'
 ACCOUNT_EMAIL_REQUIRED = True
-ACCOUNT_USERNAME_REQUIRED = False 
\ No newline at end of file
+ACCOUNT_USERNAME_REQUIRED = False 
+# Storage (alias de STORAGES) onde os PDFs de certificados ficam em cache
+CERTIFICATE_STORAGE_ALIAS = 'default'
+
+# Endereço do front-end usado no QR Code dos certificados (o código é concatenado no final)
+CERTIFICATE_VALIDATION_BASE_URL = os.environ.get('CERTIFICATE_VALIDATION_BASE_URL', 'http://localhost:5173/validate/')
+
+# Fila de tarefas (core.tasks): 'thread' roda num pool do próprio processo;
+# 'database' deixa na tabela para os workers `manage.py run_tasks`
+TASK_BACKEND = os.environ.get('TASK_BACKEND', 'thread')
+TASK_THREADS = int(os.environ.get('TASK_THREADS', 4))
+
+# Pub/sub do canal ao vivo (events.live); o padrão só entrega dentro do mesmo processo
+LIVE_BROKER = os.environ.get('LIVE_BROKER', 'events.live.InProcessBroker')
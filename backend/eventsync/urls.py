@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from core.views import UserUpdateView
-from events.views import EventViewSet, EnrollmentViewSet, ReviewViewSet, CertificateViewSet
+from core.views import NotificationViewSet, UserUpdateView
+from events.views import EventViewSet, EnrollmentViewSet, LeaderboardViewSet, ReviewViewSet, CertificateViewSet
+from events import async_views
+from events.live import event_live
+from social.views import ConversationViewSet, EventAttendeesView, FriendshipViewSet, MessageViewSet
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -11,11 +14,23 @@ router.register(r'events', EventViewSet)
 router.register(r'enrollments', EnrollmentViewSet, basename='enrollment')
 router.register(r'reviews', ReviewViewSet, basename='review')
 router.register(r'certificates', CertificateViewSet, basename='certificate')
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'notifications', NotificationViewSet, basename='notification')
+router.register(r'friendships', FriendshipViewSet, basename='friendship')
+router.register(r'messages', MessageViewSet, basename='message')
+router.register(r'conversations', ConversationViewSet, basename='conversation')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('dj_rest_auth.urls')),
     path('auth/registration/', include('dj_rest_auth.registration.urls')),
     path('auth/user/', UserUpdateView.as_view(), name='user_details'),
+    path('api/events/<int:pk>/live/', event_live, name='event_live'),
+    path('api/events/<int:event_id>/attendees/', EventAttendeesView.as_view(), name='event_attendees'),
+    # Leituras quentes em views async (servir via eventsync.asgi)
+    path('api/async/events/', async_views.event_feed, name='async_event_feed'),
+    path('api/async/events/<int:pk>/', async_views.event_detail, name='async_event_detail'),
+    path('api/async/enrollments/', async_views.enrollment_list, name='async_enrollment_list'),
+    path('api/async/certificates/validate_code/<str:code>/', async_views.validate_certificate, name='async_validate_code'),
     path('api/', include(router.urls)),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
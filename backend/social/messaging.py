@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Sum, When
+
+from .models import Conversation, ConversationMember, Message, canonical_pair
+
+
+def get_or_create_conversation(user_a, user_b):
+    """Conversa do par (e os dois lados dela), criada na primeira mensagem."""
+    low, high = canonical_pair(user_a, user_b)
+    with transaction.atomic():
+        conversation, created = Conversation.objects.get_or_create(user_low_id=low, user_high_id=high)
+        if created:
+            ConversationMember.objects.bulk_create([
+                ConversationMember(conversation=conversation, user_id=user_id) for user_id in (low, high)
+            ])
+    return conversation
+
+
+def send_message(sender, recipient, body, subject=''):
+    """
+    Grava a mensagem e atualiza, com F(), o ponteiro da última mensagem, a data
+    da caixa de entrada dos dois lados e as não lidas do destinatário.
+    """
+    with transaction.atomic():
+        conversation = get_or_create_conversation(sender, recipient)
+        message = Message.objects.create(
+            conversation=conversation, sender=sender, recipient=recipient, subject=subject, body=body,
+        )
+        Conversation.objects.filter(pk=conversation.pk).update(
+            last_message=message, last_message_at=message.created_at,
+        )
+        ConversationMember.objects.filter(conversation=conversation).update(
+            last_message_at=message.created_at,
+            unread_count=Case(
+                When(user=recipient, then=F('unread_count') + 1), default=F('unread_count'),
+                output_field=PositiveIntegerField(),
+            ),
+        )
+    return message
+
+
+def mark_conversation_read(user, conversation_id):
+    """Marca como lidas as mensagens recebidas na conversa e zera o contador do lado do usuário."""
+    with transaction.atomic():
+        updated = Message.objects.filter(conversation_id=conversation_id, recipient=user, read=False).update(read=True)
+        ConversationMember.objects.filter(conversation_id=conversation_id, user=user).update(unread_count=0)
+    return updated
+
+
+def unread_total(user):
+    return ConversationMember.objects.filter(user=user).aggregate(total=Sum('unread_count'))['total'] or 0
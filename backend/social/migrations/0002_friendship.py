@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_friendships(apps, schema_editor):
+    # Um registro por par, a partir dos pedidos já aceitos (em qualquer direção)
+    FriendshipRequest = apps.get_model('social', 'FriendshipRequest')
+    Friendship = apps.get_model('social', 'Friendship')
+    pairs = {
+        tuple(sorted(pair))
+        for pair in FriendshipRequest.objects.filter(status='ACCEPTED').values_list('from_user_id', 'to_user_id')
+        if pair[0] != pair[1]
+    }
+    Friendship.objects.bulk_create(
+        [Friendship(user_low_id=low, user_high_id=high) for low, high in pairs], batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_low', 'user_high'), name='friendship_pair_unique'), models.CheckConstraint(condition=models.Q(('user_low__lt', models.F('user_high'))), name='friendship_pair_ordered')],
+            },
+        ),
+        migrations.RunPython(fill_friendships, migrations.RunPython.noop),
+    ]
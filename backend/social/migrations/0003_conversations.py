@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def fill_conversations(apps, schema_editor):
+    # Uma conversa por par que já trocou mensagens, com última mensagem e não lidas de cada lado
+    Message = apps.get_model('social', 'Message')
+    Conversation = apps.get_model('social', 'Conversation')
+    ConversationMember = apps.get_model('social', 'ConversationMember')
+    # Mensagem para si mesmo não tem par (user_low < user_high): fica sem conversa, intacta
+    exchanged = Message.objects.exclude(sender_id=F('recipient_id'))
+    pairs = {tuple(sorted(pair)) for pair in exchanged.values_list('sender_id', 'recipient_id').distinct()}
+    for low, high in pairs:
+        messages = Message.objects.filter(Q(sender_id=low, recipient_id=high) | Q(sender_id=high, recipient_id=low))
+        last = messages.order_by('-created_at', '-id').first()
+        conversation = Conversation.objects.create(
+            user_low_id=low, user_high_id=high, last_message=last, last_message_at=last.created_at,
+        )
+        messages.update(conversation=conversation)
+        ConversationMember.objects.bulk_create([
+            ConversationMember(
+                conversation=conversation, user_id=user_id, last_message_at=last.created_at,
+                unread_count=messages.filter(recipient_id=user_id, read=False).count(),
+            )
+            for user_id in (low, high)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_friendship'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='subject',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='social.message')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='social.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-created_at', '-id'], name='message_thread_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversationmember',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='social.conversation'),
+        ),
+        migrations.AddField(
+            model_name='conversationmember',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='conversation_pair_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.CheckConstraint(condition=models.Q(('user_low__lt', models.F('user_high'))), name='conversation_pair_ordered'),
+        ),
+        migrations.AddIndex(
+            model_name='conversationmember',
+            index=models.Index(fields=['user', '-last_message_at', '-id'], name='conversation_member_inbox_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='conversationmember',
+            unique_together={('conversation', 'user')},
+        ),
+        migrations.RunPython(fill_conversations, migrations.RunPython.noop),
+    ]
@@ -19,10 +19,89 @@ class FriendshipRequest(models.Model):
     class Meta:
         unique_together = ('from_user', 'to_user', 'event')
 
+def canonical_pair(user_a, user_b):
+    """Ids do par em ordem canônica (menor, maior); aceita usuários ou ids."""
+    return tuple(sorted(getattr(user, 'pk', user) for user in (user_a, user_b)))
+
+class FriendshipQuerySet(models.QuerySet):
+    def between(self, user_a, user_b):
+        low, high = canonical_pair(user_a, user_b)
+        return self.filter(user_low_id=low, user_high_id=high)
+
+    def are_friends(self, user_a, user_b):
+        """Uma sondagem só no índice único do par, em vez de OR nas duas direções."""
+        return self.between(user_a, user_b).exists()
+
+class Friendship(models.Model):
+    """
+    Amizade aceita, simétrica: guardada uma única vez por par, com o menor id em
+    user_low. FriendshipRequest continua sendo o pedido (quem pediu, em qual evento).
+    """
+    user_low = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    user_high = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FriendshipQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='friendship_pair_unique'),
+            models.CheckConstraint(condition=models.Q(user_low__lt=models.F('user_high')), name='friendship_pair_ordered'),
+        ]
+
+    @classmethod
+    def befriend(cls, user_a, user_b):
+        low, high = canonical_pair(user_a, user_b)
+        return cls.objects.get_or_create(user_low_id=low, user_high_id=high)[0]
+
+class Conversation(models.Model):
+    """
+    Conversa privada entre dois usuários (par canônico, como em Friendship), com
+    ponteiro para a última mensagem: a caixa de entrada não precisa agrupar Message.
+    """
+    user_low = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    user_high = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    last_message = models.ForeignKey('Message', null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='conversation_pair_unique'),
+            models.CheckConstraint(condition=models.Q(user_low__lt=models.F('user_high')), name='conversation_pair_ordered'),
+        ]
+
+    def other_user(self, user):
+        return self.user_high if getattr(user, 'pk', user) == self.user_low_id else self.user_low
+
+class ConversationMember(models.Model):
+    """
+    Lado de um participante na conversa: não lidas dele e uma cópia de
+    last_message_at, para a caixa de entrada ser um range no índice (user, -last_message_at).
+    """
+    conversation = models.ForeignKey(Conversation, related_name='members', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='conversations', on_delete=models.CASCADE)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('conversation', 'user')
+        indexes = [
+            models.Index(fields=['user', '-last_message_at', '-id'], name='conversation_member_inbox_idx'),
+        ]
+
 class Message(models.Model):
+    # Vazio só em mensagens antigas para si mesmo, de antes das conversas (não existe par para elas)
+    conversation = models.ForeignKey(Conversation, null=True, related_name='messages', on_delete=models.CASCADE)
     sender = models.ForeignKey(User, related_name='sent_messages', on_delete=models.CASCADE)
     recipient = models.ForeignKey(User, related_name='received_messages', on_delete=models.CASCADE)
-    subject = models.CharField(max_length=200)
+    subject = models.CharField(max_length=200, blank=True, default='')
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    read = models.BooleanField(default=False)
\ No newline at end of file
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Histórico da conversa, mais recentes primeiro (paginação por cursor)
+            models.Index(fields=['conversation', '-created_at', '-id'], name='message_thread_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AttendeePagination(CursorPagination):
+    """
+    Participantes de um evento pela ordem do índice enrollment_event_status_idx
+    (event, status, user): a página é um range no índice, sem ordenar em memória.
+    """
+    ordering = ('user_id',)
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class InboxPagination(CursorPagination):
+    """Caixa de entrada: conversas com atividade mais recente primeiro (conversation_member_inbox_idx)."""
+    ordering = ('-last_message_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ThreadPagination(CursorPagination):
+    """Histórico de uma conversa, mais recentes primeiro (message_thread_idx)."""
+    ordering = ('-created_at', '-id')
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,12 +1,36 @@
 from rest_framework import serializers
-from .models import FriendshipRequest, Message
+from .models import ConversationMember, FriendshipRequest, Message
 from core.models import User
+from events.models import Enrollment
+from events.serializers import stored_file_url
 
 class UserSocialSerializer(serializers.ModelSerializer):
+    photo_url = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = ['id', 'first_name', 'last_name', 'email', 'photo_url', 'city']
 
+    def get_photo_url(self, obj):
+        return stored_file_url(obj.photo)
+
+class AttendeeSerializer(serializers.ModelSerializer):
+    """Participante confirmado, lido a partir da inscrição (sem e-mail: é visível para os outros)."""
+    id = serializers.ReadOnlyField(source='user.id')
+    first_name = serializers.ReadOnlyField(source='user.first_name')
+    last_name = serializers.ReadOnlyField(source='user.last_name')
+    city = serializers.ReadOnlyField(source='user.city')
+    photo_url = serializers.SerializerMethodField()
+    # Anotado na consulta da descoberta
+    is_friend = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Enrollment
+        fields = ['id', 'first_name', 'last_name', 'photo_url', 'city', 'is_friend']
+
+    def get_photo_url(self, obj):
+        return stored_file_url(obj.user.photo)
+
 class FriendshipRequestSerializer(serializers.ModelSerializer):
     from_user = UserSocialSerializer(read_only=True)
     event_title = serializers.ReadOnlyField(source='event.title')
@@ -22,4 +46,28 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = '__all__'
-        read_only_fields = ['sender', 'created_at', 'read']
\ No newline at end of file
+        read_only_fields = ['conversation', 'sender', 'created_at', 'read']
+
+class ThreadMessageSerializer(serializers.ModelSerializer):
+    # Dentro da conversa os participantes já são conhecidos: só os ids, sem carregar o usuário
+    class Meta:
+        model = Message
+        fields = ['id', 'sender', 'recipient', 'subject', 'body', 'created_at', 'read']
+        read_only_fields = ['sender', 'recipient', 'created_at', 'read']
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """Linha da caixa de entrada (o lado do usuário na conversa)."""
+    id = serializers.ReadOnlyField(source='conversation_id')
+    other_user = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ConversationMember
+        fields = ['id', 'other_user', 'last_message', 'last_message_at', 'unread_count']
+
+    def get_other_user(self, obj):
+        return UserSocialSerializer(obj.conversation.other_user(obj.user_id)).data
+
+    def get_last_message(self, obj):
+        message = obj.conversation.last_message
+        return ThreadMessageSerializer(message).data if message else None
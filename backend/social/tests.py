@@ -1,3 +1,169 @@
+from datetime import timedelta
+
+from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User
+from events.models import Enrollment, Event
+from .messaging import send_message
+from .models import Conversation, Friendship, FriendshipRequest
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(username=username, email=f'{username}@eventsync.com', **extra)
+
+
+class SocialTestCase(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizador', role='ORGANIZER')
+        self.event = Event.objects.create(
+            organizer=self.organizer, title='Meetup', description='-', location_address='Teresina',
+            start_date=timezone.now() + timedelta(days=1), status='PUBLISHED',
+        )
+        self.ana, self.bia, self.caio = [make_user(name) for name in ('ana', 'bia', 'caio')]
+        for user in (self.ana, self.bia, self.caio):
+            Enrollment.objects.create(event=self.event, user=user, status='APPROVED')
+        self.client = APIClient()
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+
+class FriendshipTest(SocialTestCase):
+    def test_accepting_stores_one_canonical_pair(self):
+        response = self.as_user(self.caio).post('/api/friendships/', {'to_user': self.ana.pk, 'event': self.event.pk})
+        self.assertEqual(response.status_code, 201)
+        request_id = response.json()['id']
+        self.assertEqual(self.as_user(self.ana).post(f'/api/friendships/{request_id}/accept/').status_code, 200)
+
+        pair = Friendship.objects.get()
+        self.assertEqual((pair.user_low, pair.user_high), (self.ana, self.caio))
+        with self.assertNumQueries(1):
+            self.assertTrue(Friendship.objects.are_friends(self.caio, self.ana))
+        self.assertFalse(Friendship.objects.are_friends(self.ana, self.bia))
+
+        # O par só existe numa ordem
+        with self.assertRaises(IntegrityError):
+            Friendship.objects.create(user_low=self.caio, user_high=self.ana)
+
+    def test_requests_cannot_be_edited(self):
+        request_id = self.as_user(self.caio).post('/api/friendships/', {'to_user': self.ana.pk, 'event': self.event.pk}).json()['id']
+        client = self.as_user(self.caio)
+        self.assertEqual(client.patch(f'/api/friendships/{request_id}/', {'to_user': self.bia.pk}).status_code, 405)
+        self.assertEqual(client.put(f'/api/friendships/{request_id}/', {'to_user': self.bia.pk, 'event': self.event.pk}).status_code, 405)
+        self.assertEqual(FriendshipRequest.objects.get(pk=request_id).to_user, self.ana)
+
+    def test_deleting_the_accepted_request_unfriends(self):
+        request_id = self.as_user(self.caio).post('/api/friendships/', {'to_user': self.ana.pk, 'event': self.event.pk}).json()['id']
+        self.as_user(self.ana).post(f'/api/friendships/{request_id}/accept/')
+        self.assertTrue(Friendship.objects.are_friends(self.ana, self.caio))
+
+        self.assertEqual(self.as_user(self.caio).delete(f'/api/friendships/{request_id}/').status_code, 204)
+        self.assertFalse(Friendship.objects.are_friends(self.ana, self.caio))
+        data = {'recipient': self.ana.pk, 'body': 'Oi'}
+        self.assertEqual(self.as_user(self.caio).post('/api/messages/', data).status_code, 400)
+
+    def test_request_requires_both_confirmed(self):
+        outsider = make_user('de_fora')
+        response = self.as_user(self.ana).post('/api/friendships/', {'to_user': outsider.pk, 'event': self.event.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FriendshipRequest.objects.exists())
+
+    def test_only_friends_exchange_messages(self):
+        data = {'recipient': self.bia.pk, 'subject': 'Oi', 'body': 'Tudo bem?'}
+        self.assertEqual(self.as_user(self.ana).post('/api/messages/', data).status_code, 400)
+        Friendship.befriend(self.bia, self.ana)
+        self.assertEqual(self.as_user(self.ana).post('/api/messages/', data).status_code, 201)
+
+
+class EventAttendeesTest(SocialTestCase):
+    def test_paginated_attendees_with_friend_flag(self):
+        extra = [make_user(f'participante_{i}') for i in range(5)]
+        for user in extra:
+            Enrollment.objects.create(event=self.event, user=user, status='APPROVED')
+        Enrollment.objects.create(event=self.event, user=make_user('pendente'), status='PENDING')
+        Friendship.befriend(self.ana, self.bia)
+
+        client = self.as_user(self.ana)
+        seen, url = [], f'/api/events/{self.event.pk}/attendees/?page_size=3'
+        while url:
+            with self.assertNumQueries(3):  # evento, "estou confirmado?" e a página
+                page = client.get(url).json()
+            seen += page['results']
+            url = page['next']
+
+        self.assertEqual([a['id'] for a in seen], sorted(u.pk for u in [self.bia, self.caio, *extra]))
+        self.assertEqual({a['id'] for a in seen if a['is_friend']}, {self.bia.pk})
+        self.assertNotIn('email', seen[0])
+
+    def test_hidden_participation_is_left_out(self):
+        User.objects.filter(pk=self.caio.pk).update(is_participation_visible=False)
+        seen = self.as_user(self.ana).get(f'/api/events/{self.event.pk}/attendees/').json()['results']
+        self.assertEqual([a['id'] for a in seen], [self.bia.pk])
+        # Quem escondeu continua vendo os outros
+        caio_view = self.as_user(self.caio).get(f'/api/events/{self.event.pk}/attendees/').json()['results']
+        self.assertEqual({a['id'] for a in caio_view}, {self.ana.pk, self.bia.pk})
+
+    def test_only_confirmed_attendees_and_organizer_see_the_list(self):
+        url = f'/api/events/{self.event.pk}/attendees/'
+        self.assertEqual(self.as_user(make_user('de_fora')).get(url).status_code, 403)
+        self.assertEqual(self.as_user(self.organizer).get(url).status_code, 200)
+        self.assertEqual(self.as_user(self.ana).get('/api/events/999999/attendees/').status_code, 404)
+
+
+class ConversationTest(SocialTestCase):
+    def setUp(self):
+        super().setUp()
+        Friendship.befriend(self.ana, self.bia)
+        Friendship.befriend(self.ana, self.caio)
+
+    def test_inbox_has_one_row_per_conversation(self):
+        client = self.as_user(self.bia)
+        for i in range(3):
+            self.assertEqual(client.post('/api/messages/', {'recipient': self.ana.pk, 'body': f'oi {i}'}).status_code, 201)
+        send_message(self.caio, self.ana, 'e aí')
+
+        with self.assertNumQueries(1):  # Membro, conversa, os dois usuários e a última mensagem num JOIN
+            inbox = self.as_user(self.ana).get('/api/conversations/').json()['results']
+        self.assertEqual([row['other_user']['id'] for row in inbox], [self.caio.pk, self.bia.pk])
+        self.assertEqual([row['unread_count'] for row in inbox], [1, 3])
+        self.assertEqual(inbox[1]['last_message']['body'], 'oi 2')
+        self.assertEqual(self.as_user(self.ana).get('/api/conversations/unread_count/').json(), {'unread': 4})
+
+        # Do lado de quem enviou, nada a ler
+        self.assertEqual(self.as_user(self.bia).get('/api/conversations/').json()['results'][0]['unread_count'], 0)
+
+    def test_thread_is_cursor_paginated_and_read_resets_counter(self):
+        for i in range(5):
+            send_message(self.bia, self.ana, f'mensagem {i}')
+        conversation = Conversation.objects.get()
+        client = self.as_user(self.ana)
+
+        bodies, url = [], f'/api/conversations/{conversation.pk}/messages/?page_size=2'
+        while url:
+            page = client.get(url).json()
+            bodies += [message['body'] for message in page['results']]
+            url = page['next']
+        self.assertEqual(bodies, [f'mensagem {i}' for i in reversed(range(5))])
+
+        self.assertEqual(client.post(f'/api/conversations/{conversation.pk}/read/').json(), {'updated': 5})
+        self.assertEqual(client.get('/api/conversations/unread_count/').json(), {'unread': 0})
+
+        reply = client.post(f'/api/conversations/{conversation.pk}/messages/', {'body': 'respondendo'})
+        self.assertEqual((reply.status_code, reply.json()['recipient']), (201, self.bia.pk))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.last_message.body, 'respondendo')
+
+    def test_messages_cannot_be_edited_or_deleted(self):
+        message = send_message(self.bia, self.ana, 'não lida')
+        client = self.as_user(self.bia)
+        self.assertEqual(client.delete(f'/api/messages/{message.pk}/').status_code, 405)
+        self.assertEqual(client.patch(f'/api/messages/{message.pk}/', {'body': 'editada'}).status_code, 405)
+        self.assertEqual(self.as_user(self.ana).get('/api/conversations/unread_count/').json(), {'unread': 1})
 
-# Create your tests here.
+    def test_outsiders_cannot_open_the_thread(self):
+        conversation = send_message(self.bia, self.ana, 'particular').conversation
+        self.assertEqual(self.as_user(self.caio).get(f'/api/conversations/{conversation.pk}/messages/').status_code, 404)
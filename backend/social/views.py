@@ -1,17 +1,33 @@
-from rest_framework import viewsets, permissions, decorators, serializers
+from rest_framework import viewsets, permissions, decorators, generics, mixins, serializers
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import FriendshipRequest, Message
-from .serializers import FriendshipRequestSerializer, MessageSerializer
-from events.models import Registration
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.shortcuts import get_object_or_404
+from .messaging import mark_conversation_read, send_message, unread_total
+from .models import ConversationMember, Friendship, FriendshipRequest, Message
+from .pagination import AttendeePagination, InboxPagination, ThreadPagination
+from .serializers import (
+    AttendeeSerializer, ConversationSerializer, FriendshipRequestSerializer, MessageSerializer, ThreadMessageSerializer,
+)
+from events.models import Enrollment, Event
 
-class FriendshipViewSet(viewsets.ModelViewSet):
+# Inscrição confirmada no evento (o check-in é só um flag da inscrição aprovada)
+CONFIRMED = 'APPROVED'
+
+class FriendshipViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                        mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Pedidos de amizade: enviar, listar, aceitar e apagar. Sem edição: destinatário
+    e evento só passam pelas checagens na criação, e o pedido aceito aponta o par
+    que perform_destroy desfaz.
+    """
     queryset = FriendshipRequest.objects.all()
     serializer_class = FriendshipRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return FriendshipRequest.objects.filter(
+        return FriendshipRequest.objects.select_related('from_user', 'event').filter(
             Q(from_user=self.request.user) | Q(to_user=self.request.user)
         )
 
@@ -20,12 +36,23 @@ class FriendshipViewSet(viewsets.ModelViewSet):
         to_user = serializer.validated_data['to_user']
         from_user = self.request.user
 
-        if not Registration.objects.filter(event=event, user=from_user, status__in=['APPROVED', 'CHECKIN']).exists():
+        if to_user == from_user:
+            raise serializers.ValidationError("Você não pode adicionar a si mesmo.")
+
+        # Os dois lados numa consulta só, pelo índice (event, status, user)
+        confirmed = set(
+            Enrollment.objects.filter(event=event, user__in=[from_user, to_user], status=CONFIRMED)
+            .values_list('user_id', flat=True)
+        )
+        if from_user.pk not in confirmed:
             raise serializers.ValidationError("Você não está confirmado neste evento.")
-        
-        if not Registration.objects.filter(event=event, user=to_user, status__in=['APPROVED', 'CHECKIN']).exists():
+
+        if to_user.pk not in confirmed:
             raise serializers.ValidationError("O destinatário não está confirmado neste evento.")
 
+        if Friendship.objects.are_friends(from_user, to_user):
+            raise serializers.ValidationError("Vocês já são amigos.")
+
         serializer.save(from_user=from_user)
 
     @decorators.action(detail=True, methods=['post'])
@@ -33,32 +60,115 @@ class FriendshipViewSet(viewsets.ModelViewSet):
         friendship = self.get_object()
         if friendship.to_user != request.user:
             return Response({"error": "Não autorizado"}, status=403)
-        
-        friendship.status = FriendshipRequest.Status.ACCEPTED
-        friendship.save()
+
+        # Pedido aceito e par canônico na mesma transação
+        with transaction.atomic():
+            friendship.status = FriendshipRequest.Status.ACCEPTED
+            friendship.save(update_fields=['status'])
+            Friendship.befriend(friendship.from_user_id, friendship.to_user_id)
         return Response({"status": "Amizade aceita"})
 
-class MessageViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        # Apagar um pedido aceito desfaz a amizade (e com ela as mensagens novas)
+        with transaction.atomic():
+            if instance.status == FriendshipRequest.Status.ACCEPTED:
+                Friendship.objects.between(instance.from_user_id, instance.to_user_id).delete()
+            instance.delete()
+
+class MessageViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Enviar, listar e abrir mensagens. Sem edição nem exclusão: o ponteiro da
+    última mensagem e as não lidas da conversa (social.messaging) só andam para frente.
+    """
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ThreadPagination
 
     def get_queryset(self):
-        return Message.objects.filter(
+        return Message.objects.select_related('sender').filter(
             Q(sender=self.request.user) | Q(recipient=self.request.user)
         ).order_by('-created_at')
 
     def perform_create(self, serializer):
         recipient = serializer.validated_data['recipient']
         sender = self.request.user
-        
-        is_friend = FriendshipRequest.objects.filter(
-            status='ACCEPTED'
-        ).filter(
-            Q(from_user=sender, to_user=recipient) | 
-            Q(from_user=recipient, to_user=sender)
-        ).exists()
-
-        if not is_friend:
+
+        if not Friendship.objects.are_friends(sender, recipient):
             raise serializers.ValidationError("Apenas amigos podem trocar mensagens.")
 
-        serializer.save(sender=sender)
\ No newline at end of file
+        # Mensagem, última mensagem da conversa e não lidas na mesma transação
+        serializer.instance = send_message(
+            sender, recipient, serializer.validated_data['body'], serializer.validated_data.get('subject', ''),
+        )
+
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Caixa de entrada: uma linha por conversa, com a última mensagem e as não lidas,
+    paginada pelo índice (user, -last_message_at). O histórico fica em /messages/.
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InboxPagination
+    lookup_field = 'conversation_id'
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        return ConversationMember.objects.filter(user=self.request.user).select_related(
+            'conversation__user_low', 'conversation__user_high', 'conversation__last_message',
+        )
+
+    @decorators.action(detail=True, methods=['get', 'post'])
+    def messages(self, request, conversation_id=None):
+        """GET: histórico paginado por cursor (message_thread_idx). POST {"body"}: responde na conversa."""
+        member = self.get_object()
+        if request.method == 'POST':
+            serializer = ThreadMessageSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            recipient = member.conversation.other_user(request.user)
+            if not Friendship.objects.are_friends(request.user, recipient):
+                raise serializers.ValidationError("Apenas amigos podem trocar mensagens.")
+            message = send_message(
+                request.user, recipient, serializer.validated_data['body'], serializer.validated_data.get('subject', ''),
+            )
+            return Response(ThreadMessageSerializer(message).data, status=201)
+
+        paginator = ThreadPagination()
+        page = paginator.paginate_queryset(Message.objects.filter(conversation_id=member.conversation_id), request, view=self)
+        return paginator.get_paginated_response(ThreadMessageSerializer(page, many=True).data)
+
+    @decorators.action(detail=True, methods=['post'])
+    def read(self, request, conversation_id=None):
+        member = self.get_object()
+        return Response({'updated': mark_conversation_read(request.user, member.conversation_id)})
+
+    @decorators.action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread': unread_total(request.user)})
+
+class EventAttendeesView(generics.ListAPIView):
+    """
+    GET /api/events/<event_id>/attendees/ — "quem mais vai": os outros confirmados
+    no evento, paginados por cursor, com is_friend para o botão de amizade.
+    Só quem está confirmado (ou o organizador) vê a lista, e só aparece quem
+    deixou a participação visível (User.is_participation_visible).
+    """
+    serializer_class = AttendeeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AttendeePagination
+
+    def get_queryset(self):
+        user = self.request.user
+        event = get_object_or_404(Event.objects.only('pk', 'organizer_id'), pk=self.kwargs['event_id'])
+        confirmed = Enrollment.objects.filter(event=event, status=CONFIRMED)
+        if event.organizer_id != user.pk and not confirmed.filter(user=user).exists():
+            raise PermissionDenied("Apenas participantes confirmados veem quem vai ao evento.")
+
+        # Inscrições no índice (event, status, user) + JOIN no usuário pela PK;
+        # cada lado do par de amizade é uma sondagem no índice único (user_low, user_high)
+        friends = Friendship.objects.filter(
+            Q(user_low=user, user_high=OuterRef('user')) | Q(user_low=OuterRef('user'), user_high=user)
+        )
+        return (
+            confirmed.exclude(user=user).filter(user__is_participation_visible=True).select_related('user')
+            .annotate(is_friend=Exists(friends))
+        )
@@ -8,6 +8,9 @@ export function Feed() {
   const { user } = useAuth();
   const [events, setEvents] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  // Cursor da próxima página do feed (null quando acabou)
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Helper de URL
   const getUrl = (path: string | undefined | null) => {
@@ -16,13 +19,31 @@ export function Feed() {
     return `http://localhost:8000${path}`;
   };
 
+  // O "next" da API é uma URL absoluta montada pelo backend; só o cursor dela interessa
+  const cursorFrom = (next: string | null) => (next ? new URL(next).searchParams.get('cursor') : null);
+
   useEffect(() => {
     api.get('/api/events/')
-      .then(res => setEvents(res.data))
+      .then(res => {
+        setEvents(res.data.results);
+        setCursor(cursorFrom(res.data.next));
+      })
       .catch(err => console.error("Erro ao carregar eventos:", err))
       .finally(() => setLoading(false));
   }, []);
 
+  const loadMore = () => {
+    if (!cursor || loadingMore) return;
+    setLoadingMore(true);
+    api.get('/api/events/', { params: { cursor } })
+      .then(res => {
+        setEvents(prev => [...prev, ...res.data.results]);
+        setCursor(cursorFrom(res.data.next));
+      })
+      .catch(err => console.error("Erro ao carregar mais eventos:", err))
+      .finally(() => setLoadingMore(false));
+  };
+
   return (
     <div className="max-w-5xl mx-auto pt-4">
       <div className="grid grid-cols-1 md:grid-cols-12 gap-6">
@@ -142,6 +163,16 @@ export function Feed() {
                   </Link>
                 </div>
               ))}
+
+              {cursor && (
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="w-full py-3 text-sm font-medium text-indigo-600 bg-white border border-gray-100 rounded-xl shadow-sm hover:bg-indigo-50 transition disabled:opacity-50"
+                >
+                  {loadingMore ? 'Carregando...' : 'Carregar mais eventos'}
+                </button>
+              )}
             </div>
           )}
         </div>